@@ -1,13 +1,24 @@
 from __future__ import annotations
 
 import asyncio
+import email.utils
 import time
-from dataclasses import dataclass, field
+from collections.abc import Awaitable, Callable
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
 
 import httpx
 
+import metrics
+
 BASE_URL = "https://ballchasing.com/api"
 
+# Shared bucket state: (name, per_second, per_hour, take) -> bucket dict, see
+# db.take_api_token
+BucketStore = Callable[[str, float, "int | None", bool], Awaitable[dict]]
+
 # Rate limits by tier: (per_second, per_hour or None)
 RATE_LIMITS: dict[str, dict[str, tuple[float, int | None]]] = {
     "gc":       {"list": (16, None),  "get": (16, None)},
@@ -22,6 +33,11 @@ RATE_LIMITS: dict[str, dict[str, tuple[float, int | None]]] = {
 class TokenBucket:
     per_second: float
     per_hour: int | None = None
+    # Label for rlstats_token_bucket_wait_seconds
+    name: str = "bucket"
+    # When set, tokens come from this shared store and the fields below only
+    # mirror its last known state
+    store: BucketStore | None = None
     _tokens: float = field(init=False)
     _last_refill: float = field(init=False)
     _hour_tokens: int = field(init=False, default=0)
@@ -45,6 +61,12 @@ class TokenBucket:
             self._hour_start = now
 
     async def acquire(self) -> None:
+        start = time.monotonic()
+        if self.store is not None:
+            while (wait := await self._shared(take=True)) > 0:
+                await asyncio.sleep(min(wait, 60))
+            metrics.BUCKET_WAIT_SECONDS.observe(time.monotonic() - start, (self.name,))
+            return
         while True:
             async with self._lock:
                 self._refill()
@@ -58,10 +80,25 @@ class TokenBucket:
                 if self._tokens >= 1:
                     self._tokens -= 1
                     self._hour_tokens += 1
+                    metrics.BUCKET_WAIT_SECONDS.observe(time.monotonic() - start, (self.name,))
                     return
 
             await asyncio.sleep(1.0 / self.per_second)
 
+    async def _shared(self, take: bool) -> float:
+        state = await self.store(self.name, self.per_second, self.per_hour, take)
+        now = time.monotonic()
+        self._tokens = state["tokens"]
+        self._last_refill = now
+        self._hour_tokens = state["hour_used"]
+        self._hour_start = now - (time.time() - state["hour_start"])
+        return state["wait"]
+
+    async def refresh(self) -> None:
+        """Pull the shared state into this bucket's mirror, without taking a token."""
+        if self.store is not None:
+            await self._shared(take=False)
+
     def seed_usage(self, hour_used: int) -> None:
         """Initialize hourly counter from persisted data after restart."""
         self._hour_tokens = hour_used
@@ -80,42 +117,145 @@ class TokenBucket:
         }
 
 
+# 429 responses are retried this many times, waiting for Retry-After
+MAX_RETRIES = 3
+# Retry-After waits are clamped to [0, RETRY_AFTER_MAX]; missing or
+# unparseable values wait RETRY_AFTER_DEFAULT
+RETRY_AFTER_DEFAULT = 1.0
+RETRY_AFTER_MAX = 60.0
+
+
+def retry_after_seconds(value: str | None) -> float:
+    """Seconds to wait for a Retry-After header: delay-seconds or an HTTP-date."""
+    if value is None:
+        return RETRY_AFTER_DEFAULT
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return RETRY_AFTER_DEFAULT
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        seconds = (when - datetime.now(timezone.utc)).total_seconds()
+    if seconds != seconds:  # NaN
+        return RETRY_AFTER_DEFAULT
+    return min(max(seconds, 0.0), RETRY_AFTER_MAX)
+
+
+@dataclass
+class SyncTelemetry:
+    """Where one sync spent its time; the columns of the same name in sync_log.
+
+    The client fills in the upstream fields for every request made while the
+    object is bound with track(); exists_seconds and write_seconds are timed
+    by the sync loop around its db calls.
+    """
+    list_seconds: float = 0.0
+    exists_seconds: float = 0.0
+    list_wait_seconds: float = 0.0
+    get_wait_seconds: float = 0.0
+    retry_wait_seconds: float = 0.0
+    download_seconds: float = 0.0
+    decode_seconds: float = 0.0
+    write_seconds: float = 0.0
+    bytes_received: int = 0
+    retries: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+_telemetry: ContextVar[SyncTelemetry | None] = ContextVar("sync_telemetry", default=None)
+
+
+@contextmanager
+def track(telemetry: SyncTelemetry):
+    """Record requests made by this task (and tasks it starts) into `telemetry`."""
+    token = _telemetry.set(telemetry)
+    try:
+        yield telemetry
+    finally:
+        _telemetry.reset(token)
+
+
 class BallchasingClient:
-    def __init__(self, token: str, tier: str = "gold") -> None:
+    def __init__(
+        self,
+        token: str,
+        tier: str = "gold",
+        base_url: str = BASE_URL,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
         self.token = token
         self._client = httpx.AsyncClient(
-            base_url=BASE_URL,
+            base_url=base_url,
             headers={"Authorization": token},
             timeout=30.0,
+            transport=transport,
         )
         tier = tier.lower()
         if tier not in RATE_LIMITS:
             tier = "gold"
         self.tier = tier
         limits = RATE_LIMITS[tier]
-        self._list_bucket = TokenBucket(*limits["list"])
-        self._get_bucket = TokenBucket(*limits["get"])
+        self._list_bucket = TokenBucket(*limits["list"], name="list")
+        self._get_bucket = TokenBucket(*limits["get"], name="get")
 
     async def close(self) -> None:
         await self._client.aclose()
 
-    async def ping(self) -> dict:
-        await self._get_bucket.acquire()
-        resp = await self._client.get("/")
+    async def _get(self, bucket: TokenBucket, path: str, params: dict | None = None):
+        """GET through a token bucket, backing off and retrying on 429."""
+        telemetry = _telemetry.get()
+        listing = bucket is self._list_bucket
+        for attempt in range(MAX_RETRIES + 1):
+            start = time.perf_counter()
+            await bucket.acquire()
+            acquired = time.perf_counter()
+            resp = await self._client.get(path, params=params)
+            if telemetry is not None:
+                elapsed = time.perf_counter() - acquired
+                if listing:
+                    telemetry.list_wait_seconds += acquired - start
+                    telemetry.list_seconds += elapsed
+                else:
+                    telemetry.get_wait_seconds += acquired - start
+                    telemetry.download_seconds += elapsed
+                telemetry.bytes_received += len(resp.content)
+            if resp.status_code != 429 or attempt == MAX_RETRIES:
+                break
+            start = time.perf_counter()
+            await asyncio.sleep(retry_after_seconds(resp.headers.get("Retry-After")))
+            if telemetry is not None:
+                telemetry.retries += 1
+                telemetry.retry_wait_seconds += time.perf_counter() - start
         resp.raise_for_status()
-        return resp.json()
+        if telemetry is None:
+            return resp.json()
+        start = time.perf_counter()
+        data = resp.json()
+        telemetry.decode_seconds += time.perf_counter() - start
+        return data
+
+    async def ping(self) -> dict:
+        return await self._get(self._get_bucket, "/")
 
     async def list_replays(self, **params) -> dict:
-        await self._list_bucket.acquire()
-        resp = await self._client.get("/replays", params=params)
-        resp.raise_for_status()
-        return resp.json()
+        return await self._get(self._list_bucket, "/replays", params)
 
     async def get_replay(self, replay_id: str) -> dict:
-        await self._get_bucket.acquire()
-        resp = await self._client.get(f"/replays/{replay_id}")
-        resp.raise_for_status()
-        return resp.json()
+        return await self._get(self._get_bucket, f"/replays/{replay_id}")
+
+    def share_limits(self, store: BucketStore) -> None:
+        """Account tokens in `store`, so every process using it shares one quota."""
+        self._list_bucket.store = store
+        self._get_bucket.store = store
+
+    async def refresh_rate_limits(self) -> None:
+        await self._list_bucket.refresh()
+        await self._get_bucket.refresh()
 
     def rate_limit_status(self) -> dict:
         return {
@@ -125,7 +265,4 @@ class BallchasingClient:
         }
 
     async def get_maps(self) -> list:
-        await self._get_bucket.acquire()
-        resp = await self._client.get("/maps")
-        resp.raise_for_status()
-        return resp.json()
+        return await self._get(self._get_bucket, "/maps")
@@ -0,0 +1 @@
+"""Benchmark tooling: synthetic replays, a fake ballchasing.com API and harnesses."""
@@ -0,0 +1,92 @@
+"""Replay payload codec benchmark.
+
+Loads the same synthetic replays into one throwaway DB per codec and reports
+file size after VACUUM, the bytes per replay in the hot table and in
+replay_raw, a cold full scan (``db.all_replay_data``) and the pure decode CPU
+per hot row.
+
+    python -m bench.codec_bench --replays 5000
+    python -m bench.codec_bench --replays 2000 --codecs zlib zdict
+    python -m bench.codec_bench --replays 1000 --full-payload
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import aiosqlite
+
+import db
+from bench.synthetic import generate_replays
+
+CODECS = ("json", "zlib", "zdict")
+
+
+async def run_codec_bench(
+    replays: int = 2000, codecs: tuple[str, ...] = CODECS, seed: int = 0, full: bool = False
+) -> list[dict]:
+    """Benchmark each codec on `replays` synthetic replays; one result per codec.
+
+    full=True uses real-shaped payloads (see synthetic.make_replay).
+    """
+    data = generate_replays(replays, seed=seed, full=full)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for codec in codecs:
+            db.DB_PATH = str(Path(tmp) / f"{codec}.db")
+            db.REPLAY_CODEC = "json"
+            await db.init_db()
+            for replay in data:
+                await db.upsert_replay(replay["id"], replay)
+            # zdict trains on what is already stored, then rewrites it
+            await db.migrate_replay_codec(codec)
+            async with aiosqlite.connect(db.DB_PATH) as conn:
+                await conn.execute("VACUUM")
+                cursor = await conn.execute("SELECT data, codec FROM replays")
+                rows = await cursor.fetchall()
+                cursor = await conn.execute("SELECT AVG(LENGTH(data)) FROM replay_raw")
+                raw_bytes = (await cursor.fetchone())[0]
+
+            start = time.perf_counter()
+            await db.all_replay_data()
+            scan = time.perf_counter() - start
+
+            start = time.process_time()
+            for raw, tag in rows:
+                db.decode_replay(raw, tag)
+            decode = time.process_time() - start
+
+            results.append({
+                "codec": codec,
+                "db_mb": round(os.path.getsize(db.DB_PATH) / 1e6, 2),
+                "hot_bytes_per_replay": sum(len(raw) for raw, _ in rows) // len(rows),
+                "raw_bytes_per_replay": int(raw_bytes),
+                "scan_seconds": round(scan, 3),
+                "decode_us_per_replay": round(decode / len(rows) * 1e6, 1),
+            })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--replays", type=int, default=2000)
+    parser.add_argument("--codecs", nargs="+", choices=CODECS, default=list(CODECS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--full-payload", action="store_true",
+                        help="replays with every field of the real detail response")
+    args = parser.parse_args()
+    results = asyncio.run(
+        run_codec_bench(args.replays, tuple(args.codecs), args.seed, args.full_payload)
+    )
+    keys = list(results[0])
+    print("  ".join(f"{k:>20}" for k in keys))
+    for row in results:
+        print("  ".join(f"{row[k]!s:>20}" for k in keys))
+
+
+if __name__ == "__main__":
+    main()
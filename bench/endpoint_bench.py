@@ -0,0 +1,217 @@
+"""Endpoint latency benchmark at several dataset sizes.
+
+Loads synthetic replays straight into a SQLite DB per scale (no fake API,
+no sync) and times each analytics endpoint through the ASGI app, with the
+response cache cleared before every request so each one does the full work.
+Results can be saved as a baseline and later runs compared against it; a
+median more than --tolerance slower than the baseline is a regression, and
+the command exits non-zero.
+
+Between consecutive scales, ``growth`` is the exponent k in time ~ n^k: about
+1 for a full scan, 0 for paginated endpoints; above SUPERLINEAR is flagged.
+
+    python -m bench.endpoint_bench --scales 10000 100000 --save-baseline
+    python -m bench.endpoint_bench --scales 10000 100000
+    python -m bench.endpoint_bench --scales 500000 --data-dir ~/.cache/rlstats-bench
+
+Generating and loading 500k replays takes a while; with --data-dir the DB for
+each (scale, seed) is kept and reused by later runs.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+import httpx
+
+import db
+import server
+from bench.synthetic import ME, iter_replays
+
+SCALES = (10_000, 100_000, 500_000)
+BASELINE = Path(__file__).with_name("endpoint_baseline.json")
+TOLERANCE = 0.25
+SUPERLINEAR = 1.3
+LOAD_BATCH = 1000
+# Bump when iter_replays output changes, so cached DBs are rebuilt
+DATASET_VERSION = 1
+
+# (name, path, query params)
+ENDPOINTS: list[tuple[str, str, dict]] = [
+    ("stats/me", "/api/stats/me", {}),
+    ("stats/teammates", "/api/stats/teammates", {}),
+    ("stats/opponents", "/api/stats/opponents", {}),
+    ("stats/replays", "/api/stats/replays", {}),
+    ("stats/replays?summary", "/api/stats/replays", {"summary": "true"}),
+    ("stats/scoreline", "/api/stats/scoreline", {}),
+    ("stats/scoreline?team-size=2", "/api/stats/scoreline", {"team-size": 2}),
+    ("stats/games", "/api/stats/games", {}),
+    ("stats/correlation", "/api/stats/correlation", {"stat": "avg_speed"}),
+    ("players", "/api/players", {}),
+    ("replays", "/api/replays", {}),
+    ("sync/coverage", "/api/sync/coverage", {}),
+]
+
+
+async def load_dataset(replays: Iterable[dict], batch_size: int = LOAD_BATCH) -> int:
+    """Fill db.DB_PATH with `replays` (newest first), a config and a covering sync."""
+    await db.init_db()
+    await db.set_player_config({
+        "me": [ME],
+        "teammates": {f"Mate{i}": [f"Mate{i}"] for i in range(4)},
+    })
+    count = 0
+    newest = oldest = None
+    replays = iter(replays)
+    while batch := list(itertools.islice(replays, batch_size)):
+        await db.upsert_replays(batch)
+        count += len(batch)
+        newest = newest or batch[0]["date"]
+        oldest = batch[-1]["date"]
+    log_id = await db.create_sync_log(oldest, newest)
+    await db.complete_sync_log(log_id, "completed", count, count, 0)
+    return count
+
+
+async def _open_dataset(count: int, seed: int, data_dir: Path) -> None:
+    db.DB_PATH = str(data_dir / f"synthetic-{count}-seed{seed}-v{DATASET_VERSION}.db")
+    if Path(db.DB_PATH).exists():
+        await db.init_db()
+        if await db.count_replays() == count:
+            return
+        Path(db.DB_PATH).unlink()
+    await load_dataset(iter_replays(count, seed))
+
+
+async def _time_endpoint(http: httpx.AsyncClient, path: str, params: dict, repeat: int) -> dict:
+    times = []
+    size = 0
+    for _ in range(repeat + 1):  # the first run only warms up
+        server.response_cache.clear()
+        start = time.perf_counter()
+        resp = await http.get(path, params=params)
+        times.append(time.perf_counter() - start)
+        resp.raise_for_status()
+        size = len(resp.content)
+    times = times[1:]
+    return {
+        "median_ms": round(statistics.median(times) * 1000, 2),
+        "min_ms": round(min(times) * 1000, 2),
+        "bytes": size,
+    }
+
+
+async def run_endpoint_bench(
+    scales: tuple[int, ...] = SCALES,
+    repeat: int = 5,
+    seed: int = 0,
+    data_dir: str | None = None,
+) -> list[dict]:
+    """Time every endpoint at every scale; one result per (scale, endpoint)."""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(data_dir or tmp)
+        directory.mkdir(parents=True, exist_ok=True)
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            for scale in sorted(scales):
+                start = time.perf_counter()
+                await _open_dataset(scale, seed, directory)
+                print(f"# {scale} replays ready in {time.perf_counter() - start:.1f}s",
+                      file=sys.stderr)
+                for name, path, params in ENDPOINTS:
+                    timing = await _time_endpoint(http, path, params, repeat)
+                    results.append({"scale": scale, "endpoint": name, **timing})
+    _add_growth(results)
+    return results
+
+
+def _add_growth(results: list[dict]) -> None:
+    previous: dict[str, dict] = {}
+    for row in results:
+        before = previous.get(row["endpoint"])
+        row["growth"] = None
+        if before and before["median_ms"] > 0 and row["median_ms"] > 0:
+            row["growth"] = round(
+                math.log(row["median_ms"] / before["median_ms"])
+                / math.log(row["scale"] / before["scale"]),
+                2,
+            )
+        previous[row["endpoint"]] = row
+
+
+def _key(row: dict) -> str:
+    return f"{row['scale']}:{row['endpoint']}"
+
+
+def save_baseline(results: list[dict], path: Path = BASELINE) -> None:
+    """Write medians to `path`, keeping entries for scales this run skipped."""
+    baseline = json.loads(path.read_text()) if path.exists() else {}
+    baseline.update({_key(row): row["median_ms"] for row in results})
+    path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+
+def compare(results: list[dict], baseline: dict[str, float], tolerance: float = TOLERANCE) -> list[dict]:
+    """Annotate results with their baseline and return the regressions."""
+    regressions = []
+    for row in results:
+        base = baseline.get(_key(row))
+        row["baseline_ms"] = base
+        row["change"] = None
+        if base:
+            row["change"] = f"{(row['median_ms'] / base - 1) * 100:+.0f}%"
+            if row["median_ms"] > base * (1 + tolerance):
+                regressions.append(row)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[SCALES[0]])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=None, help="keep and reuse generated DBs here")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="write this run's medians as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed slowdown over the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+    results = asyncio.run(run_endpoint_bench(
+        tuple(args.scales), args.repeat, args.seed, args.data_dir,
+    ))
+    regressions = []
+    if args.baseline.exists() and not args.save_baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+
+    keys = [k for k in ("scale", "endpoint", "median_ms", "min_ms", "bytes", "growth",
+                        "baseline_ms", "change") if k in results[0]]
+    print("  ".join(f"{k:>28}" if k == "endpoint" else f"{k:>11}" for k in keys))
+    for row in results:
+        flags = []
+        if row in regressions:
+            flags.append("REGRESSION")
+        if row["growth"] is not None and row["growth"] > SUPERLINEAR:
+            flags.append("SUPERLINEAR")
+        print("  ".join(
+            f"{row[k]!s:>28}" if k == "endpoint" else f"{row[k]!s:>11}" for k in keys
+        ), *flags)
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"baseline written to {args.baseline}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Local stand-in for the ballchasing.com API.
+
+Serves synthetic replays from ``/replays``, ``/replays/{id}``, ``/maps`` and
+``/`` with cursor pagination, optional per-request latency, random 429
+injection and the per-tier rate limits from ``ballchasing_client.RATE_LIMITS``.
+
+Use it in-process through ``httpx.ASGITransport`` (see ``bench/sync_bench.py``)
+or as a real server pointed at by ``BALLCHASING_BASE_URL``:
+
+    python -m bench.fake_ballchasing --replays 5000 --latency 0.05 --port 8100
+    BALLCHASING_BASE_URL=http://localhost:8100 uvicorn server:app
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter, deque
+from datetime import datetime
+from urllib.parse import urlencode
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+
+from ballchasing_client import RATE_LIMITS
+from bench.synthetic import MAPS, generate_replays
+
+# Keys kept in /replays list entries; the detail endpoint returns everything
+SUMMARY_KEYS = ("id", "title", "date", "map_name", "playlist_name", "duration", "overtime")
+
+
+class _RateWindow:
+    """Sliding one-second and one-hour request windows for one endpoint group."""
+
+    def __init__(self, per_second: float, per_hour: int | None) -> None:
+        self.per_second = per_second
+        self.per_hour = per_hour
+        self._second: deque[float] = deque()
+        self._hour: deque[float] = deque()
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        while self._second and now - self._second[0] >= 1:
+            self._second.popleft()
+        while self._hour and now - self._hour[0] >= 3600:
+            self._hour.popleft()
+        if len(self._second) >= self.per_second:
+            return False
+        if self.per_hour is not None and len(self._hour) >= self.per_hour:
+            return False
+        self._second.append(now)
+        self._hour.append(now)
+        return True
+
+
+def _summary(replay: dict) -> dict:
+    summary = {k: replay.get(k) for k in SUMMARY_KEYS}
+    for color in ("blue", "orange"):
+        team = replay.get(color, {})
+        summary[color] = {
+            "goals": team.get("stats", {}).get("core", {}).get("goals", 0),
+            "players": [{"name": p["name"], "id": p["id"]} for p in team.get("players", [])],
+        }
+    return summary
+
+
+def create_app(
+    replays: list[dict] | None = None,
+    count: int = 1000,
+    latency: float = 0.0,
+    error_rate: float = 0.0,
+    tier: str | None = None,
+    seed: int = 0,
+    retry_after: float = 1.0,
+) -> FastAPI:
+    """Build a fake API app.
+
+    replays defaults to ``generate_replays(count, seed)``. latency is added to
+    every request; error_rate is the probability of an injected 429. With a
+    tier, requests beyond that tier's limits are answered with 429 as the real
+    API would; every 429 carries retry_after as its Retry-After header.
+    Request and 429 counts are kept on ``app.state.calls``.
+    """
+    if replays is None:
+        replays = generate_replays(count, seed=seed)
+    ordered = sorted(replays, key=lambda r: (r["date"], r["id"]), reverse=True)
+    dates = [datetime.fromisoformat(r["date"]) for r in ordered]
+    by_id = {r["id"]: r for r in ordered}
+    rng = random.Random(seed)
+    windows = (
+        {group: _RateWindow(*limits) for group, limits in RATE_LIMITS[tier].items()}
+        if tier else {}
+    )
+
+    app = FastAPI(title="Fake ballchasing.com")
+    app.state.calls = Counter()
+
+    async def _gate(group: str) -> JSONResponse | None:
+        app.state.calls[group] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        window = windows.get(group)
+        if (window and not window.allow()) or (error_rate and rng.random() < error_rate):
+            app.state.calls["429"] += 1
+            return JSONResponse({"error": "rate limited"}, status_code=429,
+                                headers={"Retry-After": str(retry_after)})
+        return None
+
+    @app.get("/")
+    async def ping():
+        if limited := await _gate("get"):
+            return limited
+        return {"steam_id": "76561197971332940", "name": "Fake Uploader", "type": "regular"}
+
+    @app.get("/replays")
+    async def list_replays(
+        request: Request,
+        count: int = Query(150, ge=1, le=200),
+        after: int = Query(0, ge=0),
+        date_after: str | None = Query(None, alias="replay-date-after"),
+        date_before: str | None = Query(None, alias="replay-date-before"),
+    ):
+        if limited := await _gate("list"):
+            return limited
+        lo = datetime.fromisoformat(date_after) if date_after else None
+        hi = datetime.fromisoformat(date_before) if date_before else None
+        matching = [
+            r for r, d in zip(ordered, dates)
+            if (lo is None or d >= lo) and (hi is None or d <= hi)
+        ]
+        page = matching[after:after + count]
+        body: dict = {"count": len(matching), "list": [_summary(r) for r in page]}
+        if after + count < len(matching):
+            params = dict(request.query_params)
+            params["after"] = str(after + count)
+            body["next"] = f"{request.base_url}replays?{urlencode(params)}"
+        return body
+
+    @app.get("/replays/{replay_id}")
+    async def get_replay(replay_id: str):
+        if limited := await _gate("get"):
+            return limited
+        replay = by_id.get(replay_id)
+        if replay is None:
+            raise HTTPException(404, "replay not found")
+        return replay
+
+    @app.get("/maps")
+    async def get_maps():
+        if limited := await _gate("get"):
+            return limited
+        return {name.lower().replace(" ", "_"): name for name in MAPS}
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--replays", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="429 probability")
+    parser.add_argument("--tier", choices=sorted(RATE_LIMITS), default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+    app = create_app(
+        count=args.replays, latency=args.latency, error_rate=args.error_rate,
+        tier=args.tier, seed=args.seed,
+    )
+    uvicorn.run(app, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
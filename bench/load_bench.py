@@ -0,0 +1,281 @@
+"""Mixed read/write load test: analytics latency while a sync is writing.
+
+Preloads a throwaway DB, then drives the analysis endpoints open-loop at
+--rate requests/s in two phases:
+
+- idle: readers only, for --idle-seconds, the uncontended reference
+- sync: the same load while ``server._do_sync`` pulls --new replays from
+  ``bench.fake_ballchasing``; the phase ends when the sync does
+
+Latency is measured from each request's scheduled start, so a stalled
+server is charged for the requests it delayed (no coordinated omission).
+Per phase it reports p50/p95/p99 latency, event-loop lag (overshoot of a
+10 ms sleep) and SQLite lock waits.
+
+Lock waits are measured by opening every connection with a zero busy
+timeout and retrying SQLITE_BUSY here, with the same 5 s budget as the
+default handler, timing each wait. A db.py that sets its own busy_timeout
+pragma hides them from this count.
+
+    python -m bench.load_bench --preloaded 2000 --new 1000 --rate 5
+    python -m bench.load_bench --new 500 --latency 0.05 --tier gold
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import sqlite3
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from contextlib import contextmanager
+from pathlib import Path
+
+import aiosqlite
+import httpx
+
+import db
+import server
+from ballchasing_client import RATE_LIMITS, BallchasingClient, TokenBucket
+from bench.endpoint_bench import ENDPOINTS, load_dataset
+from bench.fake_ballchasing import create_app
+from bench.sync_bench import UNTHROTTLED
+from bench.synthetic import generate_replays
+from models import SyncStatus
+
+LOAD_ENDPOINTS = [e for e in ENDPOINTS if e[0].startswith("stats/")]
+LAG_INTERVAL = 0.01
+BUSY_TIMEOUT = 5.0
+
+
+class LockWaits:
+    """SQLITE_BUSY waits, appended from aiosqlite's connection threads."""
+
+    def __init__(self) -> None:
+        self.waits: list[float] = []
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self.waits.append(seconds)
+
+    def since(self, start: int) -> list[float]:
+        with self._lock:
+            return self.waits[start:]
+
+
+def _lock_timed_connection(waits: LockWaits) -> type[sqlite3.Connection]:
+    class LockTimedConnection(sqlite3.Connection):
+        def _retry(self, fn, *args):
+            waited = 0.0
+            delay = 0.001
+            start = None
+            try:
+                while True:
+                    try:
+                        return fn(*args)
+                    except sqlite3.OperationalError as e:
+                        if "locked" not in str(e) or waited >= BUSY_TIMEOUT:
+                            raise
+                    if start is None:
+                        start = time.perf_counter()
+                    time.sleep(delay)
+                    waited = time.perf_counter() - start
+                    delay = min(delay * 2, 0.05)
+            finally:
+                if start is not None:
+                    waits.add(time.perf_counter() - start)
+
+        def execute(self, *args):
+            return self._retry(super().execute, *args)
+
+        def executemany(self, *args):
+            return self._retry(super().executemany, *args)
+
+        def commit(self):
+            return self._retry(super().commit)
+
+    return LockTimedConnection
+
+
+@contextmanager
+def timed_locks(waits: LockWaits):
+    """Open every aiosqlite connection through LockTimedConnection."""
+    original = aiosqlite.connect
+    factory = _lock_timed_connection(waits)
+
+    def connect(database, **kwargs):
+        return original(database, **{**kwargs, "timeout": 0, "factory": factory})
+
+    aiosqlite.connect = connect
+    try:
+        yield waits
+    finally:
+        aiosqlite.connect = original
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    """Nearest-rank percentile of `values`, in ms."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered) + 0.5) - 1))
+    return round(ordered[rank] * 1000, 2)
+
+
+async def _watch_lag(phase: dict, lag: dict[str, list[float]]) -> None:
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        lag.setdefault(phase["name"], []).append(time.perf_counter() - start - LAG_INTERVAL)
+
+
+async def _request(http: httpx.AsyncClient, endpoint: tuple, scheduled: float, out: list) -> None:
+    name, path, params = endpoint
+    try:
+        resp = await http.get(path, params=params)
+        ok = resp.status_code == 200
+    except Exception:
+        ok = False
+    out.append((name, time.perf_counter() - scheduled, ok))
+
+
+async def _drive(
+    http: httpx.AsyncClient, rate: float, done: Callable[[], bool], out: list
+) -> None:
+    """Start one request every 1/rate seconds, round robin, until done()."""
+    tasks = []
+    scheduled = time.perf_counter()
+    for endpoint in itertools.cycle(LOAD_ENDPOINTS):
+        if done():
+            break
+        tasks.append(asyncio.create_task(_request(http, endpoint, scheduled, out)))
+        scheduled += 1 / rate
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+    await asyncio.gather(*tasks)
+
+
+def _summary(phase: str, seconds: float, requests: list, lag: list[float], waits: list[float]) -> dict:
+    latencies = [t for _, t, ok in requests if ok]
+    return {
+        "phase": phase,
+        "seconds": round(seconds, 2),
+        "requests": len(requests),
+        "errors": sum(not ok for _, _, ok in requests),
+        "achieved_rps": round(len(requests) / seconds, 1) if seconds else None,
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+        "p99_ms": _percentile(latencies, 99),
+        "max_ms": _percentile(latencies, 100),
+        "loop_lag_p99_ms": _percentile(lag, 99),
+        "loop_lag_max_ms": _percentile(lag, 100),
+        "lock_waits": len(waits),
+        "lock_wait_ms": round(sum(waits) * 1000, 1),
+        "lock_wait_max_ms": _percentile(waits, 100),
+    }
+
+
+async def run_load_bench(
+    preloaded: int = 2000,
+    new: int = 1000,
+    rate: float = 5.0,
+    idle_seconds: float = 5.0,
+    latency: float = 0.0,
+    tier: str | None = None,
+    cache: bool = False,
+    seed: int = 0,
+) -> list[dict]:
+    """Run the idle and sync phases; one summary per phase.
+
+    The response cache is disabled unless `cache`, so every request reads
+    the DB (during a sync each write would invalidate it anyway).
+    """
+    data = generate_replays(preloaded + new, seed=seed)
+    fake = create_app(data, latency=latency, tier=tier, seed=seed)
+    client = BallchasingClient(
+        "bench", tier or "gc", base_url="http://fake",
+        transport=httpx.ASGITransport(app=fake),
+    )
+    if tier is None:
+        client._list_bucket = TokenBucket(UNTHROTTLED, name="list")
+        client._get_bucket = TokenBucket(UNTHROTTLED, name="get")
+
+    cache_bytes = server.response_cache.max_bytes
+    if not cache:
+        server.response_cache.max_bytes = 0
+    waits = LockWaits()
+    phase = {"name": "setup"}
+    lag: dict[str, list[float]] = {}
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            db.DB_PATH = str(Path(tmp) / "load.db")
+            # The newest `new` replays are what the sync will fetch
+            await load_dataset(data[new:])
+            server.client = client
+            watcher = asyncio.create_task(_watch_lag(phase, lag))
+            transport = httpx.ASGITransport(app=server.app)
+            with timed_locks(waits):
+                async with httpx.AsyncClient(transport=transport, base_url="http://load") as http:
+                    phase["name"] = "idle"
+                    requests: list = []
+                    mark = len(waits.waits)
+                    start = time.perf_counter()
+                    deadline = start + idle_seconds
+                    await _drive(http, rate, lambda: time.perf_counter() >= deadline, requests)
+                    results.append(_summary(
+                        "idle", time.perf_counter() - start, requests,
+                        lag.get("idle", []), waits.since(mark),
+                    ))
+
+                    phase["name"] = "sync"
+                    requests = []
+                    mark = len(waits.waits)
+                    status = SyncStatus(running=True)
+                    start = time.perf_counter()
+                    sync = asyncio.create_task(server._do_sync(None, None, status))
+                    await _drive(http, rate, sync.done, requests)
+                    await sync
+                    row = _summary(
+                        "sync", time.perf_counter() - start, requests,
+                        lag.get("sync", []), waits.since(mark),
+                    )
+                    row["replays_fetched"] = status.replays_fetched
+                    row["sync_error"] = status.error
+                    results.append(row)
+            watcher.cancel()
+            await client.close()
+    finally:
+        server.response_cache.max_bytes = cache_bytes
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--preloaded", type=int, default=2000,
+                        help="replays in the DB before the sync")
+    parser.add_argument("--new", type=int, default=1000, help="replays the sync fetches")
+    parser.add_argument("--rate", type=float, default=5.0, help="analysis requests per second")
+    parser.add_argument("--idle-seconds", type=float, default=5.0)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="fake API seconds per request")
+    parser.add_argument("--tier", choices=sorted(RATE_LIMITS), default=None)
+    parser.add_argument("--cache", action="store_true", help="keep the response cache on")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    results = asyncio.run(run_load_bench(
+        preloaded=args.preloaded, new=args.new, rate=args.rate,
+        idle_seconds=args.idle_seconds, latency=args.latency, tier=args.tier,
+        cache=args.cache, seed=args.seed,
+    ))
+    keys = list(results[-1])
+    width = max(len(k) for k in keys)
+    print(f"{'':<{width}}  " + "  ".join(f"{r['phase']:>10}" for r in results))
+    for key in keys[1:]:
+        print(f"{key:<{width}}  " + "  ".join(f"{r.get(key, '')!s:>10}" for r in results))
+
+
+if __name__ == "__main__":
+    main()
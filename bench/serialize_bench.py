@@ -0,0 +1,121 @@
+"""Response serialization benchmark for the analysis endpoints.
+
+Builds /api/stats/games rows and /api/stats/correlation points from synthetic
+replays, then times the two ways of turning them into a response body:
+
+- model: one Pydantic model per row, validated and dumped by a TypeAdapter,
+  which is what FastAPI does for a route returning models
+- fast: plain dicts encoded with orjson, what ``server.FastJSONResponse`` does
+
+Results are per 10k rows.
+
+    python -m bench.serialize_bench --rows 10000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import orjson
+from pydantic import TypeAdapter
+
+import server
+from bench.synthetic import ME, generate_replays
+from models import CorrelationPoint, GameAnalysisRow, ScorelineRoleStats
+
+
+def _game_rows(replays: list[dict]) -> list[dict]:
+    rows = []
+    for replay in replays:
+        mine = "blue" if any(p["name"] == ME for p in replay["blue"]["players"]) else "orange"
+        theirs = "orange" if mine == "blue" else "blue"
+        stats = [
+            server._role_stats(
+                server._safe_get(p["stats"], "positioning", "percent_behind_ball"),
+                server._safe_get(p["stats"], "movement", "avg_speed"),
+                server._safe_get(p["stats"], "positioning", "avg_distance_to_ball"),
+            )
+            for p in (replay[mine]["players"][0], replay[theirs]["players"][0])
+        ]
+        rows.append({
+            "id": replay["id"],
+            "date": replay["date"],
+            "my_goals": replay[mine]["stats"]["core"]["goals"],
+            "opp_goals": replay[theirs]["stats"]["core"]["goals"],
+            "map_name": replay["map_name"],
+            "overtime": replay["overtime"],
+            "me": stats[0],
+            "teammates": stats[0] if len(replay[mine]["players"]) > 1 else None,
+            "opponents": stats[1],
+        })
+    return rows
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_serialize_bench(rows: int = 10_000, repeat: int = 5, seed: int = 0) -> list[dict]:
+    """Best-of-`repeat` ms per 10k rows for each payload and path."""
+    games = _game_rows(generate_replays(rows, seed=seed))
+    points = [
+        {"stat_value": g["me"]["avg_speed"], "goal_diff": g["my_goals"] - g["opp_goals"],
+         "won": g["my_goals"] > g["opp_goals"]}
+        for g in games
+    ]
+    games_adapter = TypeAdapter(list[GameAnalysisRow])
+    points_adapter = TypeAdapter(list[CorrelationPoint])
+
+    def games_model() -> bytes:
+        return games_adapter.dump_json([
+            GameAnalysisRow(**{
+                **g,
+                "me": ScorelineRoleStats(**g["me"]),
+                "teammates": ScorelineRoleStats(**g["teammates"]) if g["teammates"] else None,
+                "opponents": ScorelineRoleStats(**g["opponents"]),
+            })
+            for g in games
+        ])
+
+    def points_model() -> bytes:
+        return points_adapter.dump_json([CorrelationPoint(**p) for p in points])
+
+    scale = 10_000 / rows * 1000
+    results = []
+    for name, model, fast in (
+        ("games", games_model, lambda: orjson.dumps(games)),
+        ("correlation", points_model, lambda: orjson.dumps(points)),
+    ):
+        assert orjson.loads(model()) == orjson.loads(fast())
+        model_ms = _time(model, repeat) * scale
+        fast_ms = _time(fast, repeat) * scale
+        results.append({
+            "payload": name,
+            "model_ms": round(model_ms, 2),
+            "fast_ms": round(fast_ms, 2),
+            "speedup": round(model_ms / fast_ms, 1),
+            "bytes": len(fast()),
+        })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    results = run_serialize_bench(args.rows, args.repeat, args.seed)
+    keys = list(results[0])
+    print("  ".join(f"{k:>12}" for k in keys))
+    for row in results:
+        print("  ".join(f"{row[k]!s:>12}" for k in keys))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Sync throughput benchmark against the local fake ballchasing API.
+
+Runs ``server._do_sync`` end to end against ``bench.fake_ballchasing`` with a
+throwaway SQLite DB and reports replays/s and API efficiency (replays
+fetched per upstream call, where 1 list call per 200 replays is the floor).
+
+    python -m bench.sync_bench --replays 2000 --latency 0.02
+    python -m bench.sync_bench --replays 500 --tier gold --error-rate 0.05
+
+By default both the fake server and the client are unthrottled, so the run
+measures our own overhead. With --tier the real per-tier limits apply on both
+sides, which is what a user of that tier would see.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+import db
+import server
+from ballchasing_client import RATE_LIMITS, BallchasingClient, TokenBucket
+from bench.fake_ballchasing import create_app
+from bench.synthetic import generate_replays
+from models import SyncStatus
+
+# Token rate used for unthrottled runs; high enough never to wait
+UNTHROTTLED = 1_000_000.0
+
+
+async def run_sync_bench(
+    replays: int = 1000,
+    preloaded: int = 0,
+    latency: float = 0.0,
+    error_rate: float = 0.0,
+    tier: str | None = None,
+    seed: int = 0,
+    db_path: str | None = None,
+) -> dict:
+    """Sync `replays` synthetic replays, `preloaded` of which are already cached."""
+    data = generate_replays(replays, seed=seed)
+    fake = create_app(data, latency=latency, error_rate=error_rate, tier=tier, seed=seed)
+    client = BallchasingClient(
+        "bench", tier or "gc", base_url="http://fake",
+        transport=httpx.ASGITransport(app=fake),
+    )
+    if tier is None:
+        client._list_bucket = TokenBucket(UNTHROTTLED, name="list")
+        client._get_bucket = TokenBucket(UNTHROTTLED, name="get")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = db_path or str(Path(tmp) / "bench.db")
+        await db.init_db()
+        for replay in data[:preloaded]:
+            await db.upsert_replay(replay["id"], replay)
+
+        server.client = client
+        status = SyncStatus(running=True)
+        start = time.perf_counter()
+        await server._do_sync(None, None, status)
+        elapsed = time.perf_counter() - start
+        await client.close()
+        log = (await db.get_sync_history(1))[0]
+
+    calls = fake.state.calls
+    upstream = calls["list"] + calls["get"]
+    return {
+        "replays": replays,
+        "preloaded": preloaded,
+        "tier": tier or "unthrottled",
+        "seconds": round(elapsed, 3),
+        "replays_per_second": round(replays / elapsed, 1) if elapsed else None,
+        "fetched": status.replays_fetched,
+        "skipped": status.replays_skipped,
+        "list_calls": calls["list"],
+        "get_calls": calls["get"],
+        "rate_limited": calls["429"],
+        "replays_per_call": round(status.replays_fetched / upstream, 3) if upstream else None,
+        **{column: round(log[column], 3) for column in db.SYNC_TELEMETRY_COLUMNS},
+        "error": status.error,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--replays", type=int, default=1000)
+    parser.add_argument("--preloaded", type=int, default=0,
+                        help="replays already in the DB before syncing")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="429 probability")
+    parser.add_argument("--tier", choices=sorted(RATE_LIMITS), default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    result = asyncio.run(run_sync_bench(
+        replays=args.replays, preloaded=args.preloaded, latency=args.latency,
+        error_rate=args.error_rate, tier=args.tier, seed=args.seed,
+    ))
+    width = max(len(k) for k in result)
+    for key, value in result.items():
+        print(f"{key:<{width}}  {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""Deterministic synthetic replays in the ballchasing.com JSON shape.
+
+Mirrors the shape of ``make_replay`` in ``tests/conftest.py`` but fills every
+stat group with plausible random values, so decode/aggregate costs resemble
+real data.
+"""
+from __future__ import annotations
+
+import random
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+
+ME = "BenchPlayer"
+
+MAPS = [
+    "DFH Stadium", "Mannfield", "Champions Field", "Urban Central",
+    "Beckwith Park", "Utopia Coliseum", "Wasteland", "Neo Tokyo",
+    "AquaDome", "Starbase ARC", "Farmstead", "Salty Shores",
+]
+
+# Relative frequency of 0..7 goals for one team
+GOAL_WEIGHTS = [14, 22, 22, 17, 12, 7, 4, 2]
+
+PLAYLISTS = {
+    1: ["Ranked Duel", "Duel"],
+    2: ["Ranked Doubles", "Doubles"],
+    3: ["Ranked Standard", "Standard"],
+}
+
+
+def _player_stats(rng: random.Random) -> dict:
+    shots = rng.randint(0, 8)
+    goals = rng.randint(0, min(shots, 4))
+    return {
+        "core": {
+            "shots": shots, "shots_against": rng.randint(0, 8),
+            "goals": goals, "goals_against": rng.randint(0, 5),
+            "saves": rng.randint(0, 5), "assists": rng.randint(0, 3),
+            "score": rng.randint(50, 900),
+            "shooting_percentage": round(goals / shots * 100, 1) if shots else 0.0,
+        },
+        "boost": {
+            "bpm": round(rng.uniform(250, 550), 1), "bcpm": round(rng.uniform(250, 550), 1),
+            "avg_amount": round(rng.uniform(25, 65), 1),
+            "amount_collected": rng.randint(800, 3000), "amount_stolen": rng.randint(0, 800),
+            "amount_collected_big": rng.randint(400, 2000),
+            "amount_collected_small": rng.randint(200, 1200),
+            "count_collected_big": rng.randint(5, 25), "count_collected_small": rng.randint(10, 70),
+            "time_zero_boost": round(rng.uniform(10, 80), 1),
+            "time_full_boost": round(rng.uniform(5, 60), 1),
+            "percent_zero_boost": round(rng.uniform(3, 25), 1),
+            "percent_full_boost": round(rng.uniform(2, 20), 1),
+        },
+        "movement": {
+            "avg_speed": round(rng.gauss(1500, 120), 1),
+            "total_distance": rng.randint(350_000, 650_000),
+            "time_supersonic_speed": round(rng.uniform(15, 70), 1),
+            "time_boost_speed": round(rng.uniform(80, 160), 1),
+            "time_slow_speed": round(rng.uniform(80, 160), 1),
+            "time_ground": round(rng.uniform(150, 240), 1),
+            "time_low_air": round(rng.uniform(40, 100), 1),
+            "time_high_air": round(rng.uniform(2, 20), 1),
+            "time_powerslide": round(rng.uniform(2, 12), 1),
+            "count_powerslide": rng.randint(10, 80),
+        },
+        "positioning": {
+            "avg_distance_to_ball": round(rng.gauss(2800, 250), 1),
+            "avg_distance_to_ball_possession": round(rng.gauss(2600, 250), 1),
+            "avg_distance_to_ball_no_possession": round(rng.gauss(3000, 250), 1),
+            "percent_behind_ball": round(rng.gauss(62, 6), 1),
+            "time_defensive_third": round(rng.uniform(100, 170), 1),
+            "time_neutral_third": round(rng.uniform(60, 110), 1),
+            "time_offensive_third": round(rng.uniform(40, 90), 1),
+            "time_defensive_half": round(rng.uniform(150, 230), 1),
+            "time_offensive_half": round(rng.uniform(70, 130), 1),
+        },
+        "demo": {"inflicted": rng.randint(0, 3), "taken": rng.randint(0, 3)},
+    }
+
+
+# Further fields the real replay detail response carries per player stat group
+# and per team (ballchasing.com/doc/api). Emitted only with full=True, to
+# measure storage on real-shaped payloads; analytics read none of them.
+FULL_PLAYER_FIELDS: dict[str, tuple[str, ...]] = {
+    "core": ("mvp",),
+    "boost": (
+        "amount_stolen_big", "amount_stolen_small", "count_stolen_big", "count_stolen_small",
+        "amount_overfill_stolen", "percent_boost_0_25", "percent_boost_25_50",
+        "percent_boost_50_75", "percent_boost_75_100",
+    ),
+    "movement": (
+        "avg_powerslide_duration", "avg_speed_percentage", "percent_boost_speed",
+        "percent_supersonic_speed", "percent_low_air", "percent_high_air",
+    ),
+    "positioning": (
+        "avg_distance_to_mates", "goals_against_while_last_defender",
+        "percent_defensive_third", "percent_offensive_third", "percent_neutral_third",
+        "percent_defensive_half", "percent_offensive_half", "percent_infront_ball",
+        "percent_most_back", "percent_most_forward", "percent_closest_to_ball",
+        "percent_farthest_from_ball",
+    ),
+}
+FULL_TEAM_FIELDS: dict[str, tuple[str, ...]] = {
+    "core": (
+        "shots", "shots_against", "goals_against", "saves", "assists", "score",
+        "shooting_percentage",
+    ),
+    "boost": (
+        "bpm", "bcpm", "avg_amount", "amount_collected", "amount_stolen",
+        "amount_collected_big", "amount_stolen_big", "amount_collected_small",
+        "amount_stolen_small", "count_collected_big", "count_stolen_big",
+        "count_collected_small", "count_stolen_small", "amount_overfill",
+        "amount_overfill_stolen", "amount_used_while_supersonic", "time_zero_boost",
+        "time_full_boost", "time_boost_0_25", "time_boost_25_50", "time_boost_50_75",
+        "time_boost_75_100",
+    ),
+    "movement": (
+        "total_distance", "time_supersonic_speed", "time_boost_speed", "time_slow_speed",
+        "time_ground", "time_low_air", "time_high_air", "time_powerslide",
+        "count_powerslide",
+    ),
+    "positioning": (
+        "time_defensive_third", "time_neutral_third", "time_offensive_third",
+        "time_defensive_half", "time_offensive_half", "time_behind_ball",
+        "time_infront_ball", "avg_distance_to_ball", "avg_distance_to_ball_possession",
+        "avg_distance_to_ball_no_possession", "avg_distance_to_mates",
+    ),
+    "demo": ("inflicted", "taken"),
+}
+RANKS = ["Gold III", "Platinum I", "Platinum II", "Platinum III", "Diamond I", "Diamond II"]
+
+
+def _fill(rng: random.Random, fields: dict[str, tuple[str, ...]]) -> dict:
+    return {
+        group: {name: round(rng.uniform(0, 500), 2) for name in names}
+        for group, names in fields.items()
+    }
+
+
+def _rank(rng: random.Random) -> dict:
+    name = rng.choice(RANKS)
+    return {"id": name.lower().replace(" ", "-"), "tier": RANKS.index(name) + 9,
+            "division": rng.randint(1, 4), "name": f"{name} Division {rng.randint(1, 4)}"}
+
+
+def make_player(rng: random.Random, name: str, platform_id: str, full: bool = False) -> dict:
+    stats = _player_stats(rng)
+    # Groups the real API sends that analytics never read (see db.slim_replay)
+    stats["positioning"].update({
+        f"time_{zone}": round(rng.uniform(10, 120), 2)
+        for zone in ("behind_ball", "infront_ball", "most_back", "most_forward",
+                     "closest_to_ball", "farthest_from_ball")
+    })
+    stats["boost"]["amount_overfill"] = rng.randint(0, 600)
+    stats["boost"]["amount_used_while_supersonic"] = rng.randint(0, 500)
+    stats["boost"].update({f"time_boost_{b}": round(rng.uniform(10, 90), 2)
+                           for b in ("0_25", "25_50", "50_75", "75_100")})
+    stats["movement"]["percent_slow_speed"] = round(rng.uniform(30, 55), 2)
+    stats["movement"]["percent_ground"] = round(rng.uniform(45, 70), 2)
+    player = {
+        "start_time": 0,
+        "end_time": round(rng.uniform(300, 480), 5),
+        "name": name,
+        "id": {"platform": "steam", "id": platform_id},
+        "car_id": rng.randint(20, 4500),
+        "car_name": rng.choice(["Octane", "Fennec", "Dominus", "Breakout", "Merc"]),
+        "camera": {
+            "fov": rng.randint(100, 110), "height": rng.randint(90, 110),
+            "pitch": rng.randint(-5, -3), "distance": rng.randint(250, 280),
+            "stiffness": round(rng.uniform(0.3, 0.7), 1),
+            "swivel_speed": round(rng.uniform(3, 7), 1),
+            "transition_speed": round(rng.uniform(1, 1.5), 1),
+        },
+        "steering_sensitivity": round(rng.uniform(1, 2), 1),
+        "stats": stats,
+    }
+    if full:
+        for group, extra in _fill(rng, FULL_PLAYER_FIELDS).items():
+            stats[group].update(extra)
+        player["rank"] = _rank(rng)
+        player["mvp"] = False
+    return player
+
+
+def _ball_stats(rng: random.Random) -> dict:
+    return {
+        "possession_time": round(rng.uniform(60, 200), 2),
+        "time_in_side": round(rng.uniform(100, 220), 2),
+    }
+
+
+def make_replay(
+    rng: random.Random,
+    replay_id: str,
+    date: datetime,
+    team_size: int,
+    blue_names: list[str],
+    orange_names: list[str],
+    full: bool = False,
+) -> dict:
+    """Build one replay; goals are drawn so overtime and ties occur naturally.
+
+    full=True adds the rest of the real detail response: full team stat
+    groups, ranks and match metadata.
+    """
+    blue_goals, orange_goals = rng.choices(range(8), weights=GOAL_WEIGHTS, k=2)
+    overtime = blue_goals == orange_goals or rng.random() < 0.03
+    if blue_goals == orange_goals:
+        # Ranked games cannot end tied; overtime decides them
+        if rng.random() < 0.5:
+            blue_goals += 1
+        else:
+            orange_goals += 1
+    replay = {
+        "id": replay_id,
+        "title": f"{date:%Y-%m-%d} {PLAYLISTS[team_size][0]}",
+        "date": date.isoformat(),
+        "map_name": rng.choice(MAPS),
+        "playlist_name": rng.choice(PLAYLISTS[team_size]),
+        "duration": rng.randint(300, 300 + (180 if overtime else 30)),
+        "overtime": overtime,
+        "link": f"https://ballchasing.com/api/replays/{replay_id}",
+        "rocket_league_id": f"{rng.getrandbits(128):032X}",
+        "match_guid": f"{rng.getrandbits(128):032X}",
+        "recorder": "76561197971332940",
+        "uploader": {
+            "steam_id": "76561197971332940", "name": ME,
+            "profile_url": "https://steamcommunity.com/id/benchplayer/",
+            "avatar": "https://avatars.steamstatic.com/0000000000000000_full.jpg",
+        },
+        "status": "ok",
+        "created": date.isoformat(),
+        "visibility": "public",
+        "season": 14,
+        "season_type": "free2play",
+        "server": {"name": f"EU{rng.randint(100, 999)}-Ranked", "region": "Europe"},
+        "groups": [],
+        "blue": {
+            "color": "blue",
+            "players": [make_player(rng, n, f"id-{n}", full) for n in blue_names],
+            "stats": {"core": {"goals": blue_goals}, "ball": _ball_stats(rng)},
+        },
+        "orange": {
+            "color": "orange",
+            "players": [make_player(rng, n, f"id-{n}", full) for n in orange_names],
+            "stats": {"core": {"goals": orange_goals}, "ball": _ball_stats(rng)},
+        },
+    }
+    if full:
+        for color in ("blue", "orange"):
+            for group, extra in _fill(rng, FULL_TEAM_FIELDS).items():
+                replay[color]["stats"].setdefault(group, {}).update(extra)
+        replay.update({
+            "map_code": replay["map_name"].lower().replace(" ", "_") + "_p",
+            "match_type": "Online",
+            "team_size": team_size,
+            "playlist_id": f"ranked-{('duels', 'doubles', 'standard')[team_size - 1]}",
+            "date_has_timezone": True,
+            "overtime_seconds": replay["duration"] - 300 if overtime else 0,
+            "min_rank": _rank(rng),
+            "max_rank": _rank(rng),
+        })
+    return replay
+
+
+def iter_replays(
+    count: int,
+    seed: int = 0,
+    end: datetime | None = None,
+    games_per_day: int = 12,
+    teammates: int = 4,
+    opponents: int = 5000,
+    full: bool = False,
+) -> Iterator[dict]:
+    """Yield count replays, newest first, spread back in time from end.
+
+    "Me" is always present; teammates come from a small pool and opponents
+    from a large one, matching what a real uploader's history looks like.
+    Replays are built one at a time, so large counts stay out of memory.
+    """
+    rng = random.Random(seed)
+    end = end or datetime(2026, 1, 1, tzinfo=timezone.utc)
+    mates = [f"Mate{i}" for i in range(teammates)]
+    opps = [f"Opp{i}" for i in range(opponents)]
+    step = timedelta(days=1) / games_per_day
+
+    for i in range(count):
+        team_size = rng.choices([1, 2, 3], weights=[1, 6, 3])[0]
+        mine = [ME, *rng.sample(mates, team_size - 1)]
+        theirs = rng.sample(opps, team_size)
+        blue, orange = (mine, theirs) if rng.random() < 0.5 else (theirs, mine)
+        date = end - step * i - timedelta(seconds=rng.randint(0, 600))
+        yield make_replay(
+            rng, f"synthetic-{seed}-{i:07d}", date, team_size, blue, orange, full
+        )
+
+
+def generate_replays(count: int, seed: int = 0, **kwargs) -> list[dict]:
+    """iter_replays as a list."""
+    return list(iter_replays(count, seed, **kwargs))
@@ -1,12 +1,155 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import functools
+import hashlib
 import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from collections.abc import AsyncIterator
 from datetime import datetime, timedelta, timezone
 
 import aiosqlite
+import orjson
+
+import metrics
+import profiling
+import sync_ranges
+from models import AggregatedStats
 
 DB_PATH = "ballchasing.db"
 
+# Codec for newly written replay payloads: "json", "zlib" or "zdict" (zlib
+# with a preset dictionary trained from stored replays). Existing rows keep
+# their own codec tag until migrate_replay_codec() re-encodes them.
+REPLAY_CODEC = os.environ.get("REPLAY_CODEC", "zlib")
+ZLIB_LEVEL = 6
+# zlib only uses the last 32 KiB of a preset dictionary
+ZDICT_SIZE = 32 * 1024
+
+# The hot replays.data column holds only what analytics read (slim_replay);
+# the untouched API response lives in replay_raw. Bump SLIM_VERSION when the
+# projection changes and split_raw_replays() rebuilds older rows.
+SLIM_VERSION = 1
+SLIM_KEYS = ("id", "title", "date", "map_name", "playlist_name", "duration", "overtime")
+# Player stat fields kept per group: everything AggregatedStats sums, plus
+# percent_behind_ball for the scoreline, games and correlation views
+SLIM_STAT_FIELDS: dict[str, frozenset[str]] = {
+    group: frozenset(field.annotation.model_fields)
+    for group, field in AggregatedStats.model_fields.items()
+    if hasattr(field.annotation, "model_fields")
+}
+SLIM_STAT_FIELDS["positioning"] |= {"percent_behind_ball"}
+
+# Sort key of list_replays and its cursors: replays without a date sort last
+SORT_DATE = "COALESCE(date, '')"
+
+# Per-phase sync costs stored on each sync_log row (see SyncTelemetry)
+SYNC_TELEMETRY_COLUMNS: dict[str, str] = {
+    "list_seconds": "REAL",
+    "exists_seconds": "REAL",
+    "list_wait_seconds": "REAL",
+    "get_wait_seconds": "REAL",
+    "retry_wait_seconds": "REAL",
+    "download_seconds": "REAL",
+    "decode_seconds": "REAL",
+    "write_seconds": "REAL",
+    "bytes_received": "INTEGER",
+    "retries": "INTEGER",
+}
+
+
+# On the queries requests and sync jobs make; pollers (leases, queue checks,
+# generations) and startup migrations would only drown them out
+def _timed(fn):
+    """Time each call in rlstats_db_call_duration_seconds and as db_fetch in profiles."""
+    observed = metrics.timed(metrics.DB_SECONDS, (fn.__name__,))(fn)
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        with profiling.span("db_fetch"):
+            return await observed(*args, **kwargs)
+    return wrapper
+
+
+# HTTP validators and the response cache are keyed by the generations row:
+# counters that triggers move whenever stored replays, the player config or
+# sync_log statuses change, from any process. Other commits (rate-limit
+# tokens, job progress, lease renewals) leave them alone.
+_version_conn: tuple[str, sqlite3.Connection] | None = None
+_version_lock = threading.Lock()
+# (DB_PATH, PRAGMA data_version, generations row) as last read on _version_conn
+_generations: tuple[str, int, tuple[int, int, int]] | None = None
+# Writes made through this module; _generations is current only if it was
+# read after the last of them
+_writes = 0
+_generations_writes = -1
+
+
+def generations() -> tuple[int, int, int] | None:
+    """(replays, config, syncs) generations of DB_PATH, or None if not known to be current.
+
+    Reads memory only, never the database. refresh_generations() rereads the
+    row; writes made through this module mark it stale until then, and writes
+    from other processes show up at the next refresh (the server polls).
+    """
+    if (
+        _generations is None
+        or _generations[0] != DB_PATH
+        or _generations_writes != _writes
+    ):
+        return None
+    return _generations[2]
+
+
+def _generations_changed() -> None:
+    """Call after committing to replays, player_config or sync_log."""
+    global _writes
+    _writes += 1
+
+
+def _read_generations(db_path: str) -> tuple[str, int, tuple[int, int, int]] | None:
+    """Blocking half of refresh_generations; runs in a worker thread."""
+    global _version_conn
+    with _version_lock:
+        if _version_conn is None or _version_conn[0] != db_path:
+            if _version_conn is not None:
+                _version_conn[1].close()
+            conn = sqlite3.connect(db_path, timeout=0.05, check_same_thread=False)
+            _version_conn = (db_path, conn)
+        conn = _version_conn[1]
+        # Moves on any commit by another connection; the row is only reread then
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        cached = _generations
+        if cached is not None and cached[:2] == (db_path, data_version):
+            return cached
+        row = conn.execute(
+            "SELECT replays, config, syncs FROM generations WHERE id = 1"
+        ).fetchone()
+        return None if row is None else (db_path, data_version, tuple(row))
+
+
+async def refresh_generations() -> tuple[int, int, int] | None:
+    """Reread the generations row off the event loop; returns generations().
+
+    While a writer holds the lock the read gives up after 50 ms and the old
+    state stands, so a busy DB costs a missed 304, not a stalled loop.
+    """
+    global _generations, _generations_writes
+    db_path, writes = DB_PATH, _writes
+    try:
+        read = await asyncio.to_thread(_read_generations, db_path)
+    except sqlite3.Error:
+        return generations()
+    if read is not None and db_path == DB_PATH:
+        _generations, _generations_writes = read, writes
+    return generations()
+
 
 async def init_db() -> None:
     async with aiosqlite.connect(DB_PATH) as db:
@@ -16,7 +159,43 @@ async def init_db() -> None:
                 data JSON NOT NULL,
                 date TEXT,
                 map_name TEXT,
-                playlist_name TEXT
+                playlist_name TEXT,
+                codec TEXT NOT NULL DEFAULT 'json',
+                projection INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        cursor = await db.execute("PRAGMA table_info(replays)")
+        columns = {row[1] for row in await cursor.fetchall()}
+        if "codec" not in columns:
+            # Rows written before codecs existed are plain JSON text
+            await db.execute(
+                "ALTER TABLE replays ADD COLUMN codec TEXT NOT NULL DEFAULT 'json'"
+            )
+        if "projection" not in columns:
+            # Projection 0 means data still holds the full API response
+            await db.execute(
+                "ALTER TABLE replays ADD COLUMN projection INTEGER NOT NULL DEFAULT 0"
+            )
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_replays_date_id ON replays (date, id)"
+        )
+        # Backs keyset pagination in list_replays (scanned backwards); NULL
+        # dates sort as "" so a cursor can reach them
+        await db.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_replays_sort ON replays ({SORT_DATE}, id)"
+        )
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS replay_raw (
+                id TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                codec TEXT NOT NULL
+            )
+        """)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS codec_dicts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                data BLOB NOT NULL,
+                created_at TEXT NOT NULL
             )
         """)
         await db.execute("""
@@ -42,40 +221,421 @@ async def init_db() -> None:
                 error TEXT
             )
         """)
+        cursor = await db.execute("PRAGMA table_info(sync_log)")
+        columns = {row[1] for row in await cursor.fetchall()}
+        for column, kind in SYNC_TELEMETRY_COLUMNS.items():
+            if column not in columns:
+                # Syncs logged before telemetry existed read as zero
+                await db.execute(
+                    f"ALTER TABLE sync_log ADD COLUMN {column} {kind} NOT NULL DEFAULT 0"
+                )
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS sync_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date_after TEXT,
+                date_before TEXT,
+                incremental INTEGER NOT NULL DEFAULT 0,
+                overlap_hours INTEGER NOT NULL DEFAULT 24,
+                status TEXT NOT NULL DEFAULT 'queued',
+                created_at TEXT NOT NULL,
+                started_at TEXT,
+                completed_at TEXT,
+                replays_found INTEGER DEFAULT 0,
+                replays_fetched INTEGER DEFAULT 0,
+                replays_skipped INTEGER DEFAULT 0,
+                error TEXT
+            )
+        """)
+        cursor = await db.execute("PRAGMA table_info(sync_jobs)")
+        columns = {row[1] for row in await cursor.fetchall()}
+        if "owner" not in columns:
+            await db.execute("ALTER TABLE sync_jobs ADD COLUMN owner TEXT")
+        if "replays_total" not in columns:
+            await db.execute("ALTER TABLE sync_jobs ADD COLUMN replays_total INTEGER")
+        # At most one worker process runs syncs: the one holding this lease
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS sync_lease (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                owner TEXT,
+                expires_at REAL NOT NULL DEFAULT 0
+            )
+        """)
+        await db.execute("INSERT OR IGNORE INTO sync_lease (id) VALUES (1)")
+        # ballchasing.com token buckets shared by every worker (take_api_token)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS rate_buckets (
+                name TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                hour_start REAL NOT NULL,
+                hour_used INTEGER NOT NULL
+            )
+        """)
+        # Moved by triggers, so writes from every process count (generations())
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS generations (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                replays INTEGER NOT NULL DEFAULT 0,
+                config INTEGER NOT NULL DEFAULT 0,
+                syncs INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        await db.execute("INSERT OR IGNORE INTO generations (id) VALUES (1)")
+        triggers = [
+            (f"replays_{event.lower()}", f"{event} ON replays", "replays")
+            for event in ("INSERT", "UPDATE", "DELETE")
+        ] + [
+            ("player_config_update", "UPDATE ON player_config", "config"),
+            ("sync_log_status", "UPDATE OF status ON sync_log", "syncs"),
+            ("sync_log_delete", "DELETE ON sync_log", "syncs"),
+        ]
+        for name, event, column in triggers:
+            await db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS generations_{name} AFTER {event} BEGIN
+                    UPDATE generations SET {column} = {column} + 1 WHERE id = 1;
+                END
+            """)
+        await db.commit()
+        _generations_changed()
+        await _load_dictionaries(db)
+
+
+# --- Replay payload codecs ---
+
+# Preset dictionaries by (DB_PATH, id); decoding never has to hit the DB
+_dictionaries: dict[tuple[str, int], bytes] = {}
+
+
+async def _load_dictionaries(db: aiosqlite.Connection) -> None:
+    cursor = await db.execute("SELECT id, data FROM codec_dicts")
+    for dict_id, data in await cursor.fetchall():
+        _dictionaries[(DB_PATH, dict_id)] = data
+
+
+def _dictionary(dict_id: int) -> bytes:
+    zdict = _dictionaries.get((DB_PATH, dict_id))
+    if zdict is None:
+        # Trained by another worker process after this one loaded codec_dicts
+        with contextlib.closing(sqlite3.connect(DB_PATH)) as conn:
+            row = conn.execute("SELECT data FROM codec_dicts WHERE id = ?", (dict_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"Unknown replay dictionary: {dict_id}")
+        zdict = _dictionaries[(DB_PATH, dict_id)] = row[0]
+    return zdict
+
+
+async def refresh_dictionaries() -> bool:
+    """Load dictionaries other workers trained; True if any is known."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        await _load_dictionaries(db)
+    return _latest_dictionary() is not None
+
+
+def _latest_dictionary() -> tuple[int, bytes] | None:
+    ids = [dict_id for path, dict_id in _dictionaries if path == DB_PATH]
+    if not ids:
+        return None
+    return max(ids), _dictionaries[(DB_PATH, max(ids))]
+
+
+def encode_replay(data: dict, codec: str | None = None) -> tuple[str | bytes, str]:
+    """Serialize a replay payload, returning (stored value, codec tag).
+
+    "zdict" falls back to plain zlib until a dictionary has been trained.
+    """
+    codec = codec or REPLAY_CODEC
+    try:
+        text = orjson.dumps(data)
+    except TypeError:
+        # Integers beyond 64 bits, only ever read through the fallback below
+        text = json.dumps(data).encode()
+    if codec == "json":
+        # Kept as TEXT so json_extract() and the sqlite3 shell still read it
+        return text.decode(), "json"
+    latest = _latest_dictionary() if codec == "zdict" else None
+    if latest is None:
+        return zlib.compress(text, ZLIB_LEVEL), "zlib"
+    dict_id, zdict = latest
+    compressor = zlib.compressobj(ZLIB_LEVEL, zdict=zdict)
+    return compressor.compress(text) + compressor.flush(), f"zdict:{dict_id}"
+
+
+def replay_json(raw: str | bytes, codec: str) -> bytes:
+    """Return the JSON bytes wrapped by any codec tag, without parsing them."""
+    if codec == "json":
+        return raw.encode() if isinstance(raw, str) else raw
+    if codec == "zlib":
+        return zlib.decompress(raw)
+    if codec.startswith("zdict:"):
+        zdict = _dictionary(int(codec.split(":", 1)[1]))
+        decompressor = zlib.decompressobj(zdict=zdict)
+        return decompressor.decompress(raw) + decompressor.flush()
+    raise ValueError(f"Unknown replay codec: {codec}")
+
+
+def decode_replay(raw: str | bytes, codec: str) -> dict:
+    """Inverse of encode_replay for any codec tag found in the replays table.
+
+    Every codec wraps JSON. Rows written by the stdlib before the switch to
+    orjson mostly parse the same; the exception is NaN/Infinity, which
+    json.dumps writes and orjson rejects, so those rows go through
+    json.loads. Two differences remain: orjson reads integers beyond the
+    64-bit range as floats, and writes NaN as null, so re-encoding such a
+    row (migrate_replay_codec) is not lossless. Replays come from the API
+    as standard JSON with ids as strings, so neither occurs in practice.
+    """
+    start = time.perf_counter()
+    text = replay_json(raw, codec)
+    try:
+        data = orjson.loads(text)
+    except orjson.JSONDecodeError:
+        data = json.loads(text)
+    elapsed = time.perf_counter() - start
+    family = (codec.partition(":")[0],)
+    metrics.DECODE_SECONDS.inc(elapsed, family)
+    metrics.DECODED.inc(1, family)
+    profiling.record("json_decode", elapsed)
+    return data
+
+
+def _tokens(value, out: list[str]) -> None:
+    """Collect the JSON-encoded keys and string values of a document."""
+    if isinstance(value, dict):
+        for k, v in value.items():
+            out.append(orjson.dumps(k).decode() + ":")
+            _tokens(v, out)
+    elif isinstance(value, list):
+        for v in value:
+            _tokens(v, out)
+    elif isinstance(value, str):
+        out.append(orjson.dumps(value).decode())
+
+
+def build_dictionary(samples: list[dict], size: int = ZDICT_SIZE) -> bytes:
+    """Train a zlib preset dictionary from sample payloads.
+
+    zlib treats the dictionary as text preceding every payload and matches
+    nearer the end are cheaper, so it holds one representative document
+    followed by recurring keys and string values, most frequent last.
+    """
+    counts: Counter[str] = Counter()
+    for doc in samples:
+        tokens: list[str] = []
+        _tokens(doc, tokens)
+        counts.update(set(tokens))
+    recurring = [t for t, n in counts.most_common() if n > 1]
+    skeleton = orjson.dumps(samples[0]).decode() if samples else ""
+    return (skeleton + "".join(reversed(recurring))).encode()[-size:]
+
+
+async def train_dictionary(sample_size: int = 200) -> int | None:
+    """Store a dictionary trained on recent replays; returns its id."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(
+            "SELECT data, codec FROM replays ORDER BY date DESC LIMIT ?", (sample_size,)
+        )
+        samples = [decode_replay(raw, codec) for raw, codec in await cursor.fetchall()]
+        if not samples:
+            return None
+        cursor = await db.execute(
+            "INSERT INTO codec_dicts (data, created_at) VALUES (?, ?)",
+            (build_dictionary(samples), datetime.now(timezone.utc).isoformat()),
+        )
         await db.commit()
+        await _load_dictionaries(db)
+        return cursor.lastrowid
 
 
+async def migrate_replay_codec(
+    codec: str | None = None, batch_size: int = 200, train: bool = True
+) -> int:
+    """Re-encode rows stored with a different codec, one committed batch at a time.
+
+    Covers both the hot replays table and replay_raw. Safe to run while the
+    server is live: each batch is a short transaction and rows written
+    meanwhile already use the target codec. With `train`, "zdict" trains a
+    dictionary if none exists yet. Returns the number of rows rewritten.
+    """
+    codec = codec or REPLAY_CODEC
+    if train and codec == "zdict" and _latest_dictionary() is None:
+        await train_dictionary()
+    _, target = encode_replay({}, codec)
+    migrated = 0
+    for table in ("replays", "replay_raw"):
+        last_id = ""
+        while True:
+            async with aiosqlite.connect(DB_PATH) as db:
+                cursor = await db.execute(
+                    f"SELECT id, data, codec FROM {table} WHERE id > ? AND codec != ? "
+                    "ORDER BY id LIMIT ?",
+                    (last_id, target, batch_size),
+                )
+                rows = await cursor.fetchall()
+                if not rows:
+                    break
+                await db.executemany(
+                    f"UPDATE {table} SET data = ?, codec = ? WHERE id = ?",
+                    [
+                        (*encode_replay(decode_replay(raw, old), codec), rid)
+                        for rid, raw, old in rows
+                    ],
+                )
+                await db.commit()
+                _generations_changed()
+            migrated += len(rows)
+            last_id = rows[-1][0]
+    return migrated
+
+
+# --- Slim projection ---
+
+
+def slim_replay(data: dict) -> dict:
+    """Project a ballchasing replay down to the fields the stats endpoints read.
+
+    Keeps the summary keys, team goals and, per player, name, id and the
+    SLIM_STAT_FIELDS stats. Keys missing from the source stay missing.
+    """
+    slim = {k: data[k] for k in SLIM_KEYS if k in data}
+    for color in ("blue", "orange"):
+        team = data.get(color)
+        if team is None:
+            continue
+        slim_team: dict = {"players": []}
+        if "goals" in team.get("stats", {}).get("core", {}):
+            slim_team["stats"] = {"core": {"goals": team["stats"]["core"]["goals"]}}
+        for player in team.get("players", []):
+            slim_player = {k: player[k] for k in ("name", "id") if k in player}
+            if "stats" in player:
+                slim_player["stats"] = {
+                    group: {k: v for k, v in stats.items() if k in SLIM_STAT_FIELDS[group]}
+                    for group, stats in player["stats"].items()
+                    if group in SLIM_STAT_FIELDS
+                }
+            slim_team["players"].append(slim_player)
+        slim[color] = slim_team
+    return slim
+
+
+async def split_raw_replays(batch_size: int = 200) -> int:
+    """Move full payloads into replay_raw and slim the hot rows, in batches.
+
+    Handles rows written before the split (projection 0) and rows from an
+    older SLIM_VERSION, which are rebuilt from replay_raw. Returns the number
+    of rows rewritten.
+    """
+    migrated = 0
+    last_id = ""
+    while True:
+        async with aiosqlite.connect(DB_PATH) as db:
+            cursor = await db.execute(
+                """SELECT h.id, COALESCE(r.data, h.data), COALESCE(r.codec, h.codec)
+                   FROM replays h LEFT JOIN replay_raw r ON r.id = h.id
+                   WHERE h.id > ? AND h.projection < ? ORDER BY h.id LIMIT ?""",
+                (last_id, SLIM_VERSION, batch_size),
+            )
+            rows = await cursor.fetchall()
+            if not rows:
+                return migrated
+            await db.executemany(
+                "INSERT OR IGNORE INTO replay_raw (id, data, codec) VALUES (?, ?, ?)", rows
+            )
+            await db.executemany(
+                "UPDATE replays SET data = ?, codec = ?, projection = ? WHERE id = ?",
+                [
+                    (*encode_replay(slim_replay(decode_replay(raw, codec))), SLIM_VERSION, rid)
+                    for rid, raw, codec in rows
+                ],
+            )
+            await db.commit()
+            _generations_changed()
+        migrated += len(rows)
+        last_id = rows[-1][0]
+
+
+@_timed
 async def replay_exists(replay_id: str) -> bool:
     async with aiosqlite.connect(DB_PATH) as db:
         cursor = await db.execute("SELECT 1 FROM replays WHERE id = ?", (replay_id,))
         return await cursor.fetchone() is not None
 
 
+def _replay_rows(replay_id: str, data: dict) -> tuple[tuple, tuple]:
+    """Rows for replays (slim projection) and replay_raw (full payload)."""
+    payload, codec = encode_replay(slim_replay(data))
+    raw, raw_codec = encode_replay(data)
+    return (
+        (
+            replay_id,
+            payload,
+            data.get("date"),
+            data.get("map_name"),
+            data.get("playlist_name"),
+            codec,
+            SLIM_VERSION,
+        ),
+        (replay_id, raw, raw_codec),
+    )
+
+
+async def _write_replays(db: aiosqlite.Connection, rows: list[tuple[tuple, tuple]]) -> None:
+    await db.executemany(
+        """INSERT OR REPLACE INTO replays
+           (id, data, date, map_name, playlist_name, codec, projection)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        [hot for hot, _ in rows],
+    )
+    await db.executemany(
+        "INSERT OR REPLACE INTO replay_raw (id, data, codec) VALUES (?, ?, ?)",
+        [raw for _, raw in rows],
+    )
+
+
+@_timed
 async def upsert_replay(replay_id: str, data: dict) -> None:
+    """Store the slim projection in replays and the full payload in replay_raw."""
+    rows = [_replay_rows(replay_id, data)]
     async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            """INSERT OR REPLACE INTO replays (id, data, date, map_name, playlist_name)
-               VALUES (?, ?, ?, ?, ?)""",
-            (
-                replay_id,
-                json.dumps(data),
-                data.get("date"),
-                data.get("map_name"),
-                data.get("playlist_name"),
-            ),
-        )
+        await _write_replays(db, rows)
+        await db.commit()
+        _generations_changed()
+
+
+@_timed
+async def upsert_replays(replays: list[dict]) -> None:
+    """upsert_replay for many replays (keyed by their "id") in one transaction."""
+    rows = [_replay_rows(data["id"], data) for data in replays]
+    async with aiosqlite.connect(DB_PATH) as db:
+        await _write_replays(db, rows)
         await db.commit()
+        _generations_changed()
 
 
+@_timed
 async def get_replay(replay_id: str) -> dict | None:
+    """Return the full API response, decoded."""
+    row = await get_replay_payload(replay_id)
+    return decode_replay(*row) if row else None
+
+
+@_timed
+async def get_replay_payload(replay_id: str) -> tuple[str | bytes, str] | None:
+    """Return the stored (payload, codec) of the full API response.
+
+    The only reader of replay_raw.
+    """
     async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute("SELECT data FROM replays WHERE id = ?", (replay_id,))
+        # Rows not yet split by split_raw_replays() still hold the full payload
+        cursor = await db.execute(
+            """SELECT COALESCE(r.data, h.data), COALESCE(r.codec, h.codec)
+               FROM replays h LEFT JOIN replay_raw r ON r.id = h.id WHERE h.id = ?""",
+            (replay_id,),
+        )
         row = await cursor.fetchone()
-        if row:
-            return json.loads(row[0])
-        return None
+        return (row[0], row[1]) if row else None
 
 
+@_timed
 async def list_replays(
     date_after: str | None = None,
     date_before: str | None = None,
@@ -83,14 +643,27 @@ async def list_replays(
     playlist: str | None = None,
     limit: int = 200,
     offset: int = 0,
+    after: tuple[str, str] | None = None,
 ) -> list[dict]:
+    """Return replays newest first, ordered by (date, id); undated ones come last.
+
+    `after` is the (date, id) of the last row of the previous page, with ""
+    for a missing date; paging with it costs the same at any depth, unlike
+    `offset`.
+    """
     conditions = []
     params: list = []
+    if after:
+        # The first term is implied by the second; it lets SQLite seek
+        conditions.append(f"{SORT_DATE} <= ? AND ({SORT_DATE}, id) < (?, ?)")
+        params.extend([after[0], *after])
+    # Written against SORT_DATE so idx_replays_sort serves filter and order;
+    # undated replays match no date bound
     if date_after:
-        conditions.append("date >= ?")
+        conditions.append(f"{SORT_DATE} >= ?")
         params.append(date_after)
     if date_before:
-        conditions.append("date <= ?")
+        conditions.append(f"{SORT_DATE} <= ? AND date IS NOT NULL")
         params.append(date_before)
     if map_name:
         conditions.append("map_name = ?")
@@ -100,15 +673,19 @@ async def list_replays(
         params.append(playlist)
 
     where = "WHERE " + " AND ".join(conditions) if conditions else ""
-    query = f"SELECT data FROM replays {where} ORDER BY date DESC LIMIT ? OFFSET ?"
+    query = (
+        f"SELECT data, codec FROM replays {where} "
+        f"ORDER BY {SORT_DATE} DESC, id DESC LIMIT ? OFFSET ?"
+    )
     params.extend([limit, offset])
 
     async with aiosqlite.connect(DB_PATH) as db:
         cursor = await db.execute(query, params)
         rows = await cursor.fetchall()
-        return [json.loads(row[0]) for row in rows]
+        return [decode_replay(raw, codec) for raw, codec in rows]
 
 
+@_timed
 async def count_replays() -> int:
     async with aiosqlite.connect(DB_PATH) as db:
         cursor = await db.execute("SELECT COUNT(*) FROM replays")
@@ -116,13 +693,52 @@ async def count_replays() -> int:
         return row[0] if row else 0
 
 
+@_timed
+async def latest_replay_date() -> str | None:
+    """Return the newest stored replay date, the high-water mark for incremental syncs."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute("SELECT MAX(date) FROM replays")
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+
+@_timed
 async def all_replay_data() -> list[dict]:
     async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute("SELECT data FROM replays ORDER BY date DESC")
+        cursor = await db.execute("SELECT data, codec FROM replays ORDER BY date DESC")
         rows = await cursor.fetchall()
-        return [json.loads(row[0]) for row in rows]
+        return [decode_replay(raw, codec) for raw, codec in rows]
 
 
+async def iter_replay_data(batch_size: int = 500) -> AsyncIterator[dict]:
+    """Yield replays newest first, walking idx_replays_sort in batches.
+
+    Unlike all_replay_data, only one batch is decoded and held at a time.
+    Each batch is its own keyset query, read to the end before anything is
+    yielded, so no read lock is held while the consumer works and writers
+    (sync, token buckets) are never blocked by a slow reader.
+    """
+    after: tuple[str, str] | None = None
+    while True:
+        where, params = "", []
+        if after is not None:
+            where = f"WHERE {SORT_DATE} <= ? AND ({SORT_DATE}, id) < (?, ?)"
+            params = [after[0], *after]
+        async with aiosqlite.connect(DB_PATH) as db:
+            async with db.execute(
+                f"""SELECT {SORT_DATE}, id, data, codec FROM replays {where}
+                    ORDER BY {SORT_DATE} DESC, id DESC LIMIT ?""",
+                [*params, batch_size],
+            ) as cursor:
+                rows = await cursor.fetchall()
+        for _, _, raw, codec in rows:
+            yield decode_replay(raw, codec)
+        if len(rows) < batch_size:
+            return
+        after = (rows[-1][0], rows[-1][1])
+
+
+@_timed
 async def get_player_config() -> dict:
     async with aiosqlite.connect(DB_PATH) as db:
         cursor = await db.execute("SELECT config FROM player_config WHERE id = 1")
@@ -132,6 +748,7 @@ async def get_player_config() -> dict:
         return {}
 
 
+@_timed
 async def set_player_config(config: dict) -> None:
     async with aiosqlite.connect(DB_PATH) as db:
         await db.execute(
@@ -139,6 +756,25 @@ async def set_player_config(config: dict) -> None:
             (json.dumps(config),),
         )
         await db.commit()
+        _generations_changed()
+
+
+@_timed
+async def data_fingerprint() -> tuple[int, str]:
+    """Replays generation and a hash of the player config, to tag state kept on disk.
+
+    The config generation would do for the server's validators, but a hash
+    also matches after a config is saved unchanged or set back.
+    """
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute("""
+            SELECT g.replays, c.config
+            FROM generations g, player_config c
+            WHERE g.id = 1 AND c.id = 1
+        """)
+        generation, config = await cursor.fetchone()
+    canonical = orjson.dumps(json.loads(config), option=orjson.OPT_SORT_KEYS)
+    return generation, hashlib.blake2b(canonical, digest_size=12).hexdigest()
 
 
 # --- Sync log ---
@@ -156,9 +792,11 @@ async def clean_stale_syncs() -> int:
             (now,),
         )
         await conn.commit()
+        _generations_changed()
         return cursor.rowcount
 
 
+@_timed
 async def create_sync_log(date_after: str | None, date_before: str | None) -> int:
     now = datetime.now(timezone.utc).isoformat()
     async with aiosqlite.connect(DB_PATH) as db:
@@ -171,6 +809,7 @@ async def create_sync_log(date_after: str | None, date_before: str | None) -> in
         return cursor.lastrowid  # type: ignore[return-value]
 
 
+@_timed
 async def complete_sync_log(
     log_id: int,
     status: str,
@@ -178,20 +817,27 @@ async def complete_sync_log(
     replays_fetched: int,
     replays_skipped: int,
     error: str | None = None,
+    telemetry: dict | None = None,
 ) -> None:
+    """Close a sync_log entry; `telemetry` maps SYNC_TELEMETRY_COLUMNS to values."""
     now = datetime.now(timezone.utc).isoformat()
+    telemetry = {k: v for k, v in (telemetry or {}).items() if k in SYNC_TELEMETRY_COLUMNS}
+    assignments = "".join(f", {column} = ?" for column in telemetry)
     async with aiosqlite.connect(DB_PATH) as db:
         await db.execute(
-            """UPDATE sync_log
+            f"""UPDATE sync_log
                SET completed_at = ?, status = ?,
                    replays_found = ?, replays_fetched = ?, replays_skipped = ?,
-                   error = ?
+                   error = ?{assignments}
                WHERE id = ?""",
-            (now, status, replays_found, replays_fetched, replays_skipped, error, log_id),
+            (now, status, replays_found, replays_fetched, replays_skipped, error,
+             *telemetry.values(), log_id),
         )
         await db.commit()
+        _generations_changed()
 
 
+@_timed
 async def get_sync_history(limit: int = 20) -> list[dict]:
     async with aiosqlite.connect(DB_PATH) as db:
         db.row_factory = aiosqlite.Row
@@ -203,6 +849,307 @@ async def get_sync_history(limit: int = 20) -> list[dict]:
         return [dict(row) for row in rows]
 
 
+# --- Sync jobs ---
+
+
+@_timed
+async def enqueue_sync_job(
+    date_after: str | None,
+    date_before: str | None,
+    incremental: bool = False,
+    overlap_hours: int = 24,
+) -> int:
+    """Queue a sync job, folding it into an overlapping queued job when possible.
+
+    Incremental jobs resolve their start bound when they run, so one queued
+    incremental job covers any number of requests; it keeps the largest
+    overlap_hours asked for. Range jobs are merged with every queued range
+    job they overlap or touch; the survivor is widened to the union and the
+    rest are cancelled. The lookup and the write share one IMMEDIATE
+    transaction, so concurrent requests (from any worker) cannot both insert.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        await db.execute("BEGIN IMMEDIATE")
+        cursor = await db.execute(
+            "SELECT id, date_after, date_before, incremental FROM sync_jobs "
+            "WHERE status = 'queued' ORDER BY id"
+        )
+        queued = await cursor.fetchall()
+
+        if incremental:
+            job = next((j for j in queued if j["incremental"]), None)
+            if job is not None:
+                await db.execute(
+                    "UPDATE sync_jobs SET overlap_hours = MAX(overlap_hours, ?) WHERE id = ?",
+                    (overlap_hours, job["id"]),
+                )
+                await db.commit()
+                return job["id"]
+        else:
+            requested = sync_ranges.to_interval(date_after, date_before)
+            overlapping = [
+                job for job in queued
+                if not job["incremental"]
+                and len(sync_ranges.merge([
+                    requested, sync_ranges.to_interval(job["date_after"], job["date_before"]),
+                ])) == 1
+            ]
+            if overlapping:
+                (start, end), = sync_ranges.merge([
+                    requested,
+                    *(sync_ranges.to_interval(j["date_after"], j["date_before"])
+                      for j in overlapping),
+                ])
+                survivor = overlapping[0]["id"]
+                await db.execute(
+                    "UPDATE sync_jobs SET date_after = ?, date_before = ? WHERE id = ?",
+                    (sync_ranges.format_bound(start), sync_ranges.format_bound(end), survivor),
+                )
+                await db.executemany(
+                    """UPDATE sync_jobs SET status = 'cancelled', completed_at = ?, error = ?
+                       WHERE id = ?""",
+                    [(now, f"Merged into job {survivor}", j["id"]) for j in overlapping[1:]],
+                )
+                await db.commit()
+                return survivor
+
+        cursor = await db.execute(
+            """INSERT INTO sync_jobs
+                   (date_after, date_before, incremental, overlap_hours, status, created_at)
+               VALUES (?, ?, ?, ?, 'queued', ?)""",
+            (date_after, date_before, int(incremental), overlap_hours, now),
+        )
+        await db.commit()
+        return cursor.lastrowid  # type: ignore[return-value]
+
+
+@_timed
+async def get_sync_job(job_id: int) -> dict | None:
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute("SELECT * FROM sync_jobs WHERE id = ?", (job_id,))
+        row = await cursor.fetchone()
+        return dict(row) if row else None
+
+
+@_timed
+async def list_sync_jobs(status: str | None = None, limit: int = 50) -> list[dict]:
+    """Return jobs newest first, or queued jobs in run order when status='queued'."""
+    order = "ASC" if status == "queued" else "DESC"
+    where = "WHERE status = ?" if status else ""
+    params: list = [status] if status else []
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            f"SELECT * FROM sync_jobs {where} ORDER BY id {order} LIMIT ?",
+            [*params, limit],
+        )
+        rows = await cursor.fetchall()
+        return [dict(row) for row in rows]
+
+
+@_timed
+async def count_sync_jobs(status: str) -> int:
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute("SELECT COUNT(*) FROM sync_jobs WHERE status = ?", (status,))
+        return (await cursor.fetchone())[0]
+
+
+@_timed
+async def claim_next_sync_job(owner: str | None = None) -> dict | None:
+    """Atomically mark the oldest queued job as running (by `owner`) and return it."""
+    now = datetime.now(timezone.utc).isoformat()
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            """UPDATE sync_jobs SET status = 'running', started_at = ?, owner = ?
+               WHERE id = (
+                   SELECT id FROM sync_jobs WHERE status = 'queued' ORDER BY id LIMIT 1
+               )
+               RETURNING *""",
+            (now, owner),
+        )
+        row = await cursor.fetchone()
+        await db.commit()
+        return dict(row) if row else None
+
+
+@_timed
+async def update_sync_job_progress(
+    job_id: int,
+    replays_total: int | None,
+    replays_found: int,
+    replays_fetched: int,
+    replays_skipped: int,
+) -> None:
+    """Persist a running job's counters so every worker can report them."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute(
+            """UPDATE sync_jobs
+               SET replays_total = ?, replays_found = ?, replays_fetched = ?,
+                   replays_skipped = ?
+               WHERE id = ? AND status = 'running'""",
+            (replays_total, replays_found, replays_fetched, replays_skipped, job_id),
+        )
+        await db.commit()
+
+
+@_timed
+async def finish_sync_job(
+    job_id: int,
+    status: str,
+    replays_found: int = 0,
+    replays_fetched: int = 0,
+    replays_skipped: int = 0,
+    error: str | None = None,
+) -> None:
+    now = datetime.now(timezone.utc).isoformat()
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute(
+            """UPDATE sync_jobs
+               SET completed_at = ?, status = ?,
+                   replays_found = ?, replays_fetched = ?, replays_skipped = ?,
+                   error = ?
+               WHERE id = ?""",
+            (now, status, replays_found, replays_fetched, replays_skipped, error, job_id),
+        )
+        await db.commit()
+
+
+@_timed
+async def cancel_sync_job(job_id: int, reason: str = "Cancelled") -> bool:
+    """Cancel a job that has not started yet. Returns False if it was not queued."""
+    now = datetime.now(timezone.utc).isoformat()
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(
+            """UPDATE sync_jobs SET status = 'cancelled', completed_at = ?, error = ?
+               WHERE id = ? AND status = 'queued'""",
+            (now, reason, job_id),
+        )
+        await db.commit()
+        return cursor.rowcount > 0
+
+
+async def requeue_interrupted_jobs() -> int:
+    """Put jobs that were running when the server stopped back on the queue."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(
+            "UPDATE sync_jobs SET status = 'queued', started_at = NULL "
+            "WHERE status = 'running'"
+        )
+        await db.commit()
+        return cursor.rowcount
+
+
+async def sync_work_pending() -> bool:
+    """True when jobs are queued, or left 'running' by a worker that may have died."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(
+            "SELECT EXISTS (SELECT 1 FROM sync_jobs WHERE status IN ('queued', 'running'))"
+        )
+        return bool((await cursor.fetchone())[0])
+
+
+# --- Sync lease ---
+
+
+async def acquire_sync_lease(owner: str, seconds: float) -> bool:
+    """Take or renew the sync lease for `seconds`; False while another owner holds it."""
+    now = time.time()
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(
+            """UPDATE sync_lease SET owner = ?, expires_at = ?
+               WHERE id = 1 AND (owner IS NULL OR owner = ? OR expires_at < ?)""",
+            (owner, now + seconds, owner, now),
+        )
+        await db.commit()
+        return cursor.rowcount > 0
+
+
+async def release_sync_lease(owner: str) -> None:
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute(
+            "UPDATE sync_lease SET owner = NULL, expires_at = 0 WHERE id = 1 AND owner = ?",
+            (owner,),
+        )
+        await db.commit()
+
+
+async def get_sync_lease() -> dict | None:
+    """The live lease as {owner, expires_at}, or None when nobody holds it."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(
+            "SELECT owner, expires_at FROM sync_lease WHERE id = 1 AND expires_at >= ?",
+            (time.time(),),
+        )
+        row = await cursor.fetchone()
+        return {"owner": row[0], "expires_at": row[1]} if row and row[0] else None
+
+
+# --- Shared rate limits ---
+
+
+@_timed
+async def take_api_token(
+    name: str, per_second: float, per_hour: int | None, take: bool = True
+) -> dict:
+    """Refill bucket `name` and, with `take`, spend one token from it.
+
+    The same token-bucket arithmetic as ballchasing_client.TokenBucket, on
+    state every worker process shares. Returns the bucket after the call as
+    {tokens, hour_used, hour_start, wait}; wait is 0 when a token was taken,
+    otherwise the seconds until one could be.
+    """
+    async with aiosqlite.connect(DB_PATH) as db:
+        if take:
+            # Take the write lock up front so two workers cannot spend one token
+            await db.execute("BEGIN IMMEDIATE")
+        cursor = await db.execute(
+            "SELECT tokens, updated_at, hour_start, hour_used FROM rate_buckets WHERE name = ?",
+            (name,),
+        )
+        row = await cursor.fetchone()
+        now = time.time()
+        if row is None:
+            tokens, hour_start, hour_used = per_second, now, 0
+        else:
+            tokens = min(per_second, row[0] + (now - row[1]) * per_second)
+            hour_start, hour_used = row[2], row[3]
+            if now - hour_start >= 3600:
+                hour_start, hour_used = now, 0
+        wait = 0.0
+        if take:
+            if per_hour is not None and hour_used >= per_hour:
+                wait = max(3600 - (now - hour_start), 0.001)
+            elif tokens >= 1:
+                tokens -= 1
+                hour_used += 1
+            else:
+                wait = (1 - tokens) / per_second
+            await db.execute(
+                """INSERT OR REPLACE INTO rate_buckets
+                   (name, tokens, updated_at, hour_start, hour_used) VALUES (?, ?, ?, ?, ?)""",
+                (name, tokens, now, hour_start, hour_used),
+            )
+            await db.commit()
+        return {"tokens": tokens, "hour_used": hour_used, "hour_start": hour_start, "wait": wait}
+
+
+async def seed_api_usage(name: str, hour_used: int) -> None:
+    """Start a shared bucket's hourly count at `hour_used` unless it already exists."""
+    now = time.time()
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute(
+            """INSERT OR IGNORE INTO rate_buckets
+               (name, tokens, updated_at, hour_start, hour_used) VALUES (?, 0, ?, ?, ?)""",
+            (name, now, now, hour_used),
+        )
+        await db.commit()
+
+
+@_timed
 async def get_replay_date_counts() -> dict[str, int]:
     """Return replay counts per day as {YYYY-MM-DD: count}."""
     async with aiosqlite.connect(DB_PATH) as db:
@@ -214,6 +1161,7 @@ async def get_replay_date_counts() -> dict[str, int]:
         return {row[0]: row[1] for row in rows}
 
 
+@_timed
 async def get_synced_ranges() -> list[dict]:
     """Return all completed sync date ranges."""
     async with aiosqlite.connect(DB_PATH) as db:
@@ -225,6 +1173,7 @@ async def get_synced_ranges() -> list[dict]:
         return [{"date_after": row[0], "date_before": row[1]} for row in rows]
 
 
+@_timed
 async def find_covering_sync(
     date_after: str | None, date_before: str | None
 ) -> dict | None:
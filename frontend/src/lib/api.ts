@@ -2,6 +2,9 @@
 
 export interface SyncStatus {
   running: boolean;
+  job_id: number | null;
+  queued: number;
+  replays_total: number | null;
   replays_found: number;
   replays_fetched: number;
   replays_skipped: number;
@@ -109,7 +112,8 @@ export interface ReplayPlayer {
   name: string;
   role: string;
   team: string;
-  stats: Record<string, unknown>;
+  /** Absent when requested with summary: true; trimmed by fields. */
+  stats?: Record<string, Record<string, unknown>>;
 }
 
 export interface ReplayDetail {
@@ -154,10 +158,55 @@ export interface GameAnalysisRow {
 
 // --- Helpers ---
 
-async function get<T>(url: string): Promise<T> {
-  const res = await fetch(url);
+// Analysis routes send an ETag that only changes after a sync or a config
+// edit. The last body per URL is kept here and revalidated with
+// If-None-Match, so an unchanged result costs a 304 instead of a recompute.
+interface Validated {
+  etag: string;
+  text: string;
+  next: string | null;
+}
+
+const MAX_VALIDATED = 64;
+const validated = new Map<string, Validated>();
+
+async function fetchText(url: string, accept?: string): Promise<{ text: string; next: string | null }> {
+  const key = accept ? `${accept} ${url}` : url;
+  const cached = validated.get(key);
+  const headers: Record<string, string> = {};
+  if (accept) headers.Accept = accept;
+  if (cached) headers['If-None-Match'] = cached.etag;
+  // no-store: this map is the cache, so the browser must pass 304s through
+  const res = await fetch(url, { headers, cache: 'no-store' });
+  if (res.status === 304 && cached) {
+    validated.delete(key);
+    validated.set(key, cached);
+    return cached;
+  }
   if (!res.ok) throw new Error(`${res.status}: ${await res.text()}`);
-  return res.json();
+  const entry = { text: await res.text(), next: res.headers.get('X-Next-Cursor') };
+  const etag = res.headers.get('ETag');
+  validated.delete(key);
+  if (etag) {
+    validated.set(key, { etag, ...entry });
+    if (validated.size > MAX_VALIDATED) validated.delete(validated.keys().next().value!);
+  }
+  return entry;
+}
+
+async function get<T>(url: string): Promise<T> {
+  return JSON.parse((await fetchText(url)).text);
+}
+
+export interface Page<T> {
+  items: T[];
+  /** Opaque cursor for the following page; null on the last page. */
+  next: string | null;
+}
+
+async function getPage<T>(url: string): Promise<Page<T>> {
+  const { text, next } = await fetchText(url);
+  return { items: JSON.parse(text), next };
 }
 
 async function post<T>(url: string): Promise<T> {
@@ -203,6 +252,10 @@ export function getRateLimits() {
 export interface SyncParams {
   replayDateAfter?: string;
   replayDateBefore?: string;
+  /** Start from the newest stored replay and stop at the first fully-known page. */
+  incremental?: boolean;
+  /** Only list the sub-ranges not covered by earlier completed syncs. */
+  skipCovered?: boolean;
 }
 
 export function getSyncPreview(params: SyncParams = {}) {
@@ -214,17 +267,95 @@ export function getSyncPreview(params: SyncParams = {}) {
 }
 
 export function startSync(params: SyncParams = {}) {
+  const q = new URLSearchParams();
+  if (params.replayDateAfter) q.set('replay-date-after', params.replayDateAfter);
+  if (params.replayDateBefore) q.set('replay-date-before', params.replayDateBefore);
+  if (params.incremental) q.set('incremental', 'true');
+  if (params.skipCovered) q.set('skip-covered', 'true');
+  const qs = q.toString();
+  return post<{ message: string; gaps: number; job_ids: number[] }>(`/api/sync${qs ? '?' + qs : ''}`);
+}
+
+export interface SyncJob {
+  id: number;
+  date_after: string | null;
+  date_before: string | null;
+  incremental: boolean;
+  overlap_hours: number;
+  status: string;
+  created_at: string;
+  started_at: string | null;
+  completed_at: string | null;
+  replays_total: number | null;
+  replays_found: number;
+  replays_fetched: number;
+  replays_skipped: number;
+  error: string | null;
+  owner: string | null;
+}
+
+export function getSyncJobs(status?: string) {
+  return get<SyncJob[]>(`/api/sync/jobs${status ? '?status=' + status : ''}`);
+}
+
+export async function cancelSyncJob(id: number) {
+  const res = await fetch(`/api/sync/jobs/${id}`, { method: 'DELETE' });
+  if (!res.ok) throw new Error(`${res.status}: ${await res.text()}`);
+  return res.json() as Promise<{ message: string }>;
+}
+
+export interface SyncRange {
+  date_after: string | null;
+  date_before: string | null;
+  known_replays: number;
+}
+
+export interface SyncPlan {
+  requested: SyncRange;
+  covered: SyncRange[];
+  gaps: SyncRange[];
+  estimated_list_calls: number;
+  full_range_list_calls: number;
+}
+
+export function getSyncPlan(params: SyncParams = {}) {
   const q = new URLSearchParams();
   if (params.replayDateAfter) q.set('replay-date-after', params.replayDateAfter);
   if (params.replayDateBefore) q.set('replay-date-before', params.replayDateBefore);
   const qs = q.toString();
-  return post<{ message: string }>(`/api/sync${qs ? '?' + qs : ''}`);
+  return get<SyncPlan>(`/api/sync/plan${qs ? '?' + qs : ''}`);
 }
 
 export function getSyncStatus() {
   return get<SyncStatus>('/api/sync/status');
 }
 
+export interface SyncProgress extends SyncStatus {
+  replays_per_second: number | null;
+  eta_seconds: number | null;
+  rate_limits: RateLimitStatus;
+}
+
+/**
+ * Subscribe to pushed sync progress from /api/sync/events. The server sends a
+ * full snapshot on connect and then only changed fields; each callback gets
+ * the merged state. Returns an unsubscribe function.
+ */
+export function subscribeSyncProgress(onUpdate: (progress: SyncProgress) => void): () => void {
+  const source = new EventSource('/api/sync/events');
+  let current: SyncProgress | null = null;
+  source.addEventListener('snapshot', (e) => {
+    current = JSON.parse((e as MessageEvent).data) as SyncProgress;
+    onUpdate(current);
+  });
+  source.addEventListener('delta', (e) => {
+    if (!current) return;
+    current = { ...current, ...JSON.parse((e as MessageEvent).data) } as SyncProgress;
+    onUpdate(current);
+  });
+  return () => source.close();
+}
+
 export interface SyncLogEntry {
   id: number;
   date_after: string | null;
@@ -236,6 +367,28 @@ export interface SyncLogEntry {
   replays_fetched: number;
   replays_skipped: number;
   error: string | null;
+  list_seconds: number;
+  exists_seconds: number;
+  list_wait_seconds: number;
+  get_wait_seconds: number;
+  retry_wait_seconds: number;
+  download_seconds: number;
+  decode_seconds: number;
+  write_seconds: number;
+  bytes_received: number;
+  retries: number;
+}
+
+/** Which resource a finished sync spent most of its time on. */
+export function syncBoundBy(entry: SyncLogEntry): string {
+  const phases: [string, number][] = [
+    ['rate limit', entry.list_wait_seconds + entry.get_wait_seconds + entry.retry_wait_seconds],
+    ['network', entry.list_seconds + entry.download_seconds],
+    ['decode', entry.decode_seconds],
+    ['SQLite', entry.exists_seconds + entry.write_seconds],
+  ];
+  const [name, seconds] = phases.reduce((a, b) => (b[1] > a[1] ? b : a));
+  return seconds > 0 ? name : '—';
 }
 
 export function getSyncHistory(limit = 20) {
@@ -270,6 +423,7 @@ export interface ReplayListParams {
   playlist?: string;
   limit?: number;
   offset?: number;
+  cursor?: string;
 }
 
 export function getReplays(params: ReplayListParams = {}) {
@@ -280,8 +434,9 @@ export function getReplays(params: ReplayListParams = {}) {
   if (params.playlist) q.set('playlist', params.playlist);
   if (params.limit) q.set('limit', String(params.limit));
   if (params.offset) q.set('offset', String(params.offset));
+  if (params.cursor) q.set('cursor', params.cursor);
   const qs = q.toString();
-  return get<ReplaySummary[]>(`/api/replays${qs ? '?' + qs : ''}`);
+  return getPage<ReplaySummary>(`/api/replays${qs ? '?' + qs : ''}`);
 }
 
 export function getReplay(id: string) {
@@ -303,14 +458,22 @@ export function getOpponentStats() {
 export interface StatsReplayParams {
   limit?: number;
   offset?: number;
+  cursor?: string;
+  /** Stat groups or group.stat paths to keep, e.g. ['core.goals', 'demo']. */
+  fields?: string[];
+  /** Skip player stats entirely. */
+  summary?: boolean;
 }
 
 export function getStatsReplays(params: StatsReplayParams = {}) {
   const q = new URLSearchParams();
   if (params.limit) q.set('limit', String(params.limit));
   if (params.offset) q.set('offset', String(params.offset));
+  if (params.cursor) q.set('cursor', params.cursor);
+  if (params.fields?.length) q.set('fields', params.fields.join(','));
+  if (params.summary) q.set('summary', 'true');
   const qs = q.toString();
-  return get<ReplayDetail[]>(`/api/stats/replays${qs ? '?' + qs : ''}`);
+  return getPage<ReplayDetail>(`/api/stats/replays${qs ? '?' + qs : ''}`);
 }
 
 export interface AnalysisFilterParams {
@@ -330,16 +493,87 @@ export function getScorelineStats(params: AnalysisFilterParams = {}) {
   return get<ScorelineRow[]>(`/api/stats/scoreline${qs ? '?' + qs : ''}`);
 }
 
-export function getGameAnalysis(params: AnalysisFilterParams = {}) {
+function analysisQuery(params: AnalysisFilterParams): URLSearchParams {
   const q = new URLSearchParams();
   if (params.teamSize != null) q.set('team-size', String(params.teamSize));
   if (params.excludeTies) q.set('exclude-ties', 'true');
   if (params.minDuration) q.set('min-duration', String(params.minDuration));
   if (params.playlists) for (const p of params.playlists) q.append('playlist', p);
-  const qs = q.toString();
+  return q;
+}
+
+export function getGameAnalysis(params: AnalysisFilterParams = {}) {
+  const qs = analysisQuery(params).toString();
   return get<GameAnalysisRow[]>(`/api/stats/games${qs ? '?' + qs : ''}`);
 }
 
+/**
+ * Stream /api/stats/games as NDJSON, calling onRows with each batch of
+ * complete lines as it arrives. Resolves once the stream ends.
+ */
+export async function streamGameAnalysis(
+  params: AnalysisFilterParams,
+  onRows: (rows: GameAnalysisRow[]) => void,
+  signal?: AbortSignal,
+): Promise<void> {
+  const qs = analysisQuery(params).toString();
+  const res = await fetch(`/api/stats/games${qs ? '?' + qs : ''}`, {
+    headers: { Accept: 'application/x-ndjson' },
+    signal,
+  });
+  if (!res.ok || !res.body) throw new Error(`${res.status}: ${await res.text()}`);
+
+  const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (value) buffer += value;
+    const end = done ? buffer.length : buffer.lastIndexOf('\n') + 1;
+    if (end > 0) {
+      const rows = buffer.slice(0, end).split('\n').filter(line => line).map(line => JSON.parse(line));
+      buffer = buffer.slice(end);
+      if (rows.length) onRows(rows);
+    }
+    if (done) return;
+  }
+}
+
+// --- Columnar responses ---
+// /api/stats/correlation sends its points as struct-of-arrays when asked for
+// COLUMNAR; these helpers turn them into typed arrays. The games table
+// streams rows instead (streamGameAnalysis).
+
+const COLUMNAR = 'application/vnd.rlstats.columnar+json';
+
+interface ColumnarBody {
+  length: number;
+  columns: Record<string, unknown[]>;
+}
+
+async function getColumnar<T>(url: string): Promise<T> {
+  return JSON.parse((await fetchText(url, COLUMNAR)).text);
+}
+
+/** Numeric column as a Float64Array; null entries and missing columns become NaN. */
+function floats(body: ColumnarBody, key: string): Float64Array {
+  const col = body.columns[key] as (number | null)[] | undefined;
+  const out = new Float64Array(body.length);
+  for (let i = 0; i < body.length; i++) out[i] = col?.[i] ?? NaN;
+  return out;
+}
+
+function ints(body: ColumnarBody, key: string): Int32Array {
+  const col = body.columns[key] as number[] | undefined;
+  return col ? Int32Array.from(col) : new Int32Array(body.length);
+}
+
+function bools(body: ColumnarBody, key: string): Uint8Array {
+  const col = body.columns[key] as boolean[] | undefined;
+  const out = new Uint8Array(body.length);
+  if (col) for (let i = 0; i < body.length; i++) out[i] = col[i] ? 1 : 0;
+  return out;
+}
+
 // --- Correlation ---
 
 export interface CorrelationPoint {
@@ -365,28 +599,72 @@ export interface RegressionLine {
   r_squared: number;
 }
 
+/** counts[i][j]: games with goal_diff goal_diff_min + i in stat bin j of bins over [x_min, x_max]. */
+export interface CorrelationDensity {
+  x_min: number;
+  x_max: number;
+  bins: number;
+  goal_diff_min: number;
+  goal_diff_max: number;
+  counts: number[][];
+}
+
 export interface CorrelationResponse {
   stat: string;
   role: string;
+  /** Every matching game; buckets and regression cover all of them even when points is sampled. */
   games: number;
   points: CorrelationPoint[];
   buckets: CorrelationBucket[];
   regression: RegressionLine;
+  density: CorrelationDensity | null;
 }
 
 export interface CorrelationParams extends AnalysisFilterParams {
   stat: string;
   role?: string;
+  /** Cap points to an evenly spaced sample by stat value. */
+  maxPoints?: number;
+  /** Return a density grid with this many stat bins instead of points. */
+  densityBins?: number;
 }
 
-export function getCorrelationStats(params: CorrelationParams) {
-  const q = new URLSearchParams();
+function correlationQuery(params: CorrelationParams): string {
+  const q = analysisQuery(params);
   q.set('stat', params.stat);
   if (params.role) q.set('role', params.role);
-  if (params.teamSize != null) q.set('team-size', String(params.teamSize));
-  if (params.excludeTies) q.set('exclude-ties', 'true');
-  if (params.minDuration) q.set('min-duration', String(params.minDuration));
-  if (params.playlists) for (const p of params.playlists) q.append('playlist', p);
-  const qs = q.toString();
-  return get<CorrelationResponse>(`/api/stats/correlation${qs ? '?' + qs : ''}`);
+  if (params.maxPoints) q.set('max-points', String(params.maxPoints));
+  if (params.densityBins) q.set('density-bins', String(params.densityBins));
+  return q.toString();
+}
+
+export function getCorrelationStats(params: CorrelationParams) {
+  return get<CorrelationResponse>(`/api/stats/correlation?${correlationQuery(params)}`);
+}
+
+export interface CorrelationPointColumns {
+  length: number;
+  stat_value: Float64Array;
+  goal_diff: Int32Array;
+  won: Uint8Array;
+}
+
+export interface CorrelationColumns extends Omit<CorrelationResponse, 'points'> {
+  points: CorrelationPointColumns;
+}
+
+export async function getCorrelationColumns(params: CorrelationParams): Promise<CorrelationColumns> {
+  const body = await getColumnar<Omit<CorrelationResponse, 'points'> & { points: ColumnarBody }>(
+    `/api/stats/correlation?${correlationQuery(params)}`,
+  );
+  const p = body.points;
+  return {
+    ...body,
+    points: {
+      length: p.length,
+      stat_value: floats(p, 'stat_value'),
+      goal_diff: ints(p, 'goal_diff'),
+      won: bools(p, 'won'),
+    },
+  };
 }
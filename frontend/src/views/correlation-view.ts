@@ -2,8 +2,8 @@ import { LitElement, html, css } from 'lit';
 import { customElement, state } from 'lit/decorators.js';
 import * as d3 from 'd3';
 import {
-  getCorrelationStats,
-  type CorrelationResponse,
+  getCorrelationColumns,
+  type CorrelationColumns,
 } from '../lib/api.js';
 import {
   analysisStyles,
@@ -84,6 +84,10 @@ const ROLE_OPTIONS = [
 
 const VALID_ROLES = ROLE_OPTIONS.map(o => o.value);
 
+// More dots than this add SVG cost without changing what the scatter shows;
+// the server samples down to it and still fits the trend line on every game.
+const MAX_SCATTER_POINTS = 2000;
+
 @customElement('correlation-view')
 export class CorrelationView extends LitElement {
   static styles = [analysisStyles, css`
@@ -183,7 +187,7 @@ export class CorrelationView extends LitElement {
     }
   `];
 
-  @state() private _data: CorrelationResponse | null = null;
+  @state() private _data: CorrelationColumns | null = null;
   @state() private _error = '';
   @state() private _loading = true;
   @state() private _stat = 'percent_behind_ball';
@@ -261,13 +265,14 @@ export class CorrelationView extends LitElement {
     this._error = '';
     try {
       const playlists = playlistsFromState(this._playlistState, this._allModes);
-      this._data = await getCorrelationStats({
+      this._data = await getCorrelationColumns({
         stat: this._stat,
         role: this._role,
         teamSize: this._teamSize,
         excludeTies: this._excludeTies,
         minDuration: this._excludeShort ? 90 : undefined,
         playlists: playlists.length ? playlists : undefined,
+        maxPoints: MAX_SCATTER_POINTS,
       });
     } catch (e) {
       this._error = String(e);
@@ -320,8 +325,8 @@ export class CorrelationView extends LitElement {
     const g = svg.append('g')
       .attr('transform', `translate(${margin.left},${margin.top})`);
 
-    const xVals = data.points.map(p => p.stat_value);
-    const yVals = data.points.map(p => p.goal_diff);
+    const xVals = data.points.stat_value;
+    const yVals = data.points.goal_diff;
 
     const xScale = d3.scaleLinear()
       .domain([d3.min(xVals)! * 0.95, d3.max(xVals)! * 1.05])
@@ -403,21 +408,21 @@ export class CorrelationView extends LitElement {
       .attr('class', 'tooltip')
       .style('display', 'none');
 
-    // Dots
+    // Dots, bound to point indices into the typed columns
     g.selectAll('circle')
-      .data(data.points)
+      .data(d3.range(data.points.length))
       .enter().append('circle')
-      .attr('cx', d => xScale(d.stat_value))
-      .attr('cy', d => yScale(d.goal_diff))
+      .attr('cx', i => xScale(xVals[i]))
+      .attr('cy', i => yScale(yVals[i]))
       .attr('r', 4.5)
-      .attr('fill', d => d.goal_diff > 0 ? '#4ade80' : d.goal_diff < 0 ? '#ef4444' : '#52525b')
+      .attr('fill', i => yVals[i] > 0 ? '#4ade80' : yVals[i] < 0 ? '#ef4444' : '#52525b')
       .attr('opacity', 0.7)
       .attr('stroke', 'none')
-      .on('mouseenter', (event: MouseEvent, d) => {
+      .on('mouseenter', (event: MouseEvent, i) => {
         const rect = chartContainer.getBoundingClientRect();
         tooltip
           .style('display', 'block')
-          .html(`${this._statLabel()}: ${Number(d.stat_value.toFixed(1))}<br>Goal diff: ${d.goal_diff > 0 ? '+' : ''}${d.goal_diff}`)
+          .html(`${this._statLabel()}: ${Number(xVals[i].toFixed(1))}<br>Goal diff: ${yVals[i] > 0 ? '+' : ''}${yVals[i]}`)
           .style('left', `${event.clientX - rect.left + 12}px`)
           .style('top', `${event.clientY - rect.top - 10}px`);
         d3.select(event.currentTarget as Element).attr('opacity', 1).attr('r', 6);
@@ -599,7 +604,8 @@ export class CorrelationView extends LitElement {
     const data = this._data;
     const r2 = data?.regression.r_squared ?? 0;
     const r2Class = r2 >= 0.3 ? 'r2-good' : r2 >= 0.1 ? 'r2-mid' : 'r2-low';
-    const wins = data?.points.filter(p => p.won).length ?? 0;
+    // Buckets cover every game; points may be a sample
+    const wins = data ? data.buckets.reduce((n, b) => n + b.wins, 0) : 0;
     const totalGames = data?.games ?? 0;
     const winRate = totalGames > 0 ? (wins / totalGames * 100).toFixed(1) : '0';
 
@@ -641,7 +647,7 @@ export class CorrelationView extends LitElement {
 
         <div class="charts">
           <div class="chart-container">
-            <h3>Stat vs Goal Differential</h3>
+            <h3>Stat vs Goal Differential${data!.points.length < totalGames ? ` (${data!.points.length} of ${totalGames} games)` : ''}</h3>
             <div class="scatter-chart"></div>
           </div>
           <div class="chart-container">
@@ -1,6 +1,6 @@
 import { LitElement, html, css } from 'lit';
 import { customElement, state } from 'lit/decorators.js';
-import { getGameAnalysis, type GameAnalysisRow } from '../lib/api.js';
+import { streamGameAnalysis, type GameAnalysisRow } from '../lib/api.js';
 import {
   analysisStyles, computeGlobalRanges, renderBarCell, sortHeader, sortBarHeader,
   renderModeBar, renderFilterBar, renderPlaylistFilter, playlistsFromState,
@@ -26,6 +26,8 @@ export class GameAnalysisView extends LitElement {
   @state() private _rows: GameAnalysisRow[] = [];
   @state() private _error = '';
   @state() private _loading = true;
+  /** Rows are still arriving; _loading clears as soon as the first batch lands. */
+  @state() private _streaming = false;
   @state() private _sortKey: SortKey = 'date';
   @state() private _sortDir: SortDir = 'desc';
   @state() private _teamSize = 2;
@@ -35,6 +37,7 @@ export class GameAnalysisView extends LitElement {
   @state() private _allModes = false;
 
   private _onRouteChanged = () => this._readURL();
+  private _abort: AbortController | null = null;
 
   connectedCallback() {
     super.connectedCallback();
@@ -45,6 +48,7 @@ export class GameAnalysisView extends LitElement {
 
   disconnectedCallback() {
     super.disconnectedCallback();
+    this._abort?.abort();
     window.removeEventListener('route-changed', this._onRouteChanged);
   }
 
@@ -84,19 +88,44 @@ export class GameAnalysisView extends LitElement {
   }
 
   private async _load() {
+    this._abort?.abort();
+    const abort = new AbortController();
+    this._abort = abort;
     this._loading = true;
+    this._streaming = true;
     this._error = '';
+    this._rows = [];
+
+    // Batches are applied at most once per frame so a fast stream does not
+    // re-render (and re-sort) the table for every network chunk.
+    let pending: GameAnalysisRow[] = [];
+    let frame = 0;
+    const flush = () => {
+      frame = 0;
+      if (abort.signal.aborted || pending.length === 0) return;
+      this._rows = this._rows.concat(pending);
+      pending = [];
+      this._loading = false;
+    };
+
     try {
-      this._rows = await getGameAnalysis({
+      await streamGameAnalysis({
         teamSize: this._teamSize,
         excludeTies: this._excludeTies,
         minDuration: this._excludeShort ? 90 : 0,
         playlists: playlistsFromState(this._playlistState, this._allModes),
-      });
+      }, rows => {
+        pending.push(...rows);
+        if (!frame) frame = requestAnimationFrame(flush);
+      }, abort.signal);
+      if (frame) cancelAnimationFrame(frame);
+      flush();
     } catch (e) {
+      if (abort.signal.aborted) return;
       this._error = String(e);
     }
     this._loading = false;
+    this._streaming = false;
   }
 
   private _setTeamSize(size: number) {
@@ -172,7 +201,7 @@ export class GameAnalysisView extends LitElement {
       <div class="error">${this._error}</div>
       <button @click=${this._load}>Retry</button>
     `;
-    if (this._rows.length === 0 && !this._loading) return html`
+    if (this._rows.length === 0 && !this._streaming) return html`
       ${renderModeBar(this._teamSize, (s) => this._setTeamSize(s))}
       ${playlistFilter}
       ${filterBar}
@@ -136,6 +136,8 @@ export class ReplaysView extends LitElement {
 
   @state() private _replays: ReplayDetail[] = [];
   @state() private _offset = 0;
+  // Keyset cursor for each page we have seen; index 0 is the first page
+  private _cursors: (string | null)[] = [null];
   @state() private _loading = true;
   @state() private _error = '';
   @state() private _hasMore = true;
@@ -185,12 +187,17 @@ export class ReplaysView extends LitElement {
     this._loading = true;
     this._error = '';
     try {
-      const data = await getStatsReplays({
-        limit: ReplaysView.PAGE_SIZE,
-        offset: this._offset,
-      });
-      this._replays = data;
-      this._hasMore = data.length === ReplaysView.PAGE_SIZE;
+      const pageIndex = Math.floor(this._offset / ReplaysView.PAGE_SIZE);
+      const cursor = this._cursors[pageIndex];
+      // Deep links land on pages we have no cursor for; fall back to offset once
+      const page = await getStatsReplays(
+        cursor || pageIndex === 0
+          ? { limit: ReplaysView.PAGE_SIZE, cursor: cursor ?? undefined, summary: true }
+          : { limit: ReplaysView.PAGE_SIZE, offset: this._offset, summary: true },
+      );
+      this._replays = page.items;
+      if (page.next) this._cursors[pageIndex + 1] = page.next;
+      this._hasMore = page.next !== null;
     } catch (e) {
       this._error = String(e);
     }
@@ -209,8 +216,8 @@ export class ReplaysView extends LitElement {
     this._loading = true;
     this._error = '';
     try {
-      const data = await getStatsReplays({ limit: 200 });
-      this._detailReplay = data.find(r => r.id === this.replayId) ?? null;
+      const page = await getStatsReplays({ limit: 200, summary: true });
+      this._detailReplay = page.items.find(r => r.id === this.replayId) ?? null;
       if (!this._detailReplay) {
         this._error = 'Replay not found';
       }
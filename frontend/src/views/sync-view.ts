@@ -1,9 +1,10 @@
 import { LitElement, html, css, nothing } from 'lit';
 import { customElement, state } from 'lit/decorators.js';
 import {
-  startSync, getSyncPreview, getSyncStatus, getSyncHistory, getSyncCoverage,
-  getRateLimits,
-  type SyncStatus, type SyncLogEntry, type SyncCoverage, type RateLimitStatus,
+  startSync, getSyncPreview, getSyncPlan, getSyncHistory, getSyncCoverage, syncBoundBy,
+  getSyncJobs, cancelSyncJob, subscribeSyncProgress,
+  type SyncProgress, type SyncLogEntry, type SyncCoverage, type SyncPlan, type SyncJob,
+  type RateLimitStatus,
 } from '../lib/api.js';
 
 /** Format YYYY-MM-DD from year/month/day numbers. */
@@ -40,6 +41,19 @@ function dayCellColor(
   return ''; // default (inherit)
 }
 
+/** Tooltip listing where a sync spent its time. */
+function phaseSummary(e: SyncLogEntry): string {
+  const s = (v: number) => `${v.toFixed(1)}s`;
+  return [
+    `list ${s(e.list_seconds)} (wait ${s(e.list_wait_seconds)})`,
+    `download ${s(e.download_seconds)} (wait ${s(e.get_wait_seconds)})`,
+    `retries ${e.retries} (${s(e.retry_wait_seconds)})`,
+    `decode ${s(e.decode_seconds)}`,
+    `exists ${s(e.exists_seconds)}, write ${s(e.write_seconds)}`,
+    `${(e.bytes_received / 1048576).toFixed(1)} MiB received`,
+  ].join('\n');
+}
+
 const MONTHS_PER_PAGE = 6;
 
 /** Compute default view start so current month is the last visible month. */
@@ -332,65 +346,69 @@ export class SyncView extends LitElement {
 
   @state() private _dateAfter = '';
   @state() private _dateBefore = '';
-  @state() private _status: SyncStatus | null = null;
+  @state() private _status: SyncProgress | null = null;
   @state() private _error = '';
-  @state() private _polling = false;
   @state() private _history: SyncLogEntry[] = [];
   @state() private _coverage: SyncCoverage | null = null;
   /** Tracks click state: 0=none, 1=start selected (waiting for end), 2=range complete */
   @state() private _selectState: 0 | 1 | 2 = 0;
   @state() private _previewCount: number | null = null;
+  @state() private _plan: SyncPlan | null = null;
   @state() private _previewing = false;
   @state() private _confirming = false;
   @state() private _viewYear = defaultViewStart().year;
   @state() private _viewMonth = defaultViewStart().month;
   @state() private _rateLimits: RateLimitStatus | null = null;
+  @state() private _queue: SyncJob[] = [];
 
-  private _pollTimer?: ReturnType<typeof setInterval>;
+  private _unsubscribe?: () => void;
+  private _lastCoverageFetch = 0;
 
   connectedCallback() {
     super.connectedCallback();
-    this._fetchStatus();
     this._fetchHistory();
     this._fetchCoverage();
-    this._fetchRateLimits();
+    this._fetchQueue();
+    this._unsubscribe = subscribeSyncProgress(p => this._onProgress(p));
   }
 
   disconnectedCallback() {
     super.disconnectedCallback();
-    this._stopPolling();
+    this._unsubscribe?.();
+    this._unsubscribe = undefined;
   }
 
-  private async _fetchStatus() {
-    try {
-      this._status = await getSyncStatus();
-      if (this._status.running && !this._polling) {
-        this._startPolling();
-      } else if (!this._status.running && this._polling) {
-        this._stopPolling();
-      }
-    } catch (e) {
-      this._error = String(e);
+  /** Apply a pushed progress update and refresh lists when jobs start or finish. */
+  private _onProgress(p: SyncProgress) {
+    const prev = this._status;
+    this._status = p;
+    this._rateLimits = p.rate_limits;
+    if (prev && (prev.job_id !== p.job_id || prev.running !== p.running)) {
+      this._fetchHistory();
+      this._fetchCoverage();
+    }
+    if (prev && prev.queued !== p.queued) {
+      this._fetchQueue();
+    }
+    // Keep the calendar roughly live without refetching on every replay
+    if (p.running && Date.now() - this._lastCoverageFetch > 5000) {
+      this._fetchCoverage();
     }
   }
 
-  private _startPolling() {
-    this._polling = true;
-    this._pollTimer = setInterval(() => {
-      this._fetchStatus();
-      this._fetchCoverage();
-      this._fetchRateLimits();
-    }, 1000);
+  private async _fetchQueue() {
+    try {
+      this._queue = await getSyncJobs('queued');
+    } catch { /* ignore */ }
   }
 
-  private _stopPolling() {
-    this._polling = false;
-    if (this._pollTimer) {
-      clearInterval(this._pollTimer);
-      this._pollTimer = undefined;
+  private async _cancelJob(id: number) {
+    try {
+      await cancelSyncJob(id);
+    } catch (e) {
+      this._error = String(e);
     }
-    this._fetchHistory();
-    this._fetchCoverage();
+    this._fetchQueue();
   }
 
   private async _fetchHistory() {
@@ -400,26 +418,23 @@ export class SyncView extends LitElement {
   }
 
   private async _fetchCoverage() {
+    this._lastCoverageFetch = Date.now();
     try {
       this._coverage = await getSyncCoverage();
     } catch { /* ignore */ }
   }
 
-  private async _fetchRateLimits() {
-    try {
-      this._rateLimits = await getRateLimits();
-    } catch { /* ignore */ }
-  }
-
   private async _triggerSync() {
     this._error = '';
     this._previewing = true;
     try {
-      const result = await getSyncPreview({
+      const range = {
         replayDateAfter: this._dateAfter || undefined,
         replayDateBefore: this._dateBefore || undefined,
-      });
+      };
+      const [result, plan] = await Promise.all([getSyncPreview(range), getSyncPlan(range)]);
       this._previewCount = result.total;
+      this._plan = plan;
     } catch (e) {
       this._error = String(e);
     } finally {
@@ -427,17 +442,31 @@ export class SyncView extends LitElement {
     }
   }
 
-  private async _confirmSync() {
+  private async _confirmSync(skipCovered = false) {
     this._error = '';
     this._confirming = true;
     try {
       await startSync({
         replayDateAfter: this._dateAfter || undefined,
         replayDateBefore: this._dateBefore || undefined,
+        skipCovered,
       });
       this._previewCount = null;
-      this._startPolling();
-      this._fetchStatus();
+      this._plan = null;
+      this._fetchQueue();
+    } catch (e) {
+      this._error = String(e);
+    } finally {
+      this._confirming = false;
+    }
+  }
+
+  private async _catchUp() {
+    this._error = '';
+    this._confirming = true;
+    try {
+      await startSync({ incremental: true });
+      this._fetchQueue();
     } catch (e) {
       this._error = String(e);
     } finally {
@@ -447,6 +476,7 @@ export class SyncView extends LitElement {
 
   private _cancelPreview() {
     this._previewCount = null;
+    this._plan = null;
   }
 
   private _onDayClick(dateStr: string) {
@@ -623,14 +653,24 @@ export class SyncView extends LitElement {
         ${this._previewCount !== null ? html`
           <div class="field" style="flex-direction: row; align-items: center; gap: 0.75rem;">
             <strong>${this._previewCount} replays</strong> found. Sync?
-            <button @click=${this._confirmSync} ?disabled=${this._confirming}>
+            <button @click=${() => this._confirmSync()} ?disabled=${this._confirming}>
               ${this._confirming ? 'Starting...' : 'Confirm'}
             </button>
+            ${this._plan && this._plan.covered.length ? html`
+              <button @click=${() => this._confirmSync(true)} ?disabled=${this._confirming || !this._plan.gaps.length}
+                title="~${this._plan.estimated_list_calls} list calls instead of ~${this._plan.full_range_list_calls}">
+                Gaps Only (${this._plan.gaps.length})
+              </button>
+            ` : ''}
             <button @click=${this._cancelPreview} ?disabled=${this._confirming}>Cancel</button>
           </div>
         ` : html`
-          <button @click=${this._triggerSync} ?disabled=${s?.running || this._previewing}>
-            ${s?.running ? 'Syncing...' : this._previewing ? 'Checking...' : 'Start Sync'}
+          <button @click=${this._triggerSync} ?disabled=${this._previewing}>
+            ${this._previewing ? 'Checking...' : s?.running ? 'Queue Sync' : 'Start Sync'}
+          </button>
+          <button @click=${this._catchUp} ?disabled=${this._confirming}
+            title="Sync everything since the newest cached replay">
+            Catch Up
           </button>
         `}
       </div>
@@ -700,11 +740,55 @@ export class SyncView extends LitElement {
               <div class="value">${s.replays_skipped}</div>
               <div class="label">Skipped</div>
             </div>
+            <div class="metric">
+              <div class="value">${s.queued}</div>
+              <div class="label">Queued</div>
+            </div>
+            ${s.running && s.replays_per_second != null ? html`
+              <div class="metric">
+                <div class="value">${s.replays_per_second.toFixed(1)}</div>
+                <div class="label">Replays/s</div>
+              </div>
+            ` : ''}
+            ${s.running && s.eta_seconds != null ? html`
+              <div class="metric">
+                <div class="value">${this._fmtReset(s.eta_seconds)}</div>
+                <div class="label">ETA</div>
+              </div>
+            ` : ''}
           </div>
           ${s.error ? html`<div class="error">${s.error}</div>` : ''}
         </div>
       ` : ''}
 
+      ${this._queue.length ? html`
+        <div class="history">
+          <h3>Queued Jobs</h3>
+          <table>
+            <thead>
+              <tr>
+                <th>Job</th>
+                <th>Date Range</th>
+                <th>Queued</th>
+                <th></th>
+              </tr>
+            </thead>
+            <tbody>
+              ${this._queue.map(job => html`
+                <tr>
+                  <td>#${job.id}</td>
+                  <td>${job.incremental
+                    ? 'Catch up'
+                    : html`${job.date_after ?? '∞'} → ${job.date_before ?? '∞'}`}</td>
+                  <td>${new Date(job.created_at).toLocaleString()}</td>
+                  <td><button @click=${() => this._cancelJob(job.id)}>Cancel</button></td>
+                </tr>
+              `)}
+            </tbody>
+          </table>
+        </div>
+      ` : ''}
+
       ${this._error ? html`<div class="error">${this._error}</div>` : ''}
 
       ${this._history.length ? html`
@@ -719,6 +803,7 @@ export class SyncView extends LitElement {
                 <th>Found</th>
                 <th>Fetched</th>
                 <th>Skipped</th>
+                <th>Bound By</th>
               </tr>
             </thead>
             <tbody>
@@ -730,6 +815,7 @@ export class SyncView extends LitElement {
                   <td>${entry.replays_found}</td>
                   <td>${entry.replays_fetched}</td>
                   <td>${entry.replays_skipped}</td>
+                  <td title=${phaseSummary(entry)}>${syncBoundBy(entry)}</td>
                 </tr>
               `)}
             </tbody>
@@ -0,0 +1,304 @@
+"""Negotiated response compression with a response cache.
+
+CompressionMiddleware encodes response bodies as gzip, or as brotli when the
+optional ``brotli`` package is installed (it is not in requirements.txt)
+and the client prefers it. Bodies under MIN_SIZE, responses that already
+carry a Content-Encoding (the deflate replay passthrough) and non-JSON/text
+types such as the SSE progress stream are sent untouched.
+
+Level choice is bounded by a per-response CPU budget: throughput is measured
+for each (coding, level), and a body predicted to take longer than the budget
+at the better level is encoded at the fast one. Streamed bodies (NDJSON) are
+encoded chunk by chunk at the fast level with a sync flush, so rows still
+reach the client as they are produced.
+
+Given a ResponseCache and a cache_key callable, complete 200 responses to
+GET are kept, already encoded, per (key, coding); a repeated request is
+answered from memory without running the route or recompressing. Streamed
+bodies are kept too, as the concatenation of their chunks, and replayed in
+one piece. Keys must change whenever the response would, as
+server._validator does.
+"""
+from __future__ import annotations
+
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Callable
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+MIN_SIZE = 1024
+BUDGET_SECONDS = 0.02
+CACHE_BYTES = 32 * 1024 * 1024
+
+# Levels per coding, best ratio first; the last one is the fast fallback
+LEVELS: dict[str, tuple[int, ...]] = {"br": (5, 1), "gzip": (6, 1)}
+# Server-side preference when the client weighs codings equally
+PREFERENCE = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """Pick the supported coding with the highest q in Accept-Encoding."""
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        weights[name] = q
+    best, best_q = None, 0.0
+    for coding in PREFERENCE:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compressible(content_type: str) -> bool:
+    media = content_type.partition(";")[0].strip().lower()
+    if media == "text/event-stream":
+        return False
+    return (
+        media.startswith("text/")
+        or media in ("application/json", "application/x-ndjson", "application/javascript")
+        or media.endswith("+json")
+    )
+
+
+class _Encoder:
+    """Incremental encoder: write() returns sync-flushed output, finish() the tail."""
+
+    def __init__(self, coding: str, level: int) -> None:
+        if coding == "br":
+            c = brotli.Compressor(quality=level)
+            self._process, self._flush, self.finish = c.process, c.flush, c.finish
+        else:
+            z = zlib.compressobj(level, zlib.DEFLATED, 31)
+            self._process, self.finish = z.compress, z.flush
+            self._flush = lambda: z.flush(zlib.Z_SYNC_FLUSH)
+
+    def write(self, data: bytes) -> bytes:
+        return self._process(data) + self._flush()
+
+
+def encode(data: bytes, coding: str, level: int) -> bytes:
+    if coding == "br":
+        return brotli.compress(data, quality=level)
+    c = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return c.compress(data) + c.flush()
+
+
+def _add_vary(headers: MutableHeaders) -> None:
+    vary = headers.get("vary")
+    if not vary:
+        headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["Vary"] = f"{vary}, Accept-Encoding"
+
+
+def _encoded(headers: MutableHeaders, coding: str) -> None:
+    headers["Content-Encoding"] = coding
+    # The encoded bytes differ from what a strong tag was computed over
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = f"W/{etag}"
+
+
+class ResponseCache:
+    """Encoded responses by (key, coding), bounded by total body bytes (LRU)."""
+
+    def __init__(self, max_bytes: int = CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        # least recently used first
+        self._entries: OrderedDict[tuple[str, str], tuple[int, list, bytes]] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple[str, str]) -> tuple[int, list, bytes] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def peek(self, key: tuple[str, str]) -> tuple[int, list, bytes] | None:
+        """Like get, without counting a lookup or refreshing the entry."""
+        return self._entries.get(key)
+
+    def put(self, key: tuple[str, str], status: int, headers: list, body: bytes) -> None:
+        if len(body) > self.max_bytes // 4:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old[2])
+        self._entries[key] = (status, headers, body)
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app,
+        minimum_size: int = MIN_SIZE,
+        budget: float = BUDGET_SECONDS,
+        cache: ResponseCache | None = None,
+        cache_key: Callable[[dict], str | None] | None = None,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.budget = budget
+        self.cache = cache
+        self.cache_key = cache_key
+        # (coding, level) -> measured bytes per second
+        self._rates: dict[tuple[str, int], float] = {}
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        key = None
+        if self.cache is not None and self.cache_key is not None and scope["method"] == "GET":
+            key = self.cache_key(scope)
+        if key is not None:
+            hit = self.cache.get((key, coding or "identity"))
+            if hit is not None:
+                status, headers, body = hit
+                await send({"type": "http.response.start", "status": status, "headers": headers})
+                await send({"type": "http.response.body", "body": body})
+                return
+        responder = _Responder(self, send, coding, key)
+        await self.app(scope, receive, responder.send)
+
+    def level(self, coding: str, size: int) -> int:
+        """Best level for `coding` whose predicted time for `size` bytes fits the budget."""
+        levels = LEVELS[coding]
+        for level in levels:
+            rate = self._rates.get((coding, level))
+            if rate is None or size / rate <= self.budget:
+                return level
+        return levels[-1]
+
+    def compress(self, data: bytes, coding: str) -> bytes:
+        level = self.level(coding, len(data))
+        start = time.perf_counter()
+        out = encode(data, coding, level)
+        elapsed = time.perf_counter() - start
+        if elapsed > 0:
+            rate = len(data) / elapsed
+            old = self._rates.get((coding, level))
+            self._rates[(coding, level)] = rate if old is None else 0.8 * old + 0.2 * rate
+        return out
+
+
+class _Responder:
+    """Wraps `send` for one response, deciding on the first body message."""
+
+    def __init__(self, mw: CompressionMiddleware, send, coding: str | None, key: str | None):
+        self.mw = mw
+        self._send = send
+        self.coding = coding
+        self.key = key
+        self.start: dict | None = None
+        self.encoder: _Encoder | None = None
+        self.started = False
+        # Chunks of a cacheable streamed body, None once it is not cacheable
+        self.chunks: list[bytes] | None = None
+        self.size = 0
+
+    async def send(self, message: dict) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+        if self.started:
+            await self._send_chunk(message)
+            return
+
+        self.started = True
+        start = self.start
+        headers = MutableHeaders(raw=list(start["headers"]))
+        start["headers"] = headers.raw
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+        eligible = (
+            "content-encoding" not in headers
+            and compressible(headers.get("content-type", ""))
+        )
+
+        if not more:
+            if eligible and len(body) >= self.mw.minimum_size:
+                _add_vary(headers)
+                if self.coding:
+                    body = self.mw.compress(body, self.coding)
+                    _encoded(headers, self.coding)
+                    headers["Content-Length"] = str(len(body))
+            await self._send(start)
+            await self._send({"type": "http.response.body", "body": body})
+            if self.key is not None and start["status"] == 200:
+                self.mw.cache.put(
+                    (self.key, self.coding or "identity"),
+                    start["status"], list(start["headers"]), body,
+                )
+            return
+
+        if self.key is not None and start["status"] == 200:
+            self.chunks = []
+        if eligible and self.coding:
+            # Streams never know their size, so they use the fast level
+            self.encoder = _Encoder(self.coding, LEVELS[self.coding][-1])
+            _add_vary(headers)
+            _encoded(headers, self.coding)
+            if "content-length" in headers:
+                del headers["content-length"]
+        await self._send(start)
+        await self._send_chunk(message)
+
+    async def _send_chunk(self, message: dict) -> None:
+        more = message.get("more_body", False)
+        body = message.get("body", b"")
+        if self.encoder is not None:
+            body = self.encoder.write(body)
+            if not more:
+                body += self.encoder.finish()
+            message = {"type": "http.response.body", "body": body, "more_body": more}
+        await self._send(message)
+        if self.chunks is None:
+            return
+        self.chunks.append(body)
+        self.size += len(body)
+        if self.size > self.mw.cache.max_bytes // 4:
+            self.chunks = None
+        elif not more:
+            self.mw.cache.put(
+                (self.key, self.coding or "identity"),
+                self.start["status"], list(self.start["headers"]), b"".join(self.chunks),
+            )
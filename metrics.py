@@ -0,0 +1,244 @@
+"""In-process metrics, rendered in the Prometheus text format at /api/metrics.
+
+Recording is a dict lookup plus an add (and a bisect for histograms) on the
+event loop thread, so instruments can stay on in production. Values that
+already live elsewhere (token levels, response cache counters) are read
+only when scraped, through callbacks registered with `register`.
+"""
+from __future__ import annotations
+
+import functools
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = tuple[str, ...]
+
+_registry: list = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _labels(names: tuple[str, ...], values: Labels, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        _registry.append(self)
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self.values: dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, labels: Labels = ()) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        return self._header() + [
+            f"{self.name}{_labels(self.labelnames, k)} {_number(v)}"
+            for k, v in self.values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, labels: Labels = ()) -> None:
+        self.values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = buckets
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self.values: dict[Labels, list] = {}
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def count(self, labels: Labels = ()) -> int:
+        entry = self.values.get(labels)
+        return sum(entry[0]) if entry else 0
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        for labels, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, n in zip((*self.buckets, "+Inf"), counts):
+                cumulative += n
+                le = 'le="%s"' % (bound if bound == "+Inf" else _number(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Callback(_Metric):
+    """A counter or gauge whose samples are produced by fn() at scrape time."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        kind: str,
+        fn: Callable[[], Iterable[tuple[Labels, float]]],
+        labelnames: tuple[str, ...] = (),
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self.fn = fn
+
+    def render(self) -> list[str]:
+        return self._header() + [
+            f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in self.fn()
+        ]
+
+
+def register(
+    name: str,
+    help: str,
+    kind: str,
+    fn: Callable[[], Iterable[tuple[Labels, float]]],
+    labelnames: tuple[str, ...] = (),
+) -> Callback:
+    """Expose values owned elsewhere; a name registered again replaces the old one."""
+    for metric in _registry:
+        if metric.name == name:
+            _registry.remove(metric)
+            break
+    return Callback(name, help, kind, fn, labelnames)
+
+
+def render() -> str:
+    lines: list[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def timed(histogram: Histogram, labels: Labels) -> Callable:
+    """Decorator observing the wall time of each call to an async function."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, labels)
+        return wrapper
+    return wrap
+
+
+# --- Instruments shared across modules ---
+
+HTTP_SECONDS = Histogram(
+    "rlstats_http_request_duration_seconds",
+    "Time to answer an HTTP request, including streamed bodies",
+    ("method", "route"),
+)
+HTTP_REQUESTS = Counter(
+    "rlstats_http_requests_total", "HTTP responses by status", ("method", "route", "status")
+)
+DB_SECONDS = Histogram(
+    "rlstats_db_call_duration_seconds", "Wall time of each db.py call", ("call",)
+)
+DECODE_SECONDS = Counter(
+    "rlstats_replay_decode_seconds_total", "Time spent decoding stored replays", ("codec",)
+)
+DECODED = Counter("rlstats_replays_decoded_total", "Stored replays decoded", ("codec",))
+BUCKET_WAIT_SECONDS = Histogram(
+    "rlstats_token_bucket_wait_seconds",
+    "Time spent waiting for a ballchasing.com rate-limit token",
+    ("bucket",),
+    buckets=(0.0005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0, 60.0, 600.0),
+)
+SYNC_REPLAYS = Counter(
+    "rlstats_sync_replays_total", "Replays handled by sync, by outcome", ("outcome",)
+)
+
+
+class RequestMetricsMiddleware:
+    """Per-route latency and status counts.
+
+    Labels use the route template (/api/replays/{replay_id}), never the raw
+    path. Requests answered before routing (304s, response cache hits) are
+    matched against `routes` so they are attributed to their route too.
+    Requests whose scope satisfies `exclude` (the server's own cache
+    warm-up) are not recorded.
+    """
+
+    def __init__(
+        self, app, routes: list | None = None, exclude: Callable[[dict], bool] | None = None
+    ) -> None:
+        self.app = app
+        self.routes = routes if routes is not None else []
+        self.exclude = exclude
+
+    def _route(self, scope) -> str:
+        route = scope.get("route")
+        if route is None:
+            for candidate in self.routes:
+                if candidate.matches(scope)[0] == Match.FULL:
+                    route = candidate
+                    break
+        return getattr(route, "path", "unmatched")
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or (self.exclude is not None and self.exclude(scope)):
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            labels = (scope["method"], self._route(scope))
+            HTTP_SECONDS.observe(time.perf_counter() - start, labels)
+            HTTP_REQUESTS.inc(1, (*labels, str(status)))
@@ -20,12 +20,48 @@ class SyncRequest(BaseModel):
     replay_date_before: str | None = None
 
 
+class SyncRange(BaseModel):
+    date_after: str | None = None
+    date_before: str | None = None
+    known_replays: int = 0
+
+
+class SyncPlan(BaseModel):
+    requested: SyncRange
+    covered: list[SyncRange]
+    gaps: list[SyncRange]
+    estimated_list_calls: int
+    full_range_list_calls: int
+
+
 class SyncStatus(BaseModel):
     running: bool
+    job_id: int | None = None
+    queued: int = 0
+    replays_total: int | None = None
+    replays_found: int = 0
+    replays_fetched: int = 0
+    replays_skipped: int = 0
+    error: str | None = None
+
+
+class SyncJob(BaseModel):
+    id: int
+    date_after: str | None = None
+    date_before: str | None = None
+    incremental: bool = False
+    overlap_hours: int = 24
+    status: str
+    created_at: str
+    started_at: str | None = None
+    completed_at: str | None = None
+    replays_total: int | None = None
     replays_found: int = 0
     replays_fetched: int = 0
     replays_skipped: int = 0
     error: str | None = None
+    # Worker process that ran (or is running) the job
+    owner: str | None = None
 
 
 class SyncLogEntry(BaseModel):
@@ -39,6 +75,17 @@ class SyncLogEntry(BaseModel):
     replays_fetched: int = 0
     replays_skipped: int = 0
     error: str | None = None
+    # Per-phase telemetry, in seconds unless noted
+    list_seconds: float = 0.0
+    exists_seconds: float = 0.0
+    list_wait_seconds: float = 0.0
+    get_wait_seconds: float = 0.0
+    retry_wait_seconds: float = 0.0
+    download_seconds: float = 0.0
+    decode_seconds: float = 0.0
+    write_seconds: float = 0.0
+    bytes_received: int = 0
+    retries: int = 0
 
 
 class BucketStatus(BaseModel):
@@ -178,6 +225,21 @@ class RegressionLine(BaseModel):
     r_squared: float
 
 
+class CorrelationDensity(BaseModel):
+    """Game counts on a (stat_value bin, goal_diff) grid.
+
+    counts[i][j] is the number of games with goal_diff == goal_diff_min + i
+    whose stat_value falls in bin j of `bins` equal-width bins over
+    [x_min, x_max].
+    """
+    x_min: float
+    x_max: float
+    bins: int
+    goal_diff_min: int
+    goal_diff_max: int
+    counts: list[list[int]]
+
+
 class CorrelationResponse(BaseModel):
     stat: str
     role: str
@@ -185,6 +247,7 @@ class CorrelationResponse(BaseModel):
     points: list[CorrelationPoint]
     buckets: list[CorrelationBucket]
     regression: RegressionLine
+    density: CorrelationDensity | None = None
 
 
 class ReplaySummary(BaseModel):
@@ -197,10 +260,3 @@ class ReplaySummary(BaseModel):
     blue_goals: int | None = None
     orange_goals: int | None = None
     overtime: bool = False
-
-
-class ReplayPlayer(BaseModel):
-    name: str
-    role: str
-    team: str  # "blue" or "orange"
-    stats: dict
@@ -0,0 +1,224 @@
+"""On-demand profiling of single requests.
+
+A request from localhost carrying ``X-Profile: 1`` runs with a Profile bound
+to a context variable and a sampler thread that records the event loop
+thread's Python stack every INTERVAL seconds. When the response starts, the
+middleware adds:
+
+- ``Server-Timing`` with a per-phase breakdown (browser devtools show it)
+- ``X-Profile-Id``; ``GET /api/profiles/{id}`` returns the samples as folded
+  stacks (``a;b;c 12`` lines) for flamegraph.pl or speedscope
+
+Phases come from two sources. db_fetch and json_decode are timed exactly
+through span()/record() hooks in db.py; db_fetch excludes decoding done
+inside a db call. role_resolution, aggregation, serialization and
+compression are estimated from the samples, by the innermost frame that
+identifies them.
+
+Samples cover the whole loop thread, so other requests running at the same
+time show up in the profile; profile on an otherwise idle server. Profiled
+requests bypass the response cache and 304s so the route actually runs.
+"""
+from __future__ import annotations
+
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+INTERVAL = 0.001
+KEEP = 20
+LOCAL_HOSTS = frozenset({"127.0.0.1", "::1", "localhost"})
+
+# Innermost frames that pin a sample to a phase, checked in this order
+ROLE_FUNCS = frozenset({"_build_role_lookup", "_find_my_team", "_resolve_player_role"})
+DECODE_FUNCS = frozenset({"decode_replay", "replay_json"})
+SERIALIZE_FUNCS = frozenset({
+    "render", "serialize_response", "jsonable_encoder", "_columns", "model_dump",
+    "dump_json",
+})
+SAMPLED_PHASES = ("role_resolution", "aggregation", "serialization", "compression")
+
+_current: ContextVar[Profile | None] = ContextVar("profile", default=None)
+_ids = itertools.count(1)
+recent: OrderedDict[str, Profile] = OrderedDict()
+
+
+def current() -> Profile | None:
+    return _current.get()
+
+
+def record(phase: str, seconds: float) -> None:
+    """Add exactly measured time to the active profile, if any."""
+    profile = _current.get()
+    if profile is not None:
+        profile.record(phase, seconds)
+
+
+@contextmanager
+def span(phase: str):
+    """Time a block into the active profile; nested spans of a phase count once."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    depth = profile.depth[phase]
+    profile.depth[phase] = depth + 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.depth[phase] = depth
+        if depth == 0:
+            profile.record(phase, time.perf_counter() - start)
+
+
+class Profile:
+    def __init__(self, method: str, path: str) -> None:
+        self.id = f"{next(_ids)}-{os.getpid()}"
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.exact: Counter[str] = Counter()
+        self.depth: Counter[str] = Counter()
+        # json_decode seconds spent inside a db_fetch span
+        self.nested_decode = 0.0
+        self.stacks: Counter[tuple] = Counter()
+        self.endpoint = None
+
+    def record(self, phase: str, seconds: float) -> None:
+        self.exact[phase] += seconds
+        if phase == "json_decode" and self.depth["db_fetch"]:
+            self.nested_decode += seconds
+
+    def _classify(self, stack: tuple) -> str | None:
+        endpoint = getattr(self.endpoint, "__code__", None)
+        in_route = False
+        for filename, name, _ in reversed(stack):
+            if name in DECODE_FUNCS:
+                return None  # timed exactly
+            if name in ROLE_FUNCS:
+                return "role_resolution"
+            if filename.endswith("http_compression.py"):
+                return "compression"
+            if name in SERIALIZE_FUNCS:
+                return "serialization"
+            if endpoint is not None and (filename, name) == (endpoint.co_filename, endpoint.co_name):
+                in_route = True
+        return "aggregation" if in_route else None
+
+    def phases(self) -> dict[str, float]:
+        """Seconds per phase."""
+        out = {
+            "db_fetch": max(self.exact["db_fetch"] - self.nested_decode, 0.0),
+            "json_decode": self.exact["json_decode"],
+        }
+        sampled: Counter[str] = Counter()
+        for stack, n in self.stacks.items():
+            phase = self._classify(stack)
+            if phase:
+                sampled[phase] += n
+        per_sample = self.total / max(sum(self.stacks.values()), 1)
+        for phase in SAMPLED_PHASES:
+            out[phase] = sampled[phase] * per_sample
+        out["total"] = self.total
+        return out
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{k};dur={v * 1000:.1f}" for k, v in self.phases().items())
+
+    def folded(self) -> str:
+        """Samples as folded stacks, outermost frame first."""
+        lines = []
+        for stack, n in self.stacks.most_common():
+            frames = ";".join(f"{os.path.basename(f)}:{name}:{line}" for f, name, line in stack)
+            lines.append(f"{frames} {n}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "samples": sum(self.stacks.values()),
+            "phases_ms": {k: round(v * 1000, 2) for k, v in self.phases().items()},
+        }
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, profile: Profile, thread_id: int) -> None:
+        super().__init__(daemon=True, name="profile-sampler")
+        self.profile = profile
+        self.thread_id = thread_id
+        self.done = threading.Event()
+
+    def run(self) -> None:
+        stacks = self.profile.stacks
+        while not self.done.wait(INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_name, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                stacks[tuple(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self.done.set()
+        self.join()
+
+
+def _wants_profile(scope) -> bool:
+    client = scope.get("client")
+    if not client or client[0] not in LOCAL_HOSTS:
+        return False
+    for name, value in scope["headers"]:
+        if name == b"x-profile":
+            return value.strip() not in (b"", b"0")
+    return False
+
+
+class ProfilingMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        profile = Profile(scope["method"], scope["path"])
+        sampler = _Sampler(profile, threading.get_ident())
+        token = _current.set(profile)
+        sampler.start()
+
+        async def send_with_profile(message) -> None:
+            if message["type"] == "http.response.start" and sampler.is_alive():
+                sampler.stop()
+                profile.total = time.perf_counter() - profile.started
+                profile.endpoint = scope.get("endpoint")
+                _keep(profile)
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", profile.server_timing().encode()),
+                    (b"x-profile-id", profile.id.encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            if sampler.is_alive():
+                sampler.stop()
+            _current.reset(token)
+
+
+def _keep(profile: Profile) -> None:
+    recent[profile.id] = profile
+    while len(recent) > KEEP:
+        recent.popitem(last=False)
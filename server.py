@@ -1,22 +1,35 @@
 from __future__ import annotations
 
 import asyncio
+import base64
+import binascii
+import hashlib
+import json
 import os
+import socket
+import time
 from collections import Counter
 from contextlib import asynccontextmanager
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
 
+import httpx
+import orjson
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 
 import db
-from ballchasing_client import BallchasingClient
+import metrics
+import profiling
+import snapshot
+import sync_ranges
+from ballchasing_client import BASE_URL, BallchasingClient, SyncTelemetry, track
+from http_compression import PREFERENCE, CompressionMiddleware, ResponseCache
 from models import (
     AggregatedStats,
     BoostStats,
-    CorrelationBucket,
-    CorrelationPoint,
     CorrelationResponse,
     CoreStats,
     DemoStats,
@@ -26,13 +39,14 @@ from models import (
     PlayerStats,
     PositioningStats,
     RateLimitStatus,
-    RegressionLine,
-    ReplayPlayer,
     ReplaySummary,
     GameAnalysisRow,
     ScorelineRoleStats,
     ScorelineRow,
+    SyncJob,
     SyncLogEntry,
+    SyncPlan,
+    SyncRange,
     SyncStatus,
 )
 
@@ -57,8 +71,47 @@ def _normalize_date(value: str | None, end_of_day: bool = False) -> str | None:
     return value
 
 
+async def _incremental_date_after(overlap_hours: int) -> str | None:
+    """Derive a sync start bound from the newest stored replay, minus an overlap."""
+    latest = await db.latest_replay_date()
+    if not latest:
+        return None
+    start = datetime.fromisoformat(latest) - timedelta(hours=overlap_hours)
+    return start.isoformat()
+
+
 client: BallchasingClient
-sync_status = SyncStatus(running=False)
+
+# Identifies this process as sync lease holder and job owner
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+# The lease is renewed every third of this while a worker is syncing; a
+# worker that dies loses it after this long
+LEASE_SECONDS = 30.0
+# How often an idle worker checks the shared queue for jobs queued elsewhere
+SYNC_POLL_SECONDS = 2.0
+# How often a running job's counters are written to sync_jobs
+PROGRESS_WRITE_SECONDS = 1.0
+# How often db.generations() is refreshed; a write by another worker moves
+# this worker's ETags and response cache keys within this long
+GENERATIONS_POLL_SECONDS = 0.1
+
+# Live status of this worker's running sync job, and of the last one to finish
+_active_job: SyncStatus | None = None
+_active_started: float = 0.0
+_last_job: SyncStatus | None = None
+# Set whenever a job is queued so the worker wakes up
+_sync_wakeup = asyncio.Event()
+# Replaced on every progress change; SSE streams wait on the current one
+_progress_event = asyncio.Event()
+# Progress snapshot shared by every SSE stream: (started at, task computing it)
+_progress_shared: tuple[float, asyncio.Task] | None = None
+
+# SSE streams batch changes arriving within this window into one event
+SSE_COALESCE_SECONDS = 0.25
+# Idle streams send a comment this often so proxies keep the connection open
+SSE_HEARTBEAT_SECONDS = 15.0
+# Streams poll the DB this often while another worker runs the sync
+SSE_REMOTE_POLL_SECONDS = 1.0
 
 
 @asynccontextmanager
@@ -66,27 +119,341 @@ async def lifespan(app: FastAPI):
     global client
     token = os.environ.get("BALLCHASING_TOKEN", "")
     tier = os.environ.get("BALLCHASING_TIER", "gold")
-    client = BallchasingClient(token, tier)
+    base_url = os.environ.get("BALLCHASING_BASE_URL", BASE_URL)
+    client = BallchasingClient(token, tier, base_url=base_url)
     await db.init_db()
-    stale = await db.clean_stale_syncs()
-    if stale:
-        print(f"Cleaned {stale} stale sync(s) from previous run")
+    # Every worker process draws from the same quota, kept in SQLite
+    client.share_limits(db.take_api_token)
     list_used, get_used = await db.estimate_api_calls_last_hour()
-    if list_used or get_used:
-        client._list_bucket.seed_usage(list_used)
-        client._get_bucket.seed_usage(get_used)
-        print(f"Seeded rate limits from recent syncs: list={list_used}, get={get_used}")
+    # Only fills buckets the DB has no state for yet (first run after upgrading)
+    await db.seed_api_usage("list", list_used)
+    await db.seed_api_usage("get", get_used)
+    loaded = await _load_snapshot()
+    if loaded:
+        print(f"Loaded {loaded} cached response(s) from {snapshot.path_for(db.DB_PATH)}")
+    global _warmup_enabled
+    _warmup_enabled = True
+    worker = asyncio.create_task(_sync_worker())
+    migration = asyncio.create_task(_migrate_replay_storage())
+    poller = asyncio.create_task(_poll_generations())
     yield
+    _warmup_enabled = False
+    if _warm_task is not None:
+        _warm_task.cancel()
+    poller.cancel()
+    migration.cancel()
+    worker.cancel()
+    # A job interrupted here stays 'running' and is requeued by the next lease holder
+    await db.release_sync_lease(WORKER_ID)
     await client.close()
 
 
+async def _poll_generations() -> None:
+    """Refresh db.generations() so writes by other worker processes move the ETags."""
+    while True:
+        await db.refresh_generations()
+        await asyncio.sleep(GENERATIONS_POLL_SECONDS)
+
+
+async def _migrate_replay_storage() -> None:
+    """Split out raw payloads, then re-encode rows with an older codec, in small batches."""
+    split = await db.split_raw_replays()
+    if split:
+        print(f"Moved {split} raw replay(s) to cold storage")
+    if db.REPLAY_CODEC == "zdict":
+        await _ensure_dictionary()
+    migrated = await db.migrate_replay_codec(train=False)
+    if migrated:
+        print(f"Re-encoded {migrated} replay(s) with codec {db.REPLAY_CODEC}")
+    # After the rewrite, which would have invalidated anything cached earlier
+    _schedule_warmup()
+
+
+async def _ensure_dictionary() -> None:
+    """Have a zdict dictionary in codec_dicts, trained by exactly one worker.
+
+    Training holds the sync lease, under its own owner id so that a sync
+    this worker is running keeps the lease; the others wait for it and
+    then load the dictionary it stored.
+    """
+    trainer = f"{WORKER_ID}:train"
+    while not await db.refresh_dictionaries():
+        if await db.acquire_sync_lease(trainer, LEASE_SECONDS):
+            try:
+                if not await db.refresh_dictionaries():
+                    await db.train_dictionary()
+            finally:
+                await db.release_sync_lease(trainer)
+            return
+        await asyncio.sleep(SYNC_POLL_SECONDS)
+
+
 app = FastAPI(title="Ballchasing Stats", lifespan=lifespan)
+
+# GET routes whose output depends only on stored replays, completed syncs and
+# the player config. Their ETags come from db.generations(), so a matching
+# If-None-Match is answered with 304 before the route (or SQLite) runs.
+CONDITIONAL_PATHS = ("/api/stats/", "/api/players", "/api/sync/coverage")
+# Source of the modules that shape these responses: tags (and snapshots)
+# from other code never match, while every worker running this code, and
+# the next restart, agree on them
+_CODE_HASH = hashlib.blake2b(
+    b"".join(
+        Path(__file__).with_name(f"{name}.py").read_bytes()
+        for name in ("server", "db", "models", "sync_ranges")
+    ),
+    digest_size=12,
+).hexdigest()
+
+
+# Set in the ASGI scope of cache warm-up requests (see _warm_cache); unlike a
+# header, clients cannot send it
+WARMUP_SCOPE_KEY = "rlstats.warmup"
+
+
+def _is_warmup(scope: dict) -> bool:
+    return scope.get(WARMUP_SCOPE_KEY, False)
+
+
+def _validator(request: Request) -> str:
+    """Weak ETag for a conditional route: data and config versions plus the request."""
+    return _view_validator(
+        request.url.path, request.query_params.multi_items(), request.headers.get("accept", "")
+    )
+
+
+def _view_validator(path: str, query: list[tuple[str, str]], accept: str) -> str:
+    # Unreadable (DB busy): a tag that matches nothing, so nothing stale is served
+    generations = db.generations() or os.urandom(8).hex()
+    key = orjson.dumps([_CODE_HASH, db.DB_PATH, generations, path, sorted(query), accept])
+    return f'W/"{hashlib.blake2b(key, digest_size=12).hexdigest()}"'
+
+
+def _response_cache_key(scope: dict) -> str | None:
+    """Cache conditional routes under their validator, which moves with the data."""
+    if not scope["path"].startswith(CONDITIONAL_PATHS) or profiling.current():
+        return None
+    return _validator(Request(scope))
+
+
+# Encoded bodies of conditional routes; see http_compression.py
+response_cache = ResponseCache()
+app.add_middleware(
+    CompressionMiddleware, cache=response_cache, cache_key=_response_cache_key
+)
+
+
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    if (
+        request.method != "GET"
+        or not request.url.path.startswith(CONDITIONAL_PATHS)
+        or profiling.current()
+    ):
+        return await call_next(request)
+    if db.generations() is None:
+        # Stale after a write by this process (or never read): reread off the loop
+        await db.refresh_generations()
+    etag = _validator(request)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, etag.removeprefix("W/")):
+        return Response(status_code=304, headers=headers)
+    global _live_requests
+    live = not _is_warmup(request.scope)
+    _live_requests += live
+    try:
+        response = await call_next(request)
+    finally:
+        _live_requests -= live
+    if response.status_code == 200:
+        response.headers.update(headers)
+    return response
+
+
+# Added after conditional_get so it wraps it and 304s carry CORS headers too
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+# X-Profile: 1 from localhost; see profiling.py
+app.add_middleware(profiling.ProfilingMiddleware)
+# Outermost, so 304s and cache hits are timed as well
+app.add_middleware(metrics.RequestMetricsMiddleware, routes=app.routes, exclude=_is_warmup)
+
+
+# --- Cache warm-up ---
+
+# What the frontend requests when a view opens with default filters
+# (readFiltersFromURL in analysis-shared.ts): exclude ties, skip games under
+# 90s, ranked 2s and 3s. Sent with a browser's Accept-Encoding so they land
+# under the same response cache keys as the real requests.
+_DEFAULT_FILTERS = [
+    ("exclude-ties", "true"), ("min-duration", "90"),
+    ("playlist", "Ranked Doubles"), ("playlist", "Ranked Standard"),
+]
+WARM_VIEWS: list[tuple[str, list[tuple[str, str]], str]] = [
+    ("/api/stats/me", [], "*/*"),
+    ("/api/stats/teammates", [], "*/*"),
+    ("/api/stats/opponents", [], "*/*"),
+    ("/api/players", [], "*/*"),
+    *(
+        (path, [("team-size", str(size)), *_DEFAULT_FILTERS], accept)
+        for size in (2, 3, 1)
+        for path, accept in (
+            ("/api/stats/scoreline", "*/*"),
+            ("/api/stats/games", "*/*"),
+            ("/api/stats/games", "application/x-ndjson"),
+        )
+    ),
+]
+WARM_ACCEPT_ENCODING = "gzip, deflate, br, zstd"
+# Wait this long after the trigger, so a burst of triggers warms once
+WARMUP_DELAY_SECONDS = 2.0
+# Between warm requests; a live request that arrived meanwhile goes first
+WARMUP_PAUSE_SECONDS = 0.05
+# Start over at most this many times when data changes mid-warm-up
+WARMUP_ATTEMPTS = 3
+
+# Live (non warm-up) requests on conditional routes in flight
+_live_requests = 0
+# Only a serving app warms; lifespan turns this on
+_warmup_enabled = False
+_warm_task: asyncio.Task | None = None
+
+
+def _schedule_warmup() -> None:
+    """(Re)start the background warm-up; earlier runs would cache stale data."""
+    global _warm_task
+    if not _warmup_enabled:
+        return
+    if _warm_task is not None:
+        _warm_task.cancel()
+    _warm_task = asyncio.create_task(_warm_cache())
+
+
+async def _warmup_app(scope, receive, send) -> None:
+    await app({**scope, WARMUP_SCOPE_KEY: True}, receive, send)
+
+
+async def _warm_cache(delay: float | None = None) -> int:
+    """Request WARM_VIEWS through the app so their responses are cached.
+
+    Runs one request at a time and only while no live request or sync job
+    is running. Warm requests are left out of the HTTP metrics. A complete
+    run is saved as the derived-data snapshot.
+    Returns how many views were warmed.
+    """
+    await asyncio.sleep(WARMUP_DELAY_SECONDS if delay is None else delay)
+    transport = httpx.ASGITransport(app=_warmup_app)
+    headers = {"Accept-Encoding": WARM_ACCEPT_ENCODING}
+    async with httpx.AsyncClient(transport=transport, base_url="http://warmup") as http:
+        for _ in range(WARMUP_ATTEMPTS):
+            version = await db.refresh_generations()
+            tag = await _snapshot_tag()
+            warmed = 0
+            for path, params, accept in WARM_VIEWS:
+                while _live_requests or _active_job is not None:
+                    await asyncio.sleep(WARMUP_PAUSE_SECONDS)
+                resp = await http.get(path, params=params, headers={**headers, "Accept": accept})
+                if await db.refresh_generations() != version:
+                    break
+                # Anything else (e.g. 400 with no player config yet) is not cached
+                warmed += resp.status_code == 200
+                await asyncio.sleep(WARMUP_PAUSE_SECONDS)
+            else:
+                if warmed and tag != _snapshot_on_disk:
+                    await _save_snapshot(tag)
+                return warmed
+    return 0
+
+
+# --- Derived-data snapshot ---
+
+# Tag of the snapshot file known to hold this process's warmed views
+_snapshot_on_disk: dict | None = None
+
+
+async def _snapshot_tag() -> dict:
+    generation, config = await db.data_fingerprint()
+    return {"replay_generation": generation, "config": config, "code": _CODE_HASH}
+
+
+async def _save_snapshot(tag: dict) -> None:
+    """Write the cached WARM_VIEWS responses to disk under `tag`."""
+    global _snapshot_on_disk
+    await db.refresh_generations()
+    entries = []
+    # Keys are read in one go, with no await, so they all match `tag`
+    for path, params, accept in WARM_VIEWS:
+        key = _view_validator(path, params, accept)
+        for coding in (*PREFERENCE, "identity"):
+            hit = response_cache.peek((key, coding))
+            if hit is not None:
+                entries.append(snapshot.Entry(path, params, accept, coding, *hit))
+    await asyncio.to_thread(snapshot.save, snapshot.path_for(db.DB_PATH), tag, entries)
+    _snapshot_on_disk = tag
+
+
+async def _load_snapshot() -> int:
+    """Fill the response cache from a snapshot that is still current; returns entries loaded."""
+    global _snapshot_on_disk
+    # Entries are keyed by validator, which needs current generations. Read
+    # them before the tag: a write in between then only makes the keys miss
+    await db.refresh_generations()
+    tag = await _snapshot_tag()
+    entries = snapshot.load(snapshot.path_for(db.DB_PATH), tag)
+    if not entries:
+        return 0
+    for e in entries:
+        key = _view_validator(e.path, e.query, e.accept)
+        response_cache.put((key, e.coding), e.status, e.headers, e.body)
+    _snapshot_on_disk = tag
+    return len(entries)
+
+
+class FastJSONResponse(Response):
+    """orjson-encoded body for endpoints that return plain dicts and lists.
+
+    Returning a Response skips FastAPI's per-row model validation; routes
+    still declare response_model so the OpenAPI schema is unchanged.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+# Opt-in struct-of-arrays layout for correlation points
+COLUMNAR_MEDIA_TYPE = "application/vnd.rlstats.columnar+json"
+
+
+def _wants_columnar(request: Request) -> bool:
+    return COLUMNAR_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _columns(rows: list[dict]) -> dict:
+    """Struct-of-arrays form of flat rows: {"length": n, "columns": {key: [values]}}."""
+    keys = dict.fromkeys(key for row in rows for key in row)
+    return {"length": len(rows), "columns": {key: [row.get(key) for row in rows] for key in keys}}
+
+
+def _columnar_response(content: dict) -> Response:
+    return FastJSONResponse(
+        content, media_type=COLUMNAR_MEDIA_TYPE, headers={"Vary": "Accept"}
+    )
+
+
+def _role_stats(pbb: float, spd: float, dist: float) -> dict:
+    """ScorelineRoleStats as a plain dict."""
+    return {
+        "percent_behind_ball": float(pbb),
+        "avg_speed": float(spd),
+        "avg_distance_to_ball": float(dist),
+    }
 
 
 # --- Ping ---
@@ -102,9 +469,79 @@ async def ping():
 
 @app.get("/api/rate-limits")
 async def rate_limits() -> RateLimitStatus:
+    await client.refresh_rate_limits()
     return RateLimitStatus(**client.rate_limit_status())
 
 
+# --- Metrics ---
+
+
+def _bucket_levels():
+    if "client" not in globals():
+        return
+    status = client.rate_limit_status()
+    for name in ("list", "get"):
+        snap = status[name]
+        yield (name, "second"), snap["tokens_available"]
+        if snap["per_hour"] is not None:
+            yield (name, "hour"), snap["per_hour"] - snap["hour_used"]
+
+
+def _sync_rate():
+    # Whole-job average; rate(rlstats_sync_replays_total) gives the recent one
+    if _active_job is not None:
+        elapsed = time.monotonic() - _active_started
+        processed = _active_job.replays_fetched + _active_job.replays_skipped
+        yield (), processed / elapsed if elapsed > 0 else 0.0
+
+
+metrics.register(
+    "rlstats_token_bucket_tokens", "Rate-limit tokens left, per bucket and window",
+    "gauge", _bucket_levels, ("bucket", "window"),
+)
+metrics.register(
+    "rlstats_sync_replays_per_second", "Replays processed per second by the running sync job",
+    "gauge", _sync_rate,
+)
+metrics.register(
+    "rlstats_response_cache_requests_total", "Response cache lookups by result", "counter",
+    lambda: [(("hit",), response_cache.hits), (("miss",), response_cache.misses)], ("result",),
+)
+metrics.register(
+    "rlstats_response_cache_bytes", "Encoded bytes held by the response cache", "gauge",
+    lambda: [((), response_cache.size)],
+)
+
+
+@app.get("/api/metrics")
+async def get_metrics() -> Response:
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+# --- Profiles ---
+
+
+def _require_local(request: Request) -> None:
+    if not request.client or request.client.host not in profiling.LOCAL_HOSTS:
+        raise HTTPException(403, "Profiles are only available from localhost")
+
+
+@app.get("/api/profiles")
+async def list_profiles(request: Request) -> list[dict]:
+    _require_local(request)
+    return [p.summary() for p in reversed(profiling.recent.values())]
+
+
+@app.get("/api/profiles/{profile_id}")
+async def get_profile(profile_id: str, request: Request) -> Response:
+    """Samples of one profiled request as folded stacks (flamegraph.pl, speedscope)."""
+    _require_local(request)
+    profile = profiling.recent.get(profile_id)
+    if profile is None:
+        raise HTTPException(404, "Profile not found")
+    return Response(profile.folded(), media_type="text/plain")
+
+
 # --- Sync ---
 
 
@@ -124,26 +561,240 @@ async def sync_preview(
     return {"total": page.get("count", 0)}
 
 
+async def _build_sync_plan(date_after: str | None, date_before: str | None) -> SyncPlan:
+    """Split a requested range into parts already covered by completed syncs and gaps."""
+    requested = sync_ranges.to_interval(date_after, date_before)
+    synced = [
+        sync_ranges.to_interval(r["date_after"], r["date_before"])
+        for r in await db.get_synced_ranges()
+    ]
+    day_counts = await db.get_replay_date_counts()
+
+    def _range(interval: sync_ranges.Interval) -> SyncRange:
+        return SyncRange(
+            date_after=sync_ranges.format_bound(interval[0]),
+            date_before=sync_ranges.format_bound(interval[1]),
+            known_replays=sync_ranges.count_in(interval, day_counts),
+        )
+
+    gaps = sync_ranges.uncovered(requested, synced)
+    covered = [
+        (max(start, requested[0]), min(end, requested[1]))
+        for start, end in sync_ranges.merge(synced)
+        if start <= requested[1] and end >= requested[0]
+    ]
+    gap_ranges = [_range(g) for g in gaps]
+    requested_range = _range(requested)
+    return SyncPlan(
+        requested=requested_range,
+        covered=[_range(c) for c in covered],
+        gaps=gap_ranges,
+        estimated_list_calls=sum(
+            sync_ranges.estimate_list_calls(g.known_replays) for g in gap_ranges
+        ),
+        full_range_list_calls=sync_ranges.estimate_list_calls(requested_range.known_replays),
+    )
+
+
+@app.get("/api/sync/plan")
+async def sync_plan(
+    replay_date_after: str | None = Query(None, alias="replay-date-after"),
+    replay_date_before: str | None = Query(None, alias="replay-date-before"),
+) -> SyncPlan:
+    """Dry run: show which sub-ranges a skip-covered sync would list."""
+    date_after = _normalize_date(replay_date_after, end_of_day=False)
+    date_before = _normalize_date(replay_date_before, end_of_day=True)
+    return await _build_sync_plan(date_after, date_before)
+
+
 @app.post("/api/sync")
 async def sync_replays(
     replay_date_after: str | None = Query(None, alias="replay-date-after"),
     replay_date_before: str | None = Query(None, alias="replay-date-before"),
+    incremental: bool = Query(False),
+    overlap_hours: int = Query(24, ge=0, alias="overlap-hours"),
+    skip_covered: bool = Query(False, alias="skip-covered"),
 ):
-    global sync_status
-    if sync_status.running:
-        raise HTTPException(409, "Sync already in progress")
-
     date_after = _normalize_date(replay_date_after, end_of_day=False)
     date_before = _normalize_date(replay_date_before, end_of_day=True)
 
-    sync_status = SyncStatus(running=True)
-    asyncio.create_task(_do_sync(date_after, date_before))
-    return {"message": "Sync started"}
+    ranges: list[tuple[str | None, str | None]] = [(date_after, date_before)]
+    if skip_covered and not incremental:
+        plan = await _build_sync_plan(date_after, date_before)
+        if not plan.gaps:
+            return {"message": "Already synced", "gaps": 0, "job_ids": []}
+        ranges = [(g.date_after, g.date_before) for g in plan.gaps]
+
+    job_ids: list[int] = []
+    for after, before in ranges:
+        job_id = await db.enqueue_sync_job(after, before, incremental, overlap_hours)
+        if job_id not in job_ids:
+            job_ids.append(job_id)
+    _sync_wakeup.set()
+    _notify_progress()
+    return {"message": "Sync queued", "gaps": len(ranges), "job_ids": job_ids}
+
+
+def _job_status(row: dict) -> SyncStatus:
+    return SyncStatus(
+        running=row["status"] == "running",
+        job_id=row["id"],
+        replays_total=row["replays_total"],
+        replays_found=row["replays_found"],
+        replays_fetched=row["replays_fetched"],
+        replays_skipped=row["replays_skipped"],
+        error=row["error"],
+    )
+
+
+async def _sync_state() -> tuple[SyncStatus, float | None]:
+    """Status of the running job (or the last finished one) plus queue depth,
+    and how long the running job has been going.
+
+    A job running in this worker is reported live; one running in another
+    worker as last persisted to sync_jobs.
+    """
+    queued = await db.count_sync_jobs("queued")
+    elapsed = None
+    if _active_job is not None:
+        current = _active_job
+        elapsed = time.monotonic() - _active_started
+    elif running := await db.list_sync_jobs(status="running", limit=1):
+        current = _job_status(running[0])
+        started = datetime.fromisoformat(running[0]["started_at"])
+        elapsed = (datetime.now(timezone.utc) - started).total_seconds()
+    else:
+        current = _last_job or SyncStatus(running=False)
+    return current.model_copy(
+        update={"running": elapsed is not None or queued > 0, "queued": queued}
+    ), elapsed
+
+
+async def _current_sync_status() -> SyncStatus:
+    return (await _sync_state())[0]
 
 
 @app.get("/api/sync/status")
-async def get_sync_status():
-    return sync_status
+async def get_sync_status() -> SyncStatus:
+    return await _current_sync_status()
+
+
+def _notify_progress() -> None:
+    """Wake every SSE stream; each one coalesces bursts on its own."""
+    global _progress_event, _progress_shared
+    _progress_shared = None
+    _progress_event.set()
+    _progress_event = asyncio.Event()
+
+
+async def _progress_snapshot() -> dict:
+    """Flat progress document pushed by /api/sync/events."""
+    status, elapsed = await _sync_state()
+    snapshot = status.model_dump()
+    processed = status.replays_fetched + status.replays_skipped
+    rate = None
+    eta = None
+    if elapsed is not None:
+        rate = round(processed / elapsed, 2) if elapsed > 0 else None
+        if rate and status.replays_total is not None:
+            eta = round(max(0, status.replays_total - processed) / rate)
+    snapshot["replays_per_second"] = rate
+    snapshot["eta_seconds"] = eta
+    await client.refresh_rate_limits()
+    snapshot["rate_limits"] = client.rate_limit_status()
+    return snapshot
+
+
+async def _shared_progress_snapshot() -> dict:
+    """_progress_snapshot(), computed once per tick for all SSE streams.
+
+    Streams woken by the same change (or polling within one coalescing
+    window) await the same task instead of each querying the DB.
+    """
+    global _progress_shared
+    now = time.monotonic()
+    if _progress_shared is None or now - _progress_shared[0] >= SSE_COALESCE_SECONDS:
+        _progress_shared = (now, asyncio.ensure_future(_progress_snapshot()))
+    # A disconnecting stream must not cancel the snapshot other streams await
+    return await asyncio.shield(_progress_shared[1])
+
+
+def _progress_delta(prev: dict, cur: dict) -> dict:
+    return {k: v for k, v in cur.items() if prev.get(k) != v}
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _sync_event_stream(request: Request):
+    """Yield a full snapshot, then coalesced deltas whenever progress changes."""
+    prev = await _shared_progress_snapshot()
+    yield _sse("snapshot", prev)
+    while not await request.is_disconnected():
+        changed = _progress_event
+        # Progress made by another worker only shows up in the DB
+        remote = _active_job is None and prev["running"]
+        try:
+            await asyncio.wait_for(
+                changed.wait(), SSE_REMOTE_POLL_SECONDS if remote else SSE_HEARTBEAT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            if not remote:
+                yield ": keepalive\n\n"
+                continue
+        else:
+            await asyncio.sleep(SSE_COALESCE_SECONDS)
+        cur = await _shared_progress_snapshot()
+        delta = _progress_delta(prev, cur)
+        prev = cur
+        if delta:
+            yield _sse("delta", delta)
+
+
+@app.get("/api/sync/events")
+async def sync_events(request: Request):
+    """Server-Sent Events feed of sync progress, replacing status polling."""
+    return StreamingResponse(
+        _sync_event_stream(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/sync/jobs")
+async def list_sync_jobs(
+    status: str | None = Query(None),
+    limit: int = Query(50, le=500),
+) -> list[SyncJob]:
+    return [_job_with_live_counts(row) for row in await db.list_sync_jobs(status, limit)]
+
+
+@app.get("/api/sync/jobs/{job_id}")
+async def get_sync_job(job_id: int) -> SyncJob:
+    row = await db.get_sync_job(job_id)
+    if not row:
+        raise HTTPException(404, "Sync job not found")
+    return _job_with_live_counts(row)
+
+
+@app.delete("/api/sync/jobs/{job_id}")
+async def cancel_sync_job(job_id: int):
+    if not await db.get_sync_job(job_id):
+        raise HTTPException(404, "Sync job not found")
+    if not await db.cancel_sync_job(job_id):
+        raise HTTPException(409, "Only queued jobs can be cancelled")
+    _notify_progress()
+    return {"message": "Sync job cancelled"}
+
+
+def _job_with_live_counts(row: dict) -> SyncJob:
+    job = SyncJob(**row)
+    if _active_job is not None and _active_job.job_id == job.id:
+        job.replays_found = _active_job.replays_found
+        job.replays_fetched = _active_job.replays_fetched
+        job.replays_skipped = _active_job.replays_skipped
+    return job
 
 
 @app.get("/api/sync/coverage")
@@ -161,12 +812,139 @@ async def get_sync_history(
     return [SyncLogEntry(**row) for row in rows]
 
 
+async def _sync_worker() -> None:
+    """Run queued sync jobs one at a time, in whichever worker holds the lease.
+
+    Jobs share the API quota, so running them concurrently would not sync
+    any faster; it would only interleave their progress. With several worker
+    processes each one polls the shared queue, and only the one holding db's
+    sync lease drains it.
+    """
+    while True:
+        _sync_wakeup.clear()
+        try:
+            pending = await db.sync_work_pending()
+            if pending and await db.acquire_sync_lease(WORKER_ID, LEASE_SECONDS):
+                try:
+                    await _hold_lease(_recover_and_drain())
+                finally:
+                    await db.release_sync_lease(WORKER_ID)
+        except Exception as e:
+            # e.g. "database is locked": try again on the next poll
+            print(f"Sync worker error: {e!r}")
+            await asyncio.sleep(SYNC_POLL_SECONDS)
+            continue
+        try:
+            await asyncio.wait_for(_sync_wakeup.wait(), SYNC_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _hold_lease(work) -> None:
+    """Run `work`, renewing the sync lease; cancel it if the lease is lost.
+
+    A renewal that fails with an error is retried on the next round, until
+    the lease would have expired.
+    """
+    task = asyncio.ensure_future(work)
+    renewed = time.monotonic()
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=LEASE_SECONDS / 3)
+            if done:
+                return task.result()
+            try:
+                held = await db.acquire_sync_lease(WORKER_ID, LEASE_SECONDS)
+            except Exception as e:
+                print(f"Could not renew the sync lease: {e!r}")
+                held = time.monotonic() - renewed < LEASE_SECONDS
+            else:
+                renewed = time.monotonic()
+            if not held:
+                print("Lost the sync lease; stopping the running job")
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                return
+    finally:
+        task.cancel()
+
+
+async def _recover_and_drain() -> None:
+    # Holding the lease, anything still marked running was left by a worker
+    # that stopped or died mid-sync
+    stale = await db.clean_stale_syncs()
+    if stale:
+        print(f"Cleaned {stale} stale sync(s) from a stopped worker")
+    requeued = await db.requeue_interrupted_jobs()
+    if requeued:
+        print(f"Requeued {requeued} interrupted sync job(s)")
+    await _drain_sync_queue()
+
+
+async def _drain_sync_queue() -> None:
+    while job := await db.claim_next_sync_job(WORKER_ID):
+        await _run_job(job)
+
+
+async def _persist_progress(status: SyncStatus) -> None:
+    """Copy a running job's counters to sync_jobs for the other workers."""
+    while True:
+        await asyncio.sleep(PROGRESS_WRITE_SECONDS)
+        try:
+            await db.update_sync_job_progress(
+                status.job_id, status.replays_total,
+                status.replays_found, status.replays_fetched, status.replays_skipped,
+            )
+        except Exception as e:
+            # The next write carries the same counters
+            print(f"Could not persist sync progress: {e!r}")
+
+
+async def _run_job(job: dict) -> None:
+    global _active_job, _active_started, _last_job
+    status = SyncStatus(running=True, job_id=job["id"])
+    _active_job = status
+    _active_started = time.monotonic()
+    _notify_progress()
+    progress = asyncio.create_task(_persist_progress(status))
+    try:
+        date_after = job["date_after"]
+        if job["incremental"]:
+            # Start from the high-water mark; with an empty DB this is a full sync
+            date_after = await _incremental_date_after(job["overlap_hours"]) or date_after
+        await _do_sync(
+            date_after, job["date_before"], status,
+            stop_on_known_page=bool(job["incremental"]),
+        )
+    except Exception as e:
+        status.error = str(e)
+    finally:
+        # On shutdown the job stays 'running' and the next lease holder requeues it
+        progress.cancel()
+        status.running = False
+        _active_job = None
+    _last_job = status
+    await db.finish_sync_job(
+        job["id"], "failed" if status.error else "completed",
+        status.replays_found, status.replays_fetched, status.replays_skipped,
+        error=status.error,
+    )
+    _notify_progress()
+
+
 async def _do_sync(
     date_after: str | None,
     date_before: str | None,
+    status: SyncStatus,
+    stop_on_known_page: bool = False,
 ) -> None:
-    global sync_status
+    """Pull replays newest-first and cache any not already stored.
+
+    With stop_on_known_page, pagination ends at the first page whose replays
+    are all already present — everything older was covered by earlier syncs.
+    """
     log_id = await db.create_sync_log(date_after, date_before)
+    telemetry = SyncTelemetry()
     try:
         params: dict = {"count": 200, "sort-by": "replay-date", "sort-dir": "desc", "uploader": UPLOADER_ID}
         if date_after:
@@ -179,24 +957,43 @@ async def _do_sync(
 
         while True:
             if first_page:
-                page = await client.list_replays(**params)
+                with track(telemetry):
+                    page = await client.list_replays(**params)
+                status.replays_total = page.get("count")
                 first_page = False
             else:
                 # Use the 'next' cursor from the previous response
-                page = await client.list_replays(**params)
+                with track(telemetry):
+                    page = await client.list_replays(**params)
 
             replay_list = page.get("list", [])
-            sync_status.replays_found += len(replay_list)
+            status.replays_found += len(replay_list)
+            page_skipped = 0
+            _notify_progress()
 
             for replay_summary in replay_list:
                 rid = replay_summary["id"]
-                if await db.replay_exists(rid):
-                    sync_status.replays_skipped += 1
+                start = time.perf_counter()
+                exists = await db.replay_exists(rid)
+                telemetry.exists_seconds += time.perf_counter() - start
+                if exists:
+                    status.replays_skipped += 1
+                    metrics.SYNC_REPLAYS.inc(1, ("skipped",))
+                    page_skipped += 1
+                    _notify_progress()
                     continue
 
-                detail = await client.get_replay(rid)
+                with track(telemetry):
+                    detail = await client.get_replay(rid)
+                start = time.perf_counter()
                 await db.upsert_replay(rid, detail)
-                sync_status.replays_fetched += 1
+                telemetry.write_seconds += time.perf_counter() - start
+                status.replays_fetched += 1
+                metrics.SYNC_REPLAYS.inc(1, ("fetched",))
+                _notify_progress()
+
+            if stop_on_known_page and replay_list and page_skipped == len(replay_list):
+                break
 
             next_url = page.get("next")
             if not next_url:
@@ -214,18 +1011,18 @@ async def _do_sync(
 
         await db.complete_sync_log(
             log_id, "completed",
-            sync_status.replays_found, sync_status.replays_fetched,
-            sync_status.replays_skipped,
+            status.replays_found, status.replays_fetched, status.replays_skipped,
+            telemetry=telemetry.as_dict(),
         )
+        _schedule_warmup()
     except Exception as e:
-        sync_status.error = str(e)
+        status.error = str(e)
+        _notify_progress()
         await db.complete_sync_log(
             log_id, "failed",
-            sync_status.replays_found, sync_status.replays_fetched,
-            sync_status.replays_skipped, error=str(e),
+            status.replays_found, status.replays_fetched, status.replays_skipped,
+            error=str(e), telemetry=telemetry.as_dict(),
         )
-    finally:
-        sync_status.running = False
 
 
 # --- Players ---
@@ -268,16 +1065,45 @@ async def set_player_config(config: PlayerConfig):
 # --- Replays ---
 
 
+def _encode_cursor(replay: dict) -> str:
+    """Opaque keyset cursor pointing just past `replay`."""
+    key = json.dumps([replay.get("date") or "", replay["id"]]).encode()
+    return base64.urlsafe_b64encode(key).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str | None) -> tuple[str, str] | None:
+    if cursor is None:
+        return None
+    try:
+        date, replay_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
+    if not isinstance(date, str) or not isinstance(replay_id, str):
+        raise HTTPException(400, "Invalid cursor")
+    return date, replay_id
+
+
+def _set_next_cursor(response: Response, replays: list[dict], limit: int) -> None:
+    """Advertise the next page in X-Next-Cursor; a short page means there is none."""
+    if len(replays) == limit and replays:
+        response.headers["X-Next-Cursor"] = _encode_cursor(replays[-1])
+
+
 @app.get("/api/replays")
 async def list_replays(
+    response: Response,
     date_after: str | None = Query(None, alias="date-after"),
     date_before: str | None = Query(None, alias="date-before"),
     map_name: str | None = Query(None, alias="map"),
     playlist: str | None = Query(None),
     limit: int = Query(200, le=500),
     offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None),
 ) -> list[ReplaySummary]:
-    replays = await db.list_replays(date_after, date_before, map_name, playlist, limit, offset)
+    replays = await db.list_replays(
+        date_after, date_before, map_name, playlist, limit, offset, after=_decode_cursor(cursor)
+    )
+    _set_next_cursor(response, replays, limit)
     results = []
     for r in replays:
         blue = r.get("blue", {})
@@ -298,12 +1124,54 @@ async def list_replays(
     return results
 
 
+def _accepts_encoding(request: Request, coding: str) -> bool:
+    """Whether Accept-Encoding allows `coding` (explicitly or via *) with q > 0."""
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.partition(";")
+        if name.strip().lower() not in (coding, "*"):
+            continue
+        q = params.strip().removeprefix("q=") if params.strip().startswith("q=") else "1"
+        try:
+            if float(q) > 0:
+                return True
+        except ValueError:
+            continue
+    return False
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match check; uses weak comparison as RFC 9110 requires."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
 @app.get("/api/replays/{replay_id}")
-async def get_replay(replay_id: str):
-    replay = await db.get_replay(replay_id)
-    if not replay:
+async def get_replay(replay_id: str, request: Request) -> Response:
+    """Serve the stored bytes as-is; the payload is never parsed.
+
+    zlib rows are already an HTTP "deflate" body, so clients that accept it
+    get them without even decompressing. Each encoding gets its own strong
+    ETag, derived from the stored bytes.
+    """
+    row = await db.get_replay_payload(replay_id)
+    if not row:
         raise HTTPException(404, "Replay not found")
-    return replay
+    payload, codec = row
+    stored = payload.encode() if isinstance(payload, str) else payload
+    digest = hashlib.blake2b(stored, digest_size=12).hexdigest()
+    deflate = codec == "zlib" and _accepts_encoding(request, "deflate")
+    etag = f'"{digest}-deflate"' if deflate else f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    if deflate:
+        headers["Content-Encoding"] = "deflate"
+        return Response(stored, media_type="application/json", headers=headers)
+    return Response(db.replay_json(payload, codec), media_type="application/json", headers=headers)
 
 
 # --- Stats ---
@@ -547,14 +1415,51 @@ async def stats_opponents() -> PlayerStats:
     return PlayerStats(name="anon_opponent", role="anon_opponent", stats=agg)
 
 
+def _parse_fields(fields: str | None) -> dict[str, set[str] | None] | None:
+    """Parse `core.goals,positioning` into {group: stat names, or None for all}."""
+    if fields is None:
+        return None
+    projection: dict[str, set[str] | None] = {}
+    for entry in filter(None, (f.strip() for f in fields.split(","))):
+        group, _, stat = entry.partition(".")
+        if not group or "." in stat:
+            raise HTTPException(400, f"Invalid field: {entry}. Use group or group.stat")
+        if not stat:
+            projection[group] = None
+        elif group not in projection or projection[group] is not None:
+            projection.setdefault(group, set()).add(stat)
+    return projection
+
+
+def _project_stats(stats: dict, projection: dict[str, set[str] | None]) -> dict:
+    out = {}
+    for group, wanted in projection.items():
+        values = stats.get(group)
+        if not isinstance(values, dict):
+            continue
+        out[group] = values if wanted is None else {k: values[k] for k in wanted if k in values}
+    return out
+
+
 @app.get("/api/stats/replays")
 async def stats_replays(
+    response: Response,
     limit: int = Query(200, le=500),
     offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None),
+    fields: str | None = Query(None),
+    summary: bool = Query(False),
 ) -> list[dict]:
+    """Per-replay breakdown with player roles resolved.
+
+    `fields` (e.g. `core.goals,positioning`) trims each player's stats to the
+    listed groups or stats; `summary` drops player stats altogether.
+    """
+    projection = _parse_fields(fields)
     config = await db.get_player_config()
     role_lookup = _build_role_lookup(config)
-    replays = await db.list_replays(limit=limit, offset=offset)
+    replays = await db.list_replays(limit=limit, offset=offset, after=_decode_cursor(cursor))
+    _set_next_cursor(response, replays, limit)
     results = []
 
     for replay in replays:
@@ -564,15 +1469,15 @@ async def stats_replays(
             team = replay.get(color, {})
             is_my_team = color == my_team
             for player in team.get("players", []):
-                role = _resolve_player_role(player.get("name", ""), is_my_team, role_lookup)
-                players.append(
-                    ReplayPlayer(
-                        name=player.get("name", "Unknown"),
-                        role=role,
-                        team=color,
-                        stats=player.get("stats", {}),
-                    )
-                )
+                entry = {
+                    "name": player.get("name", "Unknown"),
+                    "role": _resolve_player_role(player.get("name", ""), is_my_team, role_lookup),
+                    "team": color,
+                }
+                if not summary:
+                    stats = player.get("stats", {})
+                    entry["stats"] = stats if projection is None else _project_stats(stats, projection)
+                players.append(entry)
 
         blue = replay.get("blue", {})
         orange = replay.get("orange", {})
@@ -587,7 +1492,7 @@ async def stats_replays(
                 "orange_goals": orange.get("stats", {}).get("core", {}).get("goals"),
                 "overtime": replay.get("overtime", False),
                 "my_team": my_team,
-                "players": [p.model_dump() for p in players],
+                "players": players,
             }
         )
     return results
@@ -709,106 +1614,136 @@ async def stats_scoreline(
     return rows
 
 
-@app.get("/api/stats/games")
-async def stats_games(
-    team_size: int | None = Query(None, alias="team-size"),
-    exclude_ties: bool = Query(False, alias="exclude-ties"),
-    min_duration: int = Query(0, alias="min-duration"),
-    playlists: list[str] = Query([], alias="playlist"),
-) -> list[GameAnalysisRow]:
-    config = await db.get_player_config()
-    if not config.get("me"):
-        raise HTTPException(400, "Player config not set. PUT /api/players/config first.")
+_COLUMNAR_RESPONSE = {200: {"content": {COLUMNAR_MEDIA_TYPE: {}}}}
 
-    role_lookup = _build_role_lookup(config)
-    replays = await db.all_replay_data()
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _game_row(
+    replay: dict,
+    role_lookup: dict[str, str],
+    team_size: int | None,
+    exclude_ties: bool,
+    min_duration: int,
+    playlists: list[str],
+) -> dict | None:
+    """One GameAnalysisRow dict, or None when the replay is filtered out."""
     is_1s = team_size == 1
+    my_team = _find_my_team(replay, role_lookup)
+    if not my_team:
+        return None
 
-    rows = []
-    for replay in replays:
-        my_team = _find_my_team(replay, role_lookup)
-        if not my_team:
-            continue
+    opp_color = "orange" if my_team == "blue" else "blue"
 
-        opp_color = "orange" if my_team == "blue" else "blue"
+    if playlists and (replay.get("playlist_name") or "") not in playlists:
+        return None
 
-        if playlists and (replay.get("playlist_name") or "") not in playlists:
-            continue
+    if team_size is not None:
+        blue_count = len(replay.get("blue", {}).get("players", []))
+        orange_count = len(replay.get("orange", {}).get("players", []))
+        replay_team_size = max(blue_count, orange_count)
+        if replay_team_size != team_size:
+            return None
 
-        if team_size is not None:
-            blue_count = len(replay.get("blue", {}).get("players", []))
-            orange_count = len(replay.get("orange", {}).get("players", []))
-            replay_team_size = max(blue_count, orange_count)
-            if replay_team_size != team_size:
-                continue
+    if min_duration and (replay.get("duration") or 0) < min_duration:
+        return None
 
-        if min_duration and (replay.get("duration") or 0) < min_duration:
-            continue
+    my_goals = _safe_get(replay, my_team, "stats", "core", "goals", default=0)
+    opp_goals = _safe_get(replay, opp_color, "stats", "core", "goals", default=0)
 
-        my_goals = _safe_get(replay, my_team, "stats", "core", "goals", default=0)
-        opp_goals = _safe_get(replay, opp_color, "stats", "core", "goals", default=0)
+    if exclude_ties and my_goals == opp_goals:
+        return None
 
-        if exclude_ties and my_goals == opp_goals:
-            continue
+    me_stats = None
+    tm_pbb, tm_spd, tm_dist = [], [], []
+    opp_pbb, opp_spd, opp_dist = [], [], []
 
-        me_stats = None
-        tm_pbb, tm_spd, tm_dist = [], [], []
-        opp_pbb, opp_spd, opp_dist = [], [], []
+    for color in (my_team, opp_color):
+        team = replay.get(color, {})
+        is_my_team = color == my_team
+        for player in team.get("players", []):
+            stats = player.get("stats", {})
+            pbb = _safe_get(stats, "positioning", "percent_behind_ball", default=0)
+            spd = _safe_get(stats, "movement", "avg_speed", default=0)
+            dist = _safe_get(stats, "positioning", "avg_distance_to_ball", default=0)
+
+            if is_my_team:
+                role = role_lookup.get(player.get("name", "").lower())
+                if role == "me":
+                    me_stats = _role_stats(pbb, spd, dist)
+                elif not is_1s:
+                    tm_pbb.append(pbb)
+                    tm_spd.append(spd)
+                    tm_dist.append(dist)
+            else:
+                opp_pbb.append(pbb)
+                opp_spd.append(spd)
+                opp_dist.append(dist)
 
-        for color in (my_team, opp_color):
-            team = replay.get(color, {})
-            is_my_team = color == my_team
-            for player in team.get("players", []):
-                stats = player.get("stats", {})
-                pbb = _safe_get(stats, "positioning", "percent_behind_ball", default=0)
-                spd = _safe_get(stats, "movement", "avg_speed", default=0)
-                dist = _safe_get(stats, "positioning", "avg_distance_to_ball", default=0)
+    if me_stats is None:
+        return None
 
-                if is_my_team:
-                    role = role_lookup.get(player.get("name", "").lower())
-                    if role == "me":
-                        me_stats = ScorelineRoleStats(
-                            percent_behind_ball=pbb,
-                            avg_speed=spd,
-                            avg_distance_to_ball=dist,
-                        )
-                    elif not is_1s:
-                        tm_pbb.append(pbb)
-                        tm_spd.append(spd)
-                        tm_dist.append(dist)
-                else:
-                    opp_pbb.append(pbb)
-                    opp_spd.append(spd)
-                    opp_dist.append(dist)
+    def _avg(vals: list[float]) -> float:
+        return round(sum(vals) / len(vals), 1) if vals else 0.0
 
-        if me_stats is None:
-            continue
+    return {
+        "id": replay.get("id", ""),
+        "date": replay.get("date", ""),
+        "my_goals": my_goals,
+        "opp_goals": opp_goals,
+        "map_name": replay.get("map_name"),
+        "overtime": replay.get("overtime", False),
+        "me": me_stats,
+        "teammates": _role_stats(_avg(tm_pbb), _avg(tm_spd), _avg(tm_dist))
+        if not is_1s and tm_pbb else None,
+        "opponents": _role_stats(_avg(opp_pbb), _avg(opp_spd), _avg(opp_dist)),
+    }
+
+
+@app.get(
+    "/api/stats/games",
+    response_model=list[GameAnalysisRow],
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def stats_games(
+    request: Request,
+    team_size: int | None = Query(None, alias="team-size"),
+    exclude_ties: bool = Query(False, alias="exclude-ties"),
+    min_duration: int = Query(0, alias="min-duration"),
+    playlists: list[str] = Query([], alias="playlist"),
+) -> Response:
+    """Per-game rows, newest first.
 
-        def _avg(vals: list[float]) -> float:
-            return round(sum(vals) / len(vals), 1) if vals else 0.0
-
-        rows.append(GameAnalysisRow(
-            id=replay.get("id", ""),
-            date=replay.get("date", ""),
-            my_goals=my_goals,
-            opp_goals=opp_goals,
-            map_name=replay.get("map_name"),
-            overtime=replay.get("overtime", False),
-            me=me_stats,
-            teammates=ScorelineRoleStats(
-                percent_behind_ball=_avg(tm_pbb),
-                avg_speed=_avg(tm_spd),
-                avg_distance_to_ball=_avg(tm_dist),
-            ) if not is_1s and tm_pbb else None,
-            opponents=ScorelineRoleStats(
-                percent_behind_ball=_avg(opp_pbb),
-                avg_speed=_avg(opp_spd),
-                avg_distance_to_ball=_avg(opp_dist),
-            ),
-        ))
+    With `Accept: application/x-ndjson` rows are streamed one per line as
+    they are read off the date index, so the first byte does not wait for
+    the whole history.
+    """
+    config = await db.get_player_config()
+    if not config.get("me"):
+        raise HTTPException(400, "Player config not set. PUT /api/players/config first.")
 
-    rows.sort(key=lambda r: r.date, reverse=True)
-    return rows
+    role_lookup = _build_role_lookup(config)
+    filters = (team_size, exclude_ties, min_duration, playlists)
+
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        async def lines():
+            async for replay in db.iter_replay_data():
+                row = _game_row(replay, role_lookup, *filters)
+                if row is not None:
+                    yield orjson.dumps(row) + b"\n"
+
+        return StreamingResponse(
+            lines(), media_type=NDJSON_MEDIA_TYPE, headers={"Vary": "Accept"}
+        )
+
+    rows = []
+    for replay in await db.all_replay_data():
+        row = _game_row(replay, role_lookup, *filters)
+        if row is not None:
+            rows.append(row)
+
+    rows.sort(key=lambda r: r["date"], reverse=True)
+    return FastJSONResponse(rows, headers={"Vary": "Accept"})
 
 
 # --- Correlation ---
@@ -861,53 +1796,95 @@ def _linear_regression(
     return slope, intercept, r_squared
 
 
-def _build_buckets(
-    points: list[CorrelationPoint], num_buckets: int = 10
-) -> list[CorrelationBucket]:
-    """Bin points into equal-width buckets by stat_value."""
+def _build_buckets(points: list[dict], num_buckets: int = 10) -> list[dict]:
+    """Bin CorrelationPoint dicts into equal-width CorrelationBucket dicts by stat_value."""
     if not points:
         return []
-    vals = [p.stat_value for p in points]
+    vals = [p["stat_value"] for p in points]
     lo, hi = min(vals), max(vals)
     if lo == hi:
         hi = lo + 1
     width = (hi - lo) / num_buckets
-    buckets: list[CorrelationBucket] = []
+    buckets: list[dict] = []
     for i in range(num_buckets):
         rmin = lo + i * width
         rmax = lo + (i + 1) * width
         in_bucket = [
             p for p in points
-            if (rmin <= p.stat_value < rmax) or (i == num_buckets - 1 and p.stat_value == rmax)
+            if (rmin <= p["stat_value"] < rmax)
+            or (i == num_buckets - 1 and p["stat_value"] == rmax)
         ]
         games = len(in_bucket)
         if games == 0:
             continue
-        wins = sum(1 for p in in_bucket if p.goal_diff > 0)
-        losses = sum(1 for p in in_bucket if p.goal_diff < 0)
+        wins = sum(1 for p in in_bucket if p["goal_diff"] > 0)
+        losses = sum(1 for p in in_bucket if p["goal_diff"] < 0)
         draws = games - wins - losses
-        buckets.append(CorrelationBucket(
-            range_min=round(rmin, 1),
-            range_max=round(rmax, 1),
-            label=f"{rmin:.0f}-{rmax:.0f}",
-            games=games,
-            wins=wins,
-            losses=losses,
-            draws=draws,
-            win_rate=round(wins / games * 100, 1),
-        ))
+        buckets.append({
+            "range_min": round(rmin, 1),
+            "range_max": round(rmax, 1),
+            "label": f"{rmin:.0f}-{rmax:.0f}",
+            "games": games,
+            "wins": wins,
+            "losses": losses,
+            "draws": draws,
+            "win_rate": round(wins / games * 100, 1),
+        })
     return buckets
 
 
-@app.get("/api/stats/correlation")
+def _sample_points(points: list[dict], max_points: int) -> list[dict]:
+    """Pick max_points points at evenly spaced ranks of stat_value.
+
+    Deterministic, keeps both extremes (so the chart's x range is unchanged)
+    and preserves the stat distribution; the result is in stat_value order.
+    """
+    if len(points) <= max_points:
+        return points
+    ranked = sorted(points, key=lambda p: p["stat_value"])
+    if max_points == 1:
+        return [ranked[len(ranked) // 2]]
+    step = (len(ranked) - 1) / (max_points - 1)
+    return [ranked[round(i * step)] for i in range(max_points)]
+
+
+def _density_grid(points: list[dict], bins: int) -> dict | None:
+    """Count points on a grid of equal-width stat_value bins by goal_diff."""
+    if not points:
+        return None
+    lo = min(p["stat_value"] for p in points)
+    hi = max(p["stat_value"] for p in points)
+    gd_lo = min(p["goal_diff"] for p in points)
+    gd_hi = max(p["goal_diff"] for p in points)
+    width = (hi - lo) / bins or 1.0
+    counts = [[0] * bins for _ in range(gd_hi - gd_lo + 1)]
+    for p in points:
+        col = min(int((p["stat_value"] - lo) / width), bins - 1)
+        counts[p["goal_diff"] - gd_lo][col] += 1
+    return {
+        "x_min": lo,
+        "x_max": hi,
+        "bins": bins,
+        "goal_diff_min": gd_lo,
+        "goal_diff_max": gd_hi,
+        "counts": counts,
+    }
+
+
+@app.get(
+    "/api/stats/correlation", response_model=CorrelationResponse, responses=_COLUMNAR_RESPONSE
+)
 async def stats_correlation(
+    request: Request,
     stat: str = Query(..., alias="stat"),
     role: str = Query("me", alias="role"),
     team_size: int | None = Query(None, alias="team-size"),
     exclude_ties: bool = Query(False, alias="exclude-ties"),
     min_duration: int = Query(0, alias="min-duration"),
     playlists: list[str] = Query([], alias="playlist"),
-) -> CorrelationResponse:
+    max_points: int | None = Query(None, alias="max-points", ge=1),
+    density_bins: int | None = Query(None, alias="density-bins", ge=1, le=500),
+) -> Response:
     if stat not in STAT_PATHS:
         raise HTTPException(400, f"Unknown stat: {stat}. Valid: {', '.join(sorted(STAT_PATHS))}")
     if role not in ("me", "teammates", "opponents"):
@@ -922,7 +1899,7 @@ async def stats_correlation(
     stat_path = STAT_PATHS[stat]
     is_1s = team_size == 1
 
-    points: list[CorrelationPoint] = []
+    points: list[dict] = []
     for replay in replays:
         my_team = _find_my_team(replay, role_lookup)
         if not my_team:
@@ -950,11 +1927,11 @@ async def stats_correlation(
                 if role_lookup.get(player.get("name", "").lower()) == "me":
                     val = _safe_get(player.get("stats", {}), *stat_path, default=None)
                     if val is not None:
-                        points.append(CorrelationPoint(
-                            stat_value=float(val),
-                            goal_diff=my_goals - opp_goals,
-                            won=my_goals > opp_goals,
-                        ))
+                        points.append({
+                            "stat_value": float(val),
+                            "goal_diff": my_goals - opp_goals,
+                            "won": my_goals > opp_goals,
+                        })
                     break
         elif role == "teammates":
             vals = []
@@ -964,11 +1941,11 @@ async def stats_correlation(
                     if v is not None:
                         vals.append(float(v))
             if vals and not is_1s:
-                points.append(CorrelationPoint(
-                    stat_value=round(sum(vals) / len(vals), 1),
-                    goal_diff=my_goals - opp_goals,
-                    won=my_goals > opp_goals,
-                ))
+                points.append({
+                    "stat_value": round(sum(vals) / len(vals), 1),
+                    "goal_diff": my_goals - opp_goals,
+                    "won": my_goals > opp_goals,
+                })
         elif role == "opponents":
             vals = []
             for player in replay.get(opp_color, {}).get("players", []):
@@ -976,29 +1953,40 @@ async def stats_correlation(
                 if v is not None:
                     vals.append(float(v))
             if vals:
-                points.append(CorrelationPoint(
-                    stat_value=round(sum(vals) / len(vals), 1),
-                    goal_diff=my_goals - opp_goals,
-                    won=my_goals > opp_goals,
-                ))
+                points.append({
+                    "stat_value": round(sum(vals) / len(vals), 1),
+                    "goal_diff": my_goals - opp_goals,
+                    "won": my_goals > opp_goals,
+                })
 
     # Regression: stat_value vs goal_diff
-    xs = [p.stat_value for p in points]
-    ys = [float(p.goal_diff) for p in points]
+    xs = [p["stat_value"] for p in points]
+    ys = [float(p["goal_diff"]) for p in points]
     slope, intercept, r_sq = _linear_regression(xs, ys)
 
-    return CorrelationResponse(
-        stat=stat,
-        role=role,
-        games=len(points),
-        points=points,
-        buckets=_build_buckets(points),
-        regression=RegressionLine(
-            slope=round(slope, 4),
-            intercept=round(intercept, 4),
-            r_squared=round(r_sq, 4),
-        ),
-    )
+    body = {
+        "stat": stat,
+        "role": role,
+        "games": len(points),
+        "points": points,
+        "buckets": _build_buckets(points),
+        "regression": {
+            "slope": round(slope, 4),
+            "intercept": round(intercept, 4),
+            "r_squared": round(r_sq, 4),
+        },
+        "density": None,
+    }
+    # games, buckets and regression above always cover every matching game;
+    # only the per-game point cloud is reduced
+    if density_bins is not None:
+        body["points"] = []
+        body["density"] = _density_grid(points, density_bins)
+    elif max_points is not None:
+        body["points"] = _sample_points(points, max_points)
+    if _wants_columnar(request):
+        return _columnar_response({**body, "points": _columns(body["points"])})
+    return FastJSONResponse(body, headers={"Vary": "Accept"})
 
 
 # --- Maps ---
@@ -0,0 +1,109 @@
+"""Versioned on-disk snapshot of derived analytics responses.
+
+The response cache (http_compression.ResponseCache) holds the expensive part of
+the analytics views: every replay decoded, roles resolved, stats aggregated,
+the result serialized and encoded. It lives in process memory, so a restart
+starts cold. After a cache warm-up server.py saves the warmed entries here,
+next to the DB, and at startup loads them back when the tag still matches.
+
+One JSON header line, then the bodies back to back:
+
+    {"version": 1, "tag": {...}, "entries": [{..., "offset": 0, "length": 812}]}
+    <body><body>...
+
+The tag is compared before any body is read; bodies are sliced out of an
+mmap of the file. A snapshot is written to a temporary name and renamed,
+so readers never see a partial file and concurrent writers (several
+workers) leave one complete snapshot.
+"""
+from __future__ import annotations
+
+import mmap
+import os
+import tempfile
+from dataclasses import dataclass
+
+import orjson
+
+# Bump when the file layout changes
+VERSION = 1
+
+
+@dataclass
+class Entry:
+    """One cached response and the request that produced it."""
+
+    path: str
+    query: list[tuple[str, str]]
+    accept: str
+    coding: str
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+def path_for(db_path: str) -> str:
+    return f"{db_path}.snapshot"
+
+
+def save(path: str, tag: dict, entries: list[Entry]) -> int:
+    """Write `entries` under `tag`, replacing any older snapshot; returns bytes written."""
+    header = {"version": VERSION, "tag": tag, "entries": []}
+    offset = 0
+    for e in entries:
+        header["entries"].append({
+            "path": e.path,
+            "query": e.query,
+            "accept": e.accept,
+            "coding": e.coding,
+            "status": e.status,
+            "headers": [[k.decode("latin-1"), v.decode("latin-1")] for k, v in e.headers],
+            "offset": offset,
+            "length": len(e.body),
+        })
+        offset += len(e.body)
+    head = orjson.dumps(header) + b"\n"
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(head)
+            for e in entries:
+                f.write(e.body)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return len(head) + offset
+
+
+def load(path: str, tag: dict) -> list[Entry] | None:
+    """Entries of the snapshot at `path`, or None if missing, unreadable or tagged otherwise."""
+    try:
+        with open(path, "rb") as f:
+            header = orjson.loads(f.readline())
+            if header.get("version") != VERSION or header.get("tag") != tag:
+                return None
+            start = f.tell()
+            size = os.fstat(f.fileno()).st_size
+            if size == start:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                entries = []
+                for e in header["entries"]:
+                    begin = start + e["offset"]
+                    if begin + e["length"] > size:
+                        return None  # truncated
+                    entries.append(Entry(
+                        path=e["path"],
+                        query=[tuple(pair) for pair in e["query"]],
+                        accept=e["accept"],
+                        coding=e["coding"],
+                        status=e["status"],
+                        headers=[
+                            (k.encode("latin-1"), v.encode("latin-1")) for k, v in e["headers"]
+                        ],
+                        body=data[begin:begin + e["length"]],
+                    ))
+                return entries
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
@@ -0,0 +1,88 @@
+"""Interval arithmetic over sync date ranges.
+
+Sync bounds are ISO timestamps (or date-only strings) and None for unbounded.
+Internally an interval is a closed (start, end) pair of aware datetimes, with
+MIN/MAX standing in for the unbounded ends.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+MIN = datetime.min.replace(tzinfo=timezone.utc)
+MAX = datetime.max.replace(tzinfo=timezone.utc)
+
+# Ranges this close together are contiguous, e.g. a sync ending at T23:59:59
+# followed by one starting at the next day's T00:00:00.
+ADJACENCY = timedelta(seconds=1)
+
+# Replays per list page when syncing (matches _do_sync's count param)
+PAGE_SIZE = 200
+
+Interval = tuple[datetime, datetime]
+
+
+def parse_bound(value: str | None, end: bool = False) -> datetime:
+    """Parse a sync bound. Date-only end bounds cover the whole day."""
+    if value is None:
+        return MAX if end else MIN
+    dt = datetime.fromisoformat(value)
+    if "T" not in value and end:
+        dt += timedelta(days=1) - ADJACENCY
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def format_bound(dt: datetime) -> str | None:
+    if dt in (MIN, MAX):
+        return None
+    return dt.isoformat()
+
+
+def to_interval(date_after: str | None, date_before: str | None) -> Interval:
+    return parse_bound(date_after), parse_bound(date_before, end=True)
+
+
+def merge(intervals: list[Interval]) -> list[Interval]:
+    """Merge overlapping or adjacent intervals into a sorted disjoint list."""
+    merged: list[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and (merged[-1][1] == MAX or start <= merged[-1][1] + ADJACENCY):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def uncovered(requested: Interval, covered: list[Interval]) -> list[Interval]:
+    """Return the parts of requested not covered by any interval in covered."""
+    start, end = requested
+    gaps: list[Interval] = []
+    cursor = start
+    for c_start, c_end in merge(covered):
+        if c_end < cursor:
+            continue
+        if c_start > end:
+            break
+        if c_start > cursor:
+            gaps.append((cursor, c_start - ADJACENCY))
+        if c_end >= end:
+            return gaps
+        cursor = c_end + ADJACENCY
+    gaps.append((cursor, end))
+    return gaps
+
+
+def count_in(interval: Interval, day_counts: dict[str, int]) -> int:
+    """Sum per-day replay counts for days touching the interval."""
+    first = None if interval[0] == MIN else interval[0].date().isoformat()
+    last = None if interval[1] == MAX else interval[1].date().isoformat()
+    return sum(
+        n for day, n in day_counts.items()
+        if (first is None or day >= first) and (last is None or day <= last)
+    )
+
+
+def estimate_list_calls(known_replays: int) -> int:
+    """Lower bound on list pages needed to walk a range holding known_replays."""
+    return max(1, -(-known_replays // PAGE_SIZE))
@@ -123,9 +123,10 @@ async def api_client(monkeypatch, tmp_path):
     mock_client.get_maps.return_value = []
     server.client = mock_client
 
-    # Reset sync status
-    from models import SyncStatus
-    monkeypatch.setattr(server, "sync_status", SyncStatus(running=False))
+    # Reset sync job state
+    monkeypatch.setattr(server, "_active_job", None)
+    monkeypatch.setattr(server, "_last_job", None)
+    monkeypatch.setattr(server, "_progress_shared", None)
 
     transport = httpx.ASGITransport(app=server.app)
     async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
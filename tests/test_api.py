@@ -1,7 +1,12 @@
 """Tests for API endpoints via FastAPI test client."""
 from __future__ import annotations
 
+import asyncio
+import json
+from unittest.mock import AsyncMock
+
 import db
+import metrics
 from tests.conftest import _make_player, make_replay
 
 
@@ -80,6 +85,120 @@ async def test_get_replay_404(api_client):
     assert resp.status_code == 404
 
 
+async def test_get_replay_serves_precompressed_deflate(api_client, monkeypatch):
+    monkeypatch.setattr(db, "REPLAY_CODEC", "zlib")
+    replay = make_replay(replay_id="r1")
+    await db.upsert_replay("r1", replay)
+    stored, _ = await db.get_replay_payload("r1")
+
+    resp = await api_client.get("/api/replays/r1", headers={"Accept-Encoding": "deflate"})
+    assert resp.headers["content-encoding"] == "deflate"
+    assert "Accept-Encoding" in resp.headers["vary"]
+    assert resp.json() == replay
+    # httpx decodes transparently; the wire body is the stored row
+    assert int(resp.headers["content-length"]) == len(stored)
+
+    resp = await api_client.get("/api/replays/r1", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in resp.headers
+    assert resp.json() == replay
+
+    # Other clients get the JSON gzipped by the middleware, under a weak tag
+    resp = await api_client.get("/api/replays/r1", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.headers["etag"].startswith("W/")
+    assert resp.json() == replay
+
+
+async def test_get_replay_etag_revalidation(api_client, monkeypatch):
+    monkeypatch.setattr(db, "REPLAY_CODEC", "json")
+    await db.upsert_replay("r1", make_replay(replay_id="r1"))
+
+    identity = {"Accept-Encoding": "identity"}
+    resp = await api_client.get("/api/replays/r1", headers=identity)
+    etag = resp.headers["etag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+
+    resp = await api_client.get("/api/replays/r1", headers={**identity, "If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["etag"] == etag
+
+    await db.upsert_replay("r1", make_replay(replay_id="r1", map_name="Map B"))
+    resp = await api_client.get("/api/replays/r1", headers={**identity, "If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] != etag
+    assert resp.json()["map_name"] == "Map B"
+
+
+# --- Metrics ---
+
+
+async def test_metrics_endpoint(api_client):
+    import server
+
+    server.client.rate_limit_status.return_value = {
+        "tier": "gold",
+        "list": {"tokens_available": 2.0, "per_hour": 1000, "hour_used": 10},
+        "get": {"tokens_available": 1.5, "per_hour": None, "hour_used": 0},
+    }
+    await db.upsert_replay("r1", make_replay(replay_id="r1"))
+    await api_client.get("/api/replays/r1")
+    await api_client.get("/api/players")
+    resp = await api_client.get("/api/metrics")
+    assert resp.headers["content-type"].startswith("text/plain")
+    text = resp.text
+
+    assert 'rlstats_http_requests_total{method="GET",route="/api/replays/{replay_id}",status="200"}' in text
+    assert 'rlstats_http_request_duration_seconds_count{method="GET",route="/api/players"}' in text
+    assert 'rlstats_db_call_duration_seconds_count{call="all_replay_data"}' in text
+    assert 'call="init_db"' not in text  # startup work is not timed
+    assert 'rlstats_replays_decoded_total{codec="zlib"}' in text
+    assert 'rlstats_token_bucket_tokens{bucket="list",window="hour"} 990' in text
+    assert 'rlstats_token_bucket_tokens{bucket="get",window="second"} 1.5' in text
+    assert 'rlstats_response_cache_requests_total{result="miss"}' in text
+
+
+# --- Profiles ---
+
+
+async def test_profiled_request_reports_phases(api_client):
+    await _setup_stats()
+    await api_client.get("/api/stats/scoreline")  # fills the response cache
+    resp = await api_client.get("/api/stats/scoreline", headers={"X-Profile": "1"})
+    assert resp.status_code == 200
+    timing = dict(
+        part.strip().split(";dur=") for part in resp.headers["server-timing"].split(",")
+    )
+    assert set(timing) == {
+        "db_fetch", "json_decode", "role_resolution", "aggregation",
+        "serialization", "compression", "total",
+    }
+    # The route ran despite the cached copy, so the DB was read
+    assert float(timing["db_fetch"]) + float(timing["json_decode"]) > 0
+
+    profile_id = resp.headers["x-profile-id"]
+    listed = (await api_client.get("/api/profiles")).json()
+    assert listed[0]["id"] == profile_id
+    assert listed[0]["path"] == "/api/stats/scoreline"
+    folded = await api_client.get(f"/api/profiles/{profile_id}")
+    assert folded.status_code == 200
+    assert (await api_client.get("/api/profiles/nope")).status_code == 404
+
+
+async def test_profiling_is_localhost_only(api_client):
+    import httpx
+
+    import server
+
+    await _setup_stats()
+    transport = httpx.ASGITransport(app=server.app, client=("203.0.113.5", 4000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as remote:
+        resp = await remote.get("/api/stats/scoreline", headers={"X-Profile": "1"})
+        assert resp.status_code == 200
+        assert "server-timing" not in resp.headers
+        assert (await remote.get("/api/profiles")).status_code == 403
+
+
 # --- Stats ---
 
 
@@ -99,6 +218,194 @@ async def _setup_stats(config=None):
     ))
 
 
+async def test_analysis_conditional_get(api_client, monkeypatch):
+    await _setup_stats()
+    resp = await api_client.get("/api/stats/scoreline")
+    etag = resp.headers["etag"]
+    assert etag.startswith('W/"')
+    assert resp.headers["cache-control"] == "no-cache"
+
+    # A match is answered before the route runs, so SQLite is never read
+    with monkeypatch.context() as m:
+        m.setattr(db, "all_replay_data", AsyncMock(side_effect=AssertionError))
+        resp = await api_client.get("/api/stats/scoreline", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.headers["etag"] == etag
+
+    other = await api_client.get("/api/stats/scoreline", params={"team-size": 2})
+    assert other.headers["etag"] != etag
+
+    await db.upsert_replay("r2", make_replay(replay_id="r2"))
+    resp = await api_client.get("/api/stats/scoreline", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    after_replay = resp.headers["etag"]
+    assert after_replay != etag
+
+    await db.set_player_config({"me": ["TestPlayer"], "teammates": {}})
+    resp = await api_client.get("/api/stats/scoreline", headers={"If-None-Match": after_replay})
+    assert resp.status_code == 200
+
+
+async def test_validators_move_with_writes_from_other_workers(api_client):
+    import sqlite3
+
+    await _setup_stats()
+    resp = await api_client.get("/api/stats/scoreline")
+    etag = resp.headers["etag"]
+    # Another worker process commits
+    conn = sqlite3.connect(db.DB_PATH)
+    conn.execute("UPDATE player_config SET config = ? WHERE id = 1", ('{"me": ["Nobody"]}',))
+    conn.commit()
+    conn.close()
+    # Other processes' commits show up at the next poll (_poll_generations)
+    await db.refresh_generations()
+    resp = await api_client.get("/api/stats/scoreline", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] != etag
+
+
+async def test_revalidation_does_not_touch_the_database(api_client):
+    import sqlite3
+
+    await _setup_stats()
+    resp = await api_client.get("/api/stats/scoreline")
+    etag = resp.headers["etag"]
+    # A writer holding the lock neither blocks nor fails the 304
+    conn = sqlite3.connect(db.DB_PATH)
+    conn.execute("BEGIN EXCLUSIVE")
+    try:
+        resp = await api_client.get("/api/stats/scoreline", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        # The poll gives up quickly and keeps what it knew
+        assert await db.refresh_generations() is not None
+    finally:
+        conn.rollback()
+        conn.close()
+
+    # This process's own writes move the ETag without waiting for a poll
+    await db.set_player_config({"me": ["Nobody"]})
+    assert db.generations() is None
+    resp = await api_client.get("/api/stats/scoreline", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] != etag
+
+
+async def test_validators_ignore_writes_outside_analytics_data(api_client, monkeypatch):
+    await _setup_stats()
+    resp = await api_client.get("/api/stats/scoreline")
+    etag = resp.headers["etag"]
+    # What a running sync commits several times a second
+    await db.take_api_token("get", 10.0, None)
+    assert await db.acquire_sync_lease("worker-1", 30)
+    job_id = await db.enqueue_sync_job(None, None)
+    await db.update_sync_job_progress(job_id, 9, 5, 2, 1)
+    log_id = await db.create_sync_log(None, None)
+
+    with monkeypatch.context() as m:
+        m.setattr(db, "all_replay_data", AsyncMock(side_effect=AssertionError))
+        resp = await api_client.get("/api/stats/scoreline", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        cached = await api_client.get("/api/stats/scoreline")
+        assert cached.status_code == 200
+
+    await db.complete_sync_log(log_id, "completed", 0, 0, 0)
+    resp = await api_client.get("/api/stats/scoreline", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+
+
+async def test_analysis_responses_served_from_cache(api_client, monkeypatch):
+    await _setup_stats()
+    first = await api_client.get("/api/stats/scoreline")
+    with monkeypatch.context() as m:
+        m.setattr(db, "all_replay_data", AsyncMock(side_effect=AssertionError))
+        m.setattr(db, "get_player_config", AsyncMock(side_effect=AssertionError))
+        again = await api_client.get("/api/stats/scoreline")
+    assert again.status_code == 200
+    assert again.json() == first.json()
+    assert again.headers["etag"] == first.headers["etag"]
+
+
+async def test_warm_up_caches_default_views(api_client, monkeypatch):
+    import server
+
+    await _setup_stats()
+    server.response_cache.clear()
+    monkeypatch.setattr(server, "WARMUP_PAUSE_SECONDS", 0)
+    route = ("GET", "/api/stats/scoreline")
+    recorded = metrics.HTTP_SECONDS.count(route)
+    assert await server._warm_cache(delay=0) == len(server.WARM_VIEWS)
+    # Warm requests are not user traffic
+    assert metrics.HTTP_SECONDS.count(route) == recorded
+
+    params = [("team-size", "2"), *server._DEFAULT_FILTERS]
+    gzip = {"Accept-Encoding": "gzip"}
+    with monkeypatch.context() as m:
+        for name in ("all_replay_data", "iter_replay_data", "get_player_config"):
+            m.setattr(db, name, AsyncMock(side_effect=AssertionError))
+        scoreline = await api_client.get("/api/stats/scoreline", params=params, headers=gzip)
+        stream = await api_client.get(
+            "/api/stats/games", params=params,
+            headers={**gzip, "Accept": "application/x-ndjson"},
+        )
+    assert scoreline.status_code == stream.status_code == 200
+    assert scoreline.json()[0]["my_goals"] == 3
+    assert json.loads(stream.text.splitlines()[0])["id"] == "r1"
+
+
+async def test_snapshot_restores_warmed_views_until_stale(api_client, monkeypatch):
+    import server
+
+    await _setup_stats()
+    monkeypatch.setattr(server, "WARMUP_PAUSE_SECONDS", 0)
+    monkeypatch.setattr(server, "_snapshot_on_disk", None)
+    await server._warm_cache(delay=0)
+    # A restart: empty cache, and the lifespan's init_db leaves generations unread
+    server.response_cache.clear()
+    await db.init_db()
+    assert await server._load_snapshot() == len(server.WARM_VIEWS)
+
+    params = [("team-size", "3"), *server._DEFAULT_FILTERS]
+    with monkeypatch.context() as m:
+        for name in ("all_replay_data", "iter_replay_data", "get_player_config"):
+            m.setattr(db, name, AsyncMock(side_effect=AssertionError))
+        me = await api_client.get("/api/stats/me", headers={"Accept-Encoding": "gzip"})
+        games = await api_client.get(
+            "/api/stats/games", params=params,
+            headers={"Accept-Encoding": "gzip", "Accept": "application/x-ndjson"},
+        )
+    assert me.json()["stats"]["games"] == 1
+    assert games.status_code == 200
+
+    await db.upsert_replay("r2", make_replay(replay_id="r2"))
+    assert await server._load_snapshot() == 0
+    await server._warm_cache(delay=0)
+    await db.set_player_config({"me": ["TestPlayer"], "teammates": {}})
+    assert await server._load_snapshot() == 0
+
+
+async def test_warm_up_skips_failing_views_and_only_runs_when_serving(api_client, monkeypatch):
+    import server
+
+    await db.upsert_replay("r1", make_replay(replay_id="r1"))
+    monkeypatch.setattr(server, "WARMUP_PAUSE_SECONDS", 0)
+    # Without a player config only the player list answers 200
+    assert await server._warm_cache(delay=0) == 1
+    with monkeypatch.context() as m:
+        m.setattr(db, "all_replay_data", AsyncMock(side_effect=AssertionError))
+        players = await api_client.get("/api/players", headers={"Accept-Encoding": "gzip"})
+    assert players.status_code == 200
+    server._schedule_warmup()
+    assert server._warm_task is None
+
+
+async def test_conditional_get_skips_errors_and_other_routes(api_client):
+    resp = await api_client.get("/api/stats/me")
+    assert resp.status_code == 400
+    assert "etag" not in resp.headers
+    resp = await api_client.get("/api/sync/status")
+    assert "etag" not in resp.headers
+
+
 async def test_stats_me_requires_config(api_client):
     resp = await api_client.get("/api/stats/me")
     assert resp.status_code == 400
@@ -171,6 +478,112 @@ async def test_stats_games_team_size_filter(api_client):
     assert resp.json() == []
 
 
+COLUMNAR = "application/vnd.rlstats.columnar+json"
+
+
+async def test_stats_games_ndjson_stream(api_client):
+    await _setup_stats()
+    await db.upsert_replay("r2", make_replay(replay_id="r2", date="2025-01-16T20:00:00Z"))
+    await db.upsert_replay("r3", make_replay(replay_id="r3", date="2025-01-14T20:00:00Z"))
+    rows = (await api_client.get("/api/stats/games")).json()
+
+    resp = await api_client.get("/api/stats/games", headers={"Accept": "application/x-ndjson"})
+    assert resp.headers["content-type"] == "application/x-ndjson"
+    lines = resp.text.splitlines()
+    assert [json.loads(line) for line in lines] == rows
+    assert [r["id"] for r in rows] == ["r2", "r1", "r3"]
+
+
+async def test_stats_games_ndjson_requires_config(api_client):
+    resp = await api_client.get("/api/stats/games", headers={"Accept": "application/x-ndjson"})
+    assert resp.status_code == 400
+
+
+async def test_columnar_correlation_points(api_client):
+    await _setup_stats()
+    params = {"stat": "avg_speed"}
+    rows = (await api_client.get("/api/stats/correlation", params=params)).json()
+    resp = await api_client.get(
+        "/api/stats/correlation", params=params, headers={"Accept": COLUMNAR}
+    )
+    body = resp.json()
+    assert body["points"] == {
+        "length": 1,
+        "columns": {"stat_value": [1400.0], "goal_diff": [2], "won": [True]},
+    }
+    assert body["buckets"] == rows["buckets"]
+    assert body["regression"] == rows["regression"]
+
+
+async def test_fast_json_endpoints_match_declared_models(api_client):
+    from pydantic import TypeAdapter
+
+    from models import CorrelationResponse, GameAnalysisRow
+
+    await _setup_stats()
+    games = (await api_client.get("/api/stats/games")).json()
+    # Plain dicts must serialize exactly as the declared models would
+    typed = TypeAdapter(list[GameAnalysisRow]).validate_python(games)
+    assert [row.model_dump() for row in typed] == games
+
+    resp = await api_client.get("/api/stats/correlation", params={"stat": "avg_speed"})
+    corr = resp.json()
+    assert CorrelationResponse.model_validate(corr).model_dump() == corr
+    assert corr["points"] == [{"stat_value": 1400.0, "goal_diff": 2, "won": True}]
+
+    schema = (await api_client.get("/openapi.json")).json()
+    responses = schema["paths"]["/api/stats/games"]["get"]["responses"]["200"]
+    assert "GameAnalysisRow" in json.dumps(responses)
+    responses = schema["paths"]["/api/stats/correlation"]["get"]["responses"]["200"]
+    assert "CorrelationResponse" in json.dumps(responses)
+    assert COLUMNAR in responses["content"]
+
+
+async def test_correlation_max_points_keeps_full_aggregates(api_client):
+    await db.set_player_config({"me": ["TestPlayer"], "teammates": {}})
+    for i in range(9):
+        me = _make_player("TestPlayer", platform_id="P1")
+        me["stats"]["core"]["score"] = 100 * i
+        await db.upsert_replay(f"r{i}", make_replay(
+            replay_id=f"r{i}", date=f"2025-01-{10 + i}T20:00:00Z",
+            blue_players=[me], orange_players=[_make_player("Opp", platform_id="P2")],
+            blue_goals=i % 4, orange_goals=1,
+        ))
+    params = {"stat": "score"}
+    full = (await api_client.get("/api/stats/correlation", params=params)).json()
+    sampled = (await api_client.get(
+        "/api/stats/correlation", params={**params, "max-points": 3}
+    )).json()
+
+    assert [p["stat_value"] for p in sampled["points"]] == [0.0, 400.0, 800.0]
+    assert sampled["games"] == full["games"] == 9
+    assert sampled["buckets"] == full["buckets"]
+    assert sampled["regression"] == full["regression"]
+
+    grid = (await api_client.get(
+        "/api/stats/correlation", params={**params, "density-bins": 4}
+    )).json()
+    assert grid["points"] == []
+    assert grid["regression"] == full["regression"]
+    density = grid["density"]
+    assert (density["goal_diff_min"], density["goal_diff_max"]) == (-1, 2)
+    assert sum(map(sum, density["counts"])) == 9
+
+    # The columnar body (what the frontend asks for) is reduced the same way
+    columnar = (await api_client.get(
+        "/api/stats/correlation", params={**params, "max-points": 3},
+        headers={"Accept": COLUMNAR},
+    )).json()
+    assert columnar["points"]["columns"]["stat_value"] == [0.0, 400.0, 800.0]
+    assert columnar["games"] == 9
+    columnar = (await api_client.get(
+        "/api/stats/correlation", params={**params, "density-bins": 4},
+        headers={"Accept": COLUMNAR},
+    )).json()
+    assert columnar["points"]["length"] == 0
+    assert columnar["density"] == density
+
+
 # --- Stats replays (role-resolved) ---
 
 
@@ -183,3 +596,429 @@ async def test_stats_replays(api_client):
     players = data[0]["players"]
     roles = [p["role"] for p in players]
     assert "me" in roles
+
+
+async def test_stats_replays_field_projection(api_client):
+    await _setup_stats()
+    resp = await api_client.get(
+        "/api/stats/replays", params={"fields": "core.goals,core.saves,demo,nope.x"}
+    )
+    assert resp.status_code == 200
+    stats = resp.json()[0]["players"][0]["stats"]
+    assert stats == {
+        "core": {"goals": 2, "saves": 1},
+        "demo": {"inflicted": 1, "taken": 0},
+    }
+
+
+async def test_stats_replays_summary_mode(api_client):
+    await _setup_stats()
+    resp = await api_client.get("/api/stats/replays", params={"summary": "true"})
+    replay = resp.json()[0]
+    assert replay["blue_goals"] == 3
+    assert all(set(p) == {"name", "role", "team"} for p in replay["players"])
+    assert "me" in [p["role"] for p in replay["players"]]
+
+
+async def test_stats_replays_rejects_bad_field(api_client):
+    resp = await api_client.get("/api/stats/replays", params={"fields": "core.goals.x"})
+    assert resp.status_code == 400
+
+
+async def _page_through(api_client, url: str, limit: int) -> list[list[str]]:
+    pages, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        resp = await api_client.get(url, params=params)
+        assert resp.status_code == 200
+        pages.append([r["id"] for r in resp.json()])
+        cursor = resp.headers.get("x-next-cursor")
+        if cursor is None:
+            return pages
+
+
+async def test_replay_listings_keyset_pagination(api_client):
+    # Two replays share a date, so the id tiebreak matters
+    dates = ["2025-01-15T20:00:00Z", "2025-01-15T20:00:00Z", "2025-01-14T20:00:00Z",
+             "2025-01-13T20:00:00Z", "2025-01-12T20:00:00Z"]
+    for i, date in enumerate(dates):
+        await db.upsert_replay(f"r{i}", make_replay(replay_id=f"r{i}", date=date))
+
+    for url in ("/api/replays", "/api/stats/replays"):
+        pages = await _page_through(api_client, url, limit=2)
+        assert pages == [["r1", "r0"], ["r2", "r3"], ["r4"]]
+
+    # Undated replays sort last and are still reachable through the cursor
+    for rid in ("u0", "u1"):
+        replay = make_replay(replay_id=rid)
+        replay["date"] = None
+        await db.upsert_replay(rid, replay)
+    for url in ("/api/replays", "/api/stats/replays"):
+        pages = await _page_through(api_client, url, limit=2)
+        assert pages == [["r1", "r0"], ["r2", "r3"], ["r4", "u1"], ["u0"]]
+
+
+async def test_replay_listing_rejects_bad_cursor(api_client):
+    resp = await api_client.get("/api/replays", params={"cursor": "not-a-cursor"})
+    assert resp.status_code == 400
+
+
+# --- Incremental sync ---
+
+
+async def test_incremental_sync_starts_from_high_water_mark(api_client):
+    import server
+
+    await db.upsert_replay("r1", make_replay(replay_id="r1", date="2025-01-15T20:00:00+00:00"))
+    resp = await api_client.post("/api/sync", params={"incremental": "true", "overlap-hours": 2})
+    assert resp.status_code == 200
+    await server._drain_sync_queue()
+
+    params = server.client.list_replays.call_args.kwargs
+    assert params["replay-date-after"] == "2025-01-15T18:00:00+00:00"
+
+
+async def test_incremental_sync_stops_on_known_page(api_client):
+    import server
+    from models import SyncStatus
+
+    await db.upsert_replay("r1", make_replay(replay_id="r1"))
+    await db.upsert_replay("r2", make_replay(replay_id="r2"))
+    server.client.list_replays.return_value = {
+        "count": 400,
+        "list": [{"id": "r1"}, {"id": "r2"}],
+        "next": "https://ballchasing.com/api/replays?after=abc",
+    }
+    status = SyncStatus(running=True)
+    await server._do_sync(None, None, status, stop_on_known_page=True)
+
+    assert server.client.list_replays.call_count == 1
+    assert server.client.get_replay.call_count == 0
+    assert status.replays_skipped == 2
+
+    resp = await api_client.get("/api/sync/history")
+    entry = resp.json()[0]
+    assert entry["status"] == "completed"
+    assert entry["exists_seconds"] > 0
+    assert entry["download_seconds"] == entry["write_seconds"] == 0
+
+
+# --- Multiple workers ---
+
+
+async def test_sync_status_reports_job_running_in_another_worker(api_client):
+    job_id = await db.enqueue_sync_job(None, None)
+    await db.claim_next_sync_job("other-host:4242")
+    await db.update_sync_job_progress(job_id, 500, 300, 120, 30)
+
+    resp = await api_client.get("/api/sync/status")
+    body = resp.json()
+    assert body["running"] is True
+    assert body["job_id"] == job_id
+    assert (body["replays_total"], body["replays_fetched"]) == (500, 120)
+
+    resp = await api_client.get(f"/api/sync/jobs/{job_id}")
+    assert resp.json()["owner"] == "other-host:4242"
+
+
+async def test_sync_worker_leaves_queue_to_lease_holder(api_client, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, "SYNC_POLL_SECONDS", 0.01)
+    server.client.list_replays.return_value = {"count": 0, "list": []}
+    job_id = await db.enqueue_sync_job(None, None)
+    assert await db.acquire_sync_lease("other-host:4242", 30)
+
+    worker = asyncio.create_task(server._sync_worker())
+    await asyncio.sleep(0.1)
+    assert (await db.get_sync_job(job_id))["status"] == "queued"
+
+    # The holder dies mid-job; once its lease is gone this worker recovers the job
+    await db.claim_next_sync_job("other-host:4242")
+    await db.acquire_sync_lease("other-host:4242", -1)
+    for _ in range(100):
+        await asyncio.sleep(0.02)
+        # The lease is released just after the job is marked completed
+        job = await db.get_sync_job(job_id)
+        if job["status"] == "completed" and await db.get_sync_lease() is None:
+            break
+    worker.cancel()
+    await asyncio.gather(worker, return_exceptions=True)
+    job = await db.get_sync_job(job_id)
+    assert job["status"] == "completed"
+    assert job["owner"] == server.WORKER_ID
+    assert await db.get_sync_lease() is None
+
+
+async def test_sync_worker_survives_database_errors(api_client, monkeypatch):
+    import sqlite3
+
+    import server
+
+    monkeypatch.setattr(server, "SYNC_POLL_SECONDS", 0.01)
+    monkeypatch.setattr(server, "_sync_wakeup", asyncio.Event())
+    job_id = await db.enqueue_sync_job(None, None)
+    # Each query fails once, as if another worker held the write lock
+    for name in ("sync_work_pending", "acquire_sync_lease"):
+        def fail_once(real):
+            failed = False
+
+            async def call(*args, **kwargs):
+                nonlocal failed
+                if not failed:
+                    failed = True
+                    raise sqlite3.OperationalError("database is locked")
+                return await real(*args, **kwargs)
+            return call
+
+        monkeypatch.setattr(db, name, fail_once(getattr(db, name)))
+
+    worker = asyncio.create_task(server._sync_worker())
+    for _ in range(100):
+        await asyncio.sleep(0.02)
+        if (await db.get_sync_job(job_id))["status"] == "completed":
+            break
+    assert not worker.done()
+    worker.cancel()
+    await asyncio.gather(worker, return_exceptions=True)
+    assert (await db.get_sync_job(job_id))["status"] == "completed"
+
+
+async def test_lease_renewal_errors_are_retried(api_client, monkeypatch):
+    import sqlite3
+
+    import server
+
+    monkeypatch.setattr(server, "LEASE_SECONDS", 0.3)
+    calls = 0
+
+    async def renew(owner, seconds):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return True
+
+    monkeypatch.setattr(db, "acquire_sync_lease", renew)
+    # Outlives two renewal rounds; the first one fails
+    assert await asyncio.wait_for(server._hold_lease(asyncio.sleep(0.25, "done")), 1) == "done"
+    assert calls >= 2
+
+
+async def test_lost_lease_cancels_running_job(api_client, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, "LEASE_SECONDS", 0.03)
+    assert await db.acquire_sync_lease(server.WORKER_ID, 30)
+    await db.release_sync_lease(server.WORKER_ID)
+    await db.acquire_sync_lease("other-host:4242", 30)
+    stopped = asyncio.Event()
+
+    async def work():
+        try:
+            await asyncio.sleep(5)
+        finally:
+            stopped.set()
+
+    await asyncio.wait_for(server._hold_lease(work()), 1)
+    assert stopped.is_set()
+
+
+async def test_dictionary_is_trained_once_under_the_lease(api_client, monkeypatch):
+    import aiosqlite
+
+    import server
+
+    monkeypatch.setattr(server, "SYNC_POLL_SECONDS", 0.01)
+    monkeypatch.setattr(db, "REPLAY_CODEC", "zdict")
+    monkeypatch.setattr(db, "_dictionaries", {})
+    for i in range(3):
+        await db.upsert_replay(f"r{i}", make_replay(replay_id=f"r{i}"))
+    assert await db.acquire_sync_lease("other-host:4242", 30)
+
+    migration = asyncio.create_task(server._migrate_replay_storage())
+    await asyncio.sleep(0.1)
+    assert not migration.done()
+    assert not await db.refresh_dictionaries()
+
+    await db.release_sync_lease("other-host:4242")
+    await asyncio.wait_for(migration, 5)
+    assert await db.get_sync_lease() is None
+    replays = await db.list_replays()
+    assert len(replays) == 3
+    async with aiosqlite.connect(db.DB_PATH) as conn:
+        cursor = await conn.execute("SELECT DISTINCT codec FROM replays")
+        assert [row[0] for row in await cursor.fetchall()] == ["zdict:1"]
+
+
+# --- Sync events ---
+
+
+async def test_sync_events_snapshot_then_delta(api_client, monkeypatch):
+    import server
+    from models import SyncStatus
+
+    monkeypatch.setattr(server, "SSE_COALESCE_SECONDS", 0)
+    server.client.rate_limit_status.return_value = {"tier": "gold"}
+    request = AsyncMock()
+    request.is_disconnected.return_value = False
+    stream = server._sync_event_stream(request)
+
+    first = await anext(stream)
+    assert first.startswith("event: snapshot")
+    snapshot = json.loads(first.split("data: ", 1)[1])
+    assert snapshot["running"] is False
+    assert snapshot["rate_limits"] == {"tier": "gold"}
+
+    pending = asyncio.ensure_future(anext(stream))
+    await asyncio.sleep(0.05)  # let the stream start waiting
+    monkeypatch.setattr(server, "_active_job", SyncStatus(
+        running=True, job_id=7, replays_total=10, replays_fetched=4,
+    ))
+    server._notify_progress()
+    event = await asyncio.wait_for(pending, 1)
+    assert event.startswith("event: delta")
+    delta = json.loads(event.split("data: ", 1)[1])
+    assert delta["job_id"] == 7
+    assert delta["replays_fetched"] == 4
+    assert "rate_limits" not in delta  # unchanged fields are not resent
+    await stream.aclose()
+
+
+async def test_sync_event_streams_share_one_snapshot(api_client):
+    import server
+
+    server.client.rate_limit_status.return_value = {}
+    request = AsyncMock()
+    request.is_disconnected.return_value = False
+    streams = [server._sync_event_stream(request) for _ in range(3)]
+    firsts = await asyncio.gather(*(anext(s) for s in streams))
+    assert len(set(firsts)) == 1
+    assert server.client.refresh_rate_limits.await_count == 1
+
+    server._notify_progress()  # a change invalidates the shared snapshot
+    await server._shared_progress_snapshot()
+    assert server.client.refresh_rate_limits.await_count == 2
+    for stream in streams:
+        await stream.aclose()
+
+
+def test_progress_delta_only_changed_keys():
+    from server import _progress_delta
+
+    assert _progress_delta({"a": 1, "b": 2}, {"a": 1, "b": 3}) == {"b": 3}
+
+
+# --- Sync plan ---
+
+
+async def _complete_sync(date_after, date_before):
+    log_id = await db.create_sync_log(date_after, date_before)
+    await db.complete_sync_log(log_id, "completed", 0, 0, 0)
+
+
+async def test_sync_plan_merges_partial_syncs(api_client):
+    await _complete_sync("2025-01-01T00:00:00+00:00", "2025-01-10T23:59:59+00:00")
+    await _complete_sync("2025-01-11T00:00:00+00:00", "2025-01-20T23:59:59+00:00")
+    await _complete_sync("2025-01-15T00:00:00+00:00", "2025-01-31T23:59:59+00:00")
+    resp = await api_client.get("/api/sync/plan", params={
+        "replay-date-after": "2025-01-05T00:00:00+00:00",
+        "replay-date-before": "2025-01-25T23:59:59+00:00",
+    })
+    assert resp.status_code == 200
+    assert resp.json()["gaps"] == []
+
+
+async def test_sync_plan_reports_gaps(api_client):
+    await _complete_sync("2025-01-10T00:00:00+00:00", "2025-01-20T23:59:59+00:00")
+    await db.upsert_replay("r1", make_replay(replay_id="r1", date="2025-01-05T12:00:00+00:00"))
+    resp = await api_client.get("/api/sync/plan", params={
+        "replay-date-after": "2025-01-01T00:00:00+00:00",
+        "replay-date-before": "2025-01-31T23:59:59+00:00",
+    })
+    plan = resp.json()
+    assert [(g["date_after"], g["date_before"]) for g in plan["gaps"]] == [
+        ("2025-01-01T00:00:00+00:00", "2025-01-09T23:59:59+00:00"),
+        ("2025-01-21T00:00:00+00:00", "2025-01-31T23:59:59+00:00"),
+    ]
+    assert plan["gaps"][0]["known_replays"] == 1
+    assert plan["estimated_list_calls"] == 2
+
+
+async def test_sync_skip_covered_already_synced(api_client):
+    await _complete_sync(None, None)
+    resp = await api_client.post("/api/sync", params={
+        "replay-date-after": "2025-01-01", "skip-covered": "true",
+    })
+    assert resp.json()["message"] == "Already synced"
+    assert await db.list_sync_jobs() == []
+
+
+async def test_sync_skip_covered_queues_one_job_per_gap(api_client):
+    await _complete_sync("2025-01-10T00:00:00+00:00", "2025-01-20T23:59:59+00:00")
+    resp = await api_client.post("/api/sync", params={
+        "replay-date-after": "2025-01-01T00:00:00+00:00",
+        "replay-date-before": "2025-01-31T23:59:59+00:00",
+        "skip-covered": "true",
+    })
+    assert len(resp.json()["job_ids"]) == 2
+
+
+# --- Sync jobs ---
+
+
+async def test_sync_requests_queue_instead_of_conflicting(api_client):
+    first = await api_client.post("/api/sync", params={
+        "replay-date-after": "2025-01-01", "replay-date-before": "2025-01-31",
+    })
+    second = await api_client.post("/api/sync", params={
+        "replay-date-after": "2025-03-01", "replay-date-before": "2025-03-31",
+    })
+    assert first.status_code == second.status_code == 200
+    assert first.json()["job_ids"] != second.json()["job_ids"]
+
+    status = (await api_client.get("/api/sync/status")).json()
+    assert status["running"] is True
+    assert status["queued"] == 2
+
+
+async def test_sync_overlapping_requests_are_merged(api_client):
+    first = await api_client.post("/api/sync", params={
+        "replay-date-after": "2025-01-01T00:00:00+00:00",
+        "replay-date-before": "2025-01-20T23:59:59+00:00",
+    })
+    second = await api_client.post("/api/sync", params={
+        "replay-date-after": "2025-01-15T00:00:00+00:00",
+        "replay-date-before": "2025-02-10T23:59:59+00:00",
+    })
+    job_id = first.json()["job_ids"][0]
+    assert second.json()["job_ids"] == [job_id]
+
+    job = (await api_client.get(f"/api/sync/jobs/{job_id}")).json()
+    assert job["date_after"] == "2025-01-01T00:00:00+00:00"
+    assert job["date_before"] == "2025-02-10T23:59:59+00:00"
+
+
+async def test_sync_job_runs_to_completion(api_client):
+    import server
+
+    server.client.list_replays.return_value = {"count": 1, "list": [{"id": "r1"}]}
+    server.client.get_replay.return_value = make_replay(replay_id="r1")
+    resp = await api_client.post("/api/sync")
+    job_id = resp.json()["job_ids"][0]
+    await server._drain_sync_queue()
+
+    job = (await api_client.get(f"/api/sync/jobs/{job_id}")).json()
+    assert job["status"] == "completed"
+    assert job["replays_fetched"] == 1
+    status = (await api_client.get("/api/sync/status")).json()
+    assert status["running"] is False
+    assert status["job_id"] == job_id
+
+
+async def test_cancel_queued_sync_job(api_client):
+    resp = await api_client.post("/api/sync")
+    job_id = resp.json()["job_ids"][0]
+    assert (await api_client.delete(f"/api/sync/jobs/{job_id}")).status_code == 200
+    assert (await api_client.delete(f"/api/sync/jobs/{job_id}")).status_code == 409
+    assert (await api_client.get("/api/sync/jobs/999")).status_code == 404
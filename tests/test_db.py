@@ -1,7 +1,14 @@
 """Tests for db.py — async SQLite layer."""
 from __future__ import annotations
 
+import asyncio
+import json
+
+import aiosqlite
+import pytest
+
 import db
+from bench.synthetic import generate_replays
 from tests.conftest import make_replay
 
 
@@ -26,6 +33,13 @@ async def test_replay_exists(tmp_db):
     assert await db.replay_exists("r1") is True
 
 
+async def test_upsert_replays_batch(tmp_db):
+    replays = [make_replay(replay_id=f"r{i}") for i in range(3)]
+    await db.upsert_replays(replays)
+    assert await db.count_replays() == 3
+    assert (await db.get_replay("r1"))["id"] == "r1"
+
+
 async def test_upsert_replay_overwrites(tmp_db):
     await db.upsert_replay("r1", make_replay(replay_id="r1", map_name="Map A"))
     await db.upsert_replay("r1", make_replay(replay_id="r1", map_name="Map B"))
@@ -94,6 +108,24 @@ async def test_player_config_roundtrip(tmp_db):
     assert result == cfg
 
 
+async def test_data_fingerprint_moves_with_replays_and_config(tmp_db):
+    generation, config = await db.data_fingerprint()
+    await db.upsert_replay("r1", make_replay(replay_id="r1"))
+    await db.upsert_replays([make_replay(replay_id="r2"), make_replay(replay_id="r3")])
+    # Another process writing directly is seen too
+    async with aiosqlite.connect(db.DB_PATH) as conn:
+        await conn.execute("DELETE FROM replays WHERE id = 'r3'")
+        await conn.commit()
+    after, same_config = await db.data_fingerprint()
+    assert after == generation + 4
+    assert same_config == config
+
+    await db.set_player_config({"teammates": {}, "me": ["Alice"]})
+    _, alice = await db.data_fingerprint()
+    await db.set_player_config({"me": ["Alice"], "teammates": {}})
+    assert (await db.data_fingerprint()) == (after, alice) != (after, config)
+
+
 # --- Sync log ---
 
 
@@ -107,6 +139,20 @@ async def test_sync_log_lifecycle(tmp_db):
     assert len(history) == 1
     assert history[0]["status"] == "completed"
     assert history[0]["replays_found"] == 100
+    assert history[0]["get_wait_seconds"] == 0
+
+
+async def test_sync_log_records_telemetry(tmp_db):
+    log_id = await db.create_sync_log(None, None)
+    await db.complete_sync_log(
+        log_id, "completed", 5, 5, 0,
+        telemetry={"get_wait_seconds": 2.5, "bytes_received": 4096, "retries": 1},
+    )
+    entry = (await db.get_sync_history())[0]
+    assert entry["get_wait_seconds"] == 2.5
+    assert entry["bytes_received"] == 4096
+    assert entry["retries"] == 1
+    assert entry["write_seconds"] == 0
 
 
 # --- Replay date counts ---
@@ -144,3 +190,346 @@ async def test_find_covering_sync_ignores_failed(tmp_db):
     await db.complete_sync_log(log_id, "failed", 0, 0, 0, error="oops")
     result = await db.find_covering_sync("2025-01-05", "2025-01-20")
     assert result is None
+
+
+# --- Sync jobs ---
+
+
+async def test_sync_job_claim_order_and_requeue(tmp_db):
+    first = await db.enqueue_sync_job("2025-01-01", "2025-01-31")
+    second = await db.enqueue_sync_job("2025-03-01", "2025-03-31")
+
+    claimed = await db.claim_next_sync_job()
+    assert claimed["id"] == first
+    assert claimed["status"] == "running"
+
+    # Server restart: the running job goes back on the queue ahead of the other
+    assert await db.requeue_interrupted_jobs() == 1
+    assert await db.count_sync_jobs("queued") == 2
+    assert [j["id"] for j in await db.list_sync_jobs(status="queued")] == [first, second]
+
+
+async def test_concurrent_enqueues_share_one_job(tmp_db):
+    ids = await asyncio.gather(*(
+        db.enqueue_sync_job(None, None, True, hours) for hours in (6, 48, 12)
+    ))
+    assert len(set(ids)) == 1
+    queued = await db.list_sync_jobs(status="queued")
+    assert [(j["id"], j["overlap_hours"]) for j in queued] == [(ids[0], 48)]
+
+    ranges = await asyncio.gather(
+        db.enqueue_sync_job("2025-01-01", "2025-01-20"),
+        db.enqueue_sync_job("2025-01-10", "2025-02-10"),
+    )
+    assert ranges[0] == ranges[1]
+    job = await db.get_sync_job(ranges[0])
+    assert (job["date_after"], job["date_before"]) == (
+        "2025-01-01T00:00:00+00:00", "2025-02-10T23:59:59+00:00",
+    )
+
+
+async def test_cancel_sync_job_only_when_queued(tmp_db):
+    job_id = await db.enqueue_sync_job(None, None)
+    await db.claim_next_sync_job()
+    assert await db.cancel_sync_job(job_id) is False
+
+
+async def test_sync_job_progress_and_owner(tmp_db):
+    job_id = await db.enqueue_sync_job(None, None)
+    assert await db.sync_work_pending() is True
+    claimed = await db.claim_next_sync_job("host:1")
+    assert claimed["owner"] == "host:1"
+    await db.update_sync_job_progress(job_id, 400, 200, 150, 50)
+    job = await db.get_sync_job(job_id)
+    assert (job["replays_total"], job["replays_fetched"], job["replays_skipped"]) == (400, 150, 50)
+    await db.finish_sync_job(job_id, "completed", 400, 300, 100)
+    assert await db.sync_work_pending() is False
+
+
+# --- Sync lease ---
+
+
+async def test_sync_lease_is_exclusive_until_expiry(tmp_db):
+    assert await db.get_sync_lease() is None
+    assert await db.acquire_sync_lease("a", 30) is True
+    assert await db.acquire_sync_lease("b", 30) is False
+    assert await db.acquire_sync_lease("a", 30) is True  # renewal
+    assert (await db.get_sync_lease())["owner"] == "a"
+
+    await db.release_sync_lease("b")  # not the owner: no effect
+    assert (await db.get_sync_lease())["owner"] == "a"
+    await db.release_sync_lease("a")
+    assert await db.acquire_sync_lease("b", -1) is True  # already expired
+    assert await db.get_sync_lease() is None
+    assert await db.acquire_sync_lease("a", 30) is True
+
+
+# --- Shared rate limits ---
+
+
+async def test_take_api_token_shares_one_bucket(tmp_db):
+    first = await db.take_api_token("get", 2, 3)
+    second = await db.take_api_token("get", 2, 3)
+    assert first["wait"] == second["wait"] == 0
+    # Two tokens per second, both spent: the next one is about half a second away
+    third = await db.take_api_token("get", 2, 3)
+    assert 0 < third["wait"] <= 0.5
+    assert third["hour_used"] == 2
+    peek = await db.take_api_token("get", 2, 3, take=False)
+    assert peek["wait"] == 0 and peek["hour_used"] == 2
+
+
+async def test_take_api_token_enforces_hourly_limit(tmp_db):
+    await db.seed_api_usage("list", 5)
+    await db.seed_api_usage("list", 0)  # existing state wins
+    state = await db.take_api_token("list", 100, 5)
+    assert state["wait"] > 3000
+    assert state["hour_used"] == 5
+
+
+async def test_token_buckets_with_shared_store_split_one_quota(tmp_db):
+    import time
+
+    from ballchasing_client import TokenBucket
+
+    # Two processes' buckets: separately each would grant 10 tokens at once
+    a = TokenBucket(10, name="get", store=db.take_api_token)
+    b = TokenBucket(10, name="get", store=db.take_api_token)
+    start = time.monotonic()
+    for _ in range(6):
+        await a.acquire()
+        await b.acquire()
+    assert time.monotonic() - start >= 0.15
+    await a.refresh()
+    assert a.snapshot()["hour_used"] == 12
+
+
+# --- Replay codecs ---
+
+
+async def test_replay_roundtrip_every_codec(tmp_db, monkeypatch):
+    replay = make_replay(replay_id="r1")
+    for codec in ("json", "zlib", "zdict"):
+        monkeypatch.setattr(db, "REPLAY_CODEC", codec)
+        await db.upsert_replay("r1", replay)
+        assert await db.get_replay("r1") == replay
+        assert await db.all_replay_data() == [replay]
+
+
+async def test_zdict_codec_uses_trained_dictionary(tmp_db, monkeypatch):
+    for i in range(3):
+        await db.upsert_replay(f"r{i}", make_replay(replay_id=f"r{i}"))
+    dict_id = await db.train_dictionary()
+    assert dict_id is not None
+
+    monkeypatch.setattr(db, "REPLAY_CODEC", "zdict")
+    payload, codec = db.encode_replay(make_replay(replay_id="r9"))
+    assert codec == f"zdict:{dict_id}"
+    plain, _ = db.encode_replay(make_replay(replay_id="r9"), "zlib")
+    assert len(payload) < len(plain)
+    assert db.decode_replay(payload, codec)["id"] == "r9"
+
+
+async def test_zdict_rows_decode_in_a_process_without_the_dictionary(tmp_db, monkeypatch):
+    await db.upsert_replay("r1", make_replay(replay_id="r1"))
+    await db.train_dictionary()
+    monkeypatch.setattr(db, "REPLAY_CODEC", "zdict")
+    await db.upsert_replay("r2", make_replay(replay_id="r2"))
+    # Another worker, which loaded codec_dicts before the dictionary existed
+    monkeypatch.setattr(db, "_dictionaries", {})
+    assert (await db.get_replay("r2"))["id"] == "r2"
+    assert db._latest_dictionary() is not None
+    with pytest.raises(ValueError):
+        db.decode_replay(b"", "zdict:99")
+
+
+async def test_migrate_replay_codec(tmp_db, monkeypatch):
+    monkeypatch.setattr(db, "REPLAY_CODEC", "json")
+    for i in range(5):
+        await db.upsert_replay(f"r{i}", make_replay(replay_id=f"r{i}"))
+
+    # Hot slim rows plus their replay_raw counterparts
+    assert await db.migrate_replay_codec("zlib", batch_size=2) == 10
+    assert await db.migrate_replay_codec("zlib") == 0
+    async with aiosqlite.connect(tmp_db) as conn:
+        cursor = await conn.execute("SELECT DISTINCT codec FROM replays")
+        assert await cursor.fetchall() == [("zlib",)]
+    assert (await db.get_replay("r3"))["id"] == "r3"
+
+
+async def test_init_db_adds_codec_column_to_legacy_table(tmp_path, monkeypatch):
+    path = str(tmp_path / "legacy.db")
+    monkeypatch.setattr(db, "DB_PATH", path)
+    async with aiosqlite.connect(path) as conn:
+        await conn.execute(
+            "CREATE TABLE replays (id TEXT PRIMARY KEY, data JSON NOT NULL, "
+            "date TEXT, map_name TEXT, playlist_name TEXT)"
+        )
+        await conn.execute(
+            "INSERT INTO replays (id, data) VALUES ('r1', ?)",
+            (json.dumps(make_replay(replay_id="r1")),),
+        )
+        await conn.commit()
+
+    await db.init_db()
+    assert (await db.get_replay("r1"))["id"] == "r1"
+
+
+def _full_replay(replay_id: str) -> dict:
+    """A synthetic replay with every stat group filled, plus awkward values."""
+    replay = generate_replays(1, seed=7)[0]
+    replay["id"] = replay_id
+    replay["title"] = "Ünïcode ⚽ \"quoted\" \\ title"
+    replay["uploader"] = {"name": None, "steam_id": "76561197971332940"}
+    replay["groups"] = []
+    replay["blue"]["stats"]["core"]["shooting_percentage"] = 33.333333333333336
+    replay["orange"]["players"][0]["mvp"] = True
+    replay["orange"]["players"][0]["start_time"] = 0.0
+    replay["orange"]["players"][0]["steam_id_64"] = 2**62
+    return replay
+
+
+@pytest.mark.parametrize("codec", ["json", "zlib", "zdict"])
+async def test_every_field_survives_storage(tmp_db, monkeypatch, codec):
+    await db.upsert_replay("seed", _full_replay("seed"))
+    await db.train_dictionary()
+    monkeypatch.setattr(db, "REPLAY_CODEC", codec)
+
+    replay = _full_replay("r1")
+    await db.upsert_replay("r1", replay)
+    assert await db.get_replay("r1") == replay
+    assert {r["id"]: r for r in await db.all_replay_data()}["r1"] == db.slim_replay(replay)
+
+
+async def test_stdlib_json_rows_decode_and_migrate(tmp_db):
+    replay = _full_replay("r1")
+    async with aiosqlite.connect(tmp_db) as conn:
+        await conn.execute(
+            "INSERT INTO replays (id, data, date, codec) VALUES ('r1', ?, ?, 'json')",
+            (json.dumps(replay), replay["date"]),
+        )
+        await conn.commit()
+
+    assert await db.get_replay("r1") == replay
+    assert await db.migrate_replay_codec("zlib") == 1
+    assert await db.get_replay("r1") == replay
+
+
+def test_stdlib_json_restrictions():
+    # NaN/Infinity (json.dumps default output) go through the json.loads fallback
+    text = json.dumps({"id": "r1", "score": float("nan"), "speed": float("inf")})
+    data = db.decode_replay(text, "json")
+    assert data["score"] != data["score"] and data["speed"] == float("inf")
+    # orjson writes NaN as null, so a re-encoded row loses it
+    raw, codec = db.encode_replay(data, "zlib")
+    assert db.decode_replay(raw, codec)["score"] is None
+    # Integers beyond 64 bits read as floats
+    assert db.decode_replay('{"n": 18446744073709551616}', "json")["n"] == 2.0 ** 64
+    raw, codec = db.encode_replay({"n": 2 ** 70}, "zlib")
+    assert db.decode_replay(raw, codec)["n"] == 2.0 ** 70
+
+
+# --- Slim projection ---
+
+
+def test_slim_replay_keeps_only_analytics_fields():
+    replay = _full_replay("r1")
+    replay["blue"]["players"][0]["camera"] = {"fov": 110}
+    replay["blue"]["players"][0]["stats"]["ball"] = {"possession_time": 40.0}
+    replay["blue"]["stats"]["ball"] = {"possession_time": 90.0}
+
+    slim = db.slim_replay(replay)
+    assert "uploader" not in slim and "groups" not in slim
+    player = slim["blue"]["players"][0]
+    assert set(player) == {"name", "id", "stats"}
+    assert set(player["stats"]) == set(db.SLIM_STAT_FIELDS)
+    raw_boost = replay["blue"]["players"][0]["stats"]["boost"]
+    assert "amount_overfill" in raw_boost
+    assert player["stats"]["boost"] == {
+        k: v for k, v in raw_boost.items() if k in db.SLIM_STAT_FIELDS["boost"]
+    }
+    assert player["stats"]["positioning"]["percent_behind_ball"] is not None
+    assert slim["blue"]["stats"] == {"core": {"goals": replay["blue"]["stats"]["core"]["goals"]}}
+    assert slim["map_name"] == replay["map_name"]
+
+
+async def test_hot_rows_are_slim_and_raw_is_cold(tmp_db):
+    replay = _full_replay("r1")
+    await db.upsert_replay("r1", replay)
+
+    assert await db.all_replay_data() == [db.slim_replay(replay)]
+    assert await db.list_replays() == [db.slim_replay(replay)]
+    assert await db.get_replay("r1") == replay
+
+
+async def test_split_raw_replays_migrates_legacy_rows(tmp_db):
+    replay = _full_replay("r1")
+    async with aiosqlite.connect(tmp_db) as conn:
+        await conn.execute(
+            "INSERT INTO replays (id, data, date, codec) VALUES ('r1', ?, ?, 'json')",
+            (json.dumps(replay), replay["date"]),
+        )
+        await conn.commit()
+
+    # Readable before the split, through the hot row
+    assert await db.get_replay("r1") == replay
+    assert await db.split_raw_replays() == 1
+    assert await db.split_raw_replays() == 0
+    assert await db.all_replay_data() == [db.slim_replay(replay)]
+    assert await db.get_replay("r1") == replay
+
+
+# --- Keyset pagination ---
+
+
+async def test_list_replays_after_cursor_uses_index(tmp_db):
+    for i in range(4):
+        await db.upsert_replay(f"r{i}", make_replay(replay_id=f"r{i}", date=f"2025-01-1{i}T00:00:00Z"))
+
+    page = await db.list_replays(limit=2, after=("2025-01-12T00:00:00Z", "r2"))
+    assert [r["id"] for r in page] == ["r1", "r0"]
+
+    async with aiosqlite.connect(tmp_db) as conn:
+        cursor = await conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT data FROM replays "
+            f"WHERE {db.SORT_DATE} <= ? AND ({db.SORT_DATE}, id) < (?, ?) "
+            f"ORDER BY {db.SORT_DATE} DESC, id DESC LIMIT 2",
+            ("2025-01-12T00:00:00Z", "2025-01-12T00:00:00Z", "r2"),
+        )
+        plan = " ".join(row[-1] for row in await cursor.fetchall())
+    assert "SEARCH replays USING INDEX idx_replays_sort" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+async def test_list_replays_cursor_reaches_undated_rows(tmp_db):
+    for i in range(3):
+        await db.upsert_replay(f"r{i}", make_replay(replay_id=f"r{i}", date=f"2025-01-1{i}T00:00:00Z"))
+    for rid in ("u1", "u2"):
+        replay = make_replay(replay_id=rid)
+        del replay["date"]
+        await db.upsert_replay(rid, replay)
+
+    seen = []
+    after = None
+    while page := await db.list_replays(limit=2, after=after):
+        seen += [r["id"] for r in page]
+        after = (page[-1].get("date") or "", page[-1]["id"])
+    assert seen == ["r2", "r1", "r0", "u2", "u1"]
+    assert [r["id"] for r in await db.list_replays(date_before="2025-01-11T00:00:00Z")] == ["r1", "r0"]
+
+
+async def test_iter_replay_data_lets_writers_in_mid_stream(tmp_db):
+    for i in range(5):
+        await db.upsert_replay(f"r{i}", make_replay(replay_id=f"r{i}", date=f"2025-01-1{i}T00:00:00Z"))
+    undated = make_replay(replay_id="u0")
+    del undated["date"]
+    await db.upsert_replay("u0", undated)
+
+    stream = db.iter_replay_data(batch_size=2)
+    seen = [(await anext(stream))["id"]]
+    # The rollback journal cannot commit while any reader holds a SHARED lock
+    async with aiosqlite.connect(db.DB_PATH, timeout=0.1) as conn:
+        await conn.execute("UPDATE replays SET data = data WHERE id = 'r0'")
+        await conn.commit()
+    seen += [r["id"] async for r in stream]
+    assert seen == ["r4", "r3", "r2", "r1", "r0", "u0"]
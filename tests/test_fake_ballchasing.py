@@ -0,0 +1,201 @@
+"""Tests for the bench tooling: fake ballchasing API, client against it, harnesses."""
+from __future__ import annotations
+
+import email.utils
+import json
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+import db
+from ballchasing_client import (
+    RETRY_AFTER_DEFAULT,
+    RETRY_AFTER_MAX,
+    BallchasingClient,
+    SyncTelemetry,
+    retry_after_seconds,
+    track,
+)
+from bench.endpoint_bench import ENDPOINTS, compare, run_endpoint_bench, save_baseline
+from bench.fake_ballchasing import create_app
+from bench.sync_bench import run_sync_bench
+from bench.synthetic import generate_replays
+
+
+def _client(app, tier="gc"):
+    return BallchasingClient(
+        "test", tier, base_url="http://fake", transport=httpx.ASGITransport(app=app)
+    )
+
+
+def test_generate_replays_deterministic():
+    a = generate_replays(5, seed=3)
+    b = generate_replays(5, seed=3)
+    assert a == b
+    assert [r["date"] for r in a] == sorted((r["date"] for r in a), reverse=True)
+
+
+def test_full_payload_extras_stay_out_of_the_slim_projection():
+    replay, = generate_replays(1, seed=3, full=True)
+    assert "min_rank" in replay and "rank" in replay["blue"]["players"][0]
+    assert "percent_most_back" in replay["blue"]["players"][0]["stats"]["positioning"]
+
+    slim = db.slim_replay(replay)
+    assert "min_rank" not in slim
+    assert slim["blue"]["stats"] == {"core": {"goals": replay["blue"]["stats"]["core"]["goals"]}}
+    for player in slim["blue"]["players"] + slim["orange"]["players"]:
+        assert set(player) == {"name", "id", "stats"}
+        for group, stats in player["stats"].items():
+            assert set(stats) == db.SLIM_STAT_FIELDS[group]
+
+
+async def test_list_pagination_covers_every_replay():
+    app = create_app(count=450)
+    client = _client(app)
+    seen = []
+    params: dict = {"count": 200}
+    while True:
+        page = await client.list_replays(**params)
+        seen.extend(r["id"] for r in page["list"])
+        if "next" not in page:
+            break
+        params["after"] = httpx.URL(page["next"]).params["after"]
+    await client.close()
+    assert page["count"] == 450
+    assert len(seen) == len(set(seen)) == 450
+
+
+async def test_list_date_filter():
+    replays = generate_replays(100)
+    app = create_app(replays)
+    client = _client(app)
+    cutoff = replays[9]["date"]
+    page = await client.list_replays(**{"replay-date-after": cutoff})
+    await client.close()
+    assert page["count"] == 10
+
+
+async def test_get_replay_full_shape():
+    replays = generate_replays(1)
+    client = _client(create_app(replays))
+    detail = await client.get_replay(replays[0]["id"])
+    await client.close()
+    assert detail == replays[0]
+    assert "positioning" in detail["blue"]["players"][0]["stats"]
+
+
+async def test_client_retries_injected_429():
+    app = create_app(count=10, error_rate=0.5, seed=1, retry_after=0)
+    client = _client(app)
+    for replay in generate_replays(10, seed=1):
+        await client.get_replay(replay["id"])
+    await client.close()
+    assert app.state.calls["429"] > 0
+
+
+def test_retry_after_accepts_seconds_and_http_dates():
+    later = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert retry_after_seconds("2") == 2
+    assert 25 < retry_after_seconds(email.utils.format_datetime(later, usegmt=True)) <= 30
+    assert retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") == 0  # in the past
+    assert retry_after_seconds("86400") == RETRY_AFTER_MAX
+    assert retry_after_seconds("-5") == 0
+    assert retry_after_seconds("soon") == retry_after_seconds(None) == RETRY_AFTER_DEFAULT
+
+
+async def test_client_records_telemetry_when_tracked():
+    replays = generate_replays(10, seed=1)
+    app = create_app(replays, error_rate=0.3, seed=1, retry_after=0)
+    client = _client(app)
+    telemetry = SyncTelemetry()
+    await client.list_replays()
+    assert telemetry.bytes_received == 0  # nothing is bound yet
+    with track(telemetry):
+        await client.list_replays()
+        for replay in replays:
+            await client.get_replay(replay["id"])
+    await client.close()
+    assert telemetry.retries > 0
+    assert telemetry.bytes_received > 0
+    assert telemetry.list_seconds > 0 and telemetry.download_seconds > 0
+    assert telemetry.decode_seconds > 0
+    assert telemetry.exists_seconds == telemetry.write_seconds == 0
+
+
+async def test_tier_limits_enforced():
+    app = create_app(count=1, tier="gold", retry_after=0)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://fake") as raw:
+        codes = [(await raw.get("/maps")).status_code for _ in range(4)]
+    assert codes.count(429) == 2  # gold allows 2 get calls per second
+
+
+async def test_sync_bench_reports_efficiency(tmp_path, monkeypatch):
+    import db
+    import server
+
+    monkeypatch.setattr(db, "DB_PATH", db.DB_PATH)
+    monkeypatch.setattr(server, "client", None, raising=False)
+    result = await run_sync_bench(
+        replays=250, preloaded=50, db_path=str(tmp_path / "bench.db")
+    )
+    assert result["fetched"] == 200
+    assert result["skipped"] == 50
+    assert result["list_calls"] == 2
+    assert result["bytes_received"] > 0
+    assert result["write_seconds"] > 0
+    assert result["error"] is None
+
+
+async def test_endpoint_bench_times_every_endpoint(tmp_path, monkeypatch):
+    import db
+
+    monkeypatch.setattr(db, "DB_PATH", db.DB_PATH)
+    results = await run_endpoint_bench(scales=(20, 40), repeat=1, data_dir=str(tmp_path))
+    assert len(results) == 2 * len(ENDPOINTS)
+    assert all(row["bytes"] > 0 for row in results)
+    assert results[0]["growth"] is None
+    assert results[len(ENDPOINTS)]["growth"] is not None
+    # Datasets are kept in data_dir for the next run
+    assert len(list(tmp_path.glob("*.db"))) == 2
+
+    baseline = tmp_path / "baseline.json"
+    save_baseline(results, baseline)
+    regressions = compare(results, {k: v / 2 for k, v in json.loads(baseline.read_text()).items()})
+    assert len(regressions) == len(results)
+    assert compare(results, json.loads(baseline.read_text())) == []
+
+
+async def test_load_bench_reports_both_phases(monkeypatch):
+    import db
+    import server
+    from bench.load_bench import run_load_bench
+
+    monkeypatch.setattr(db, "DB_PATH", db.DB_PATH)
+    monkeypatch.setattr(server, "client", None, raising=False)
+    idle, sync = await run_load_bench(preloaded=20, new=10, rate=50, idle_seconds=0.1)
+    assert idle["phase"] == "idle" and sync["phase"] == "sync"
+    assert idle["requests"] > 0 and idle["errors"] == 0
+    assert sync["replays_fetched"] == 10 and sync["sync_error"] is None
+    assert sync["p50_ms"] <= sync["p99_ms"]
+    assert server.response_cache.max_bytes > 0  # restored
+
+
+def test_lock_waits_are_timed(tmp_path):
+    import sqlite3
+    import threading
+
+    from bench.load_bench import LockWaits, _lock_timed_connection
+
+    waits = LockWaits()
+    path = str(tmp_path / "locks.db")
+    writer = sqlite3.connect(path, check_same_thread=False)
+    writer.execute("CREATE TABLE t (x)")
+    writer.commit()
+    writer.execute("BEGIN EXCLUSIVE")
+    reader = sqlite3.connect(path, timeout=0, factory=_lock_timed_connection(waits))
+    timer = threading.Timer(0.05, writer.commit)
+    timer.start()
+    assert reader.execute("SELECT COUNT(*) FROM t").fetchone() == (0,)
+    timer.join()
+    assert len(waits.waits) == 1 and waits.waits[0] >= 0.04
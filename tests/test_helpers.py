@@ -1,15 +1,19 @@
 """Tests for pure helper functions in server.py."""
 from __future__ import annotations
 
+import db
 from models import AggregatedStats
 from server import (
+    STAT_PATHS,
     _add_stats,
     _average_stats,
     _build_role_lookup,
+    _density_grid,
     _find_my_team,
     _normalize_date,
     _resolve_player_role,
     _safe_get,
+    _sample_points,
 )
 
 
@@ -183,3 +187,47 @@ def test_normalize_date_already_full():
     assert _normalize_date(ts) == ts
 
 
+
+
+# --- slim projection coverage ---
+
+
+def test_slim_projection_covers_correlation_stats():
+    for group, field in STAT_PATHS.values():
+        assert field in db.SLIM_STAT_FIELDS[group], (group, field)
+
+
+# --- Correlation point reduction ---
+
+
+def _points(values, goal_diffs):
+    return [
+        {"stat_value": v, "goal_diff": d, "won": d > 0}
+        for v, d in zip(values, goal_diffs)
+    ]
+
+
+def test_sample_points_under_limit_unchanged():
+    points = _points([3.0, 1.0], [1, -1])
+    assert _sample_points(points, 5) is points
+
+
+def test_sample_points_keeps_extremes_and_spacing():
+    points = _points([float(v) for v in (5, 0, 9, 1, 8, 2, 7, 3, 6, 4, 10)], [0] * 11)
+    sample = _sample_points(points, 3)
+    assert [p["stat_value"] for p in sample] == [0.0, 5.0, 10.0]
+
+
+def test_density_grid_counts():
+    points = _points([0.0, 0.0, 5.0, 10.0], [-1, 1, 1, 2])
+    grid = _density_grid(points, 2)
+    assert grid["x_min"] == 0.0 and grid["x_max"] == 10.0
+    assert grid["goal_diff_min"] == -1 and grid["goal_diff_max"] == 2
+    # rows: goal_diff -1, 0, 1, 2; the max value lands in the last bin
+    assert grid["counts"] == [[1, 0], [0, 0], [1, 1], [0, 1]]
+
+
+def test_density_grid_single_value():
+    grid = _density_grid(_points([3.0, 3.0], [1, 1]), 4)
+    assert grid["counts"] == [[2, 0, 0, 0]]
+    assert _density_grid([], 4) is None
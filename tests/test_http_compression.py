@@ -0,0 +1,143 @@
+"""Tests for the compression middleware and response cache."""
+from __future__ import annotations
+
+import gzip
+import zlib
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+
+import http_compression
+from http_compression import CompressionMiddleware, ResponseCache, negotiate
+
+BIG = {"rows": [{"id": i, "value": "x" * 20} for i in range(200)]}
+
+
+def _app(cache: ResponseCache | None = None, **kwargs) -> FastAPI:
+    app = FastAPI()
+    app.state.calls = 0
+
+    @app.get("/big")
+    async def big():
+        app.state.calls += 1
+        return BIG
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/events")
+    async def events():
+        return Response("data: x\n\n" * 500, media_type="text/event-stream")
+
+    @app.get("/deflated")
+    async def deflated():
+        body = zlib.compress(b'{"a": 1}' * 500)
+        return Response(body, media_type="application/json", headers={"Content-Encoding": "deflate"})
+
+    @app.get("/stream")
+    async def stream():
+        async def rows():
+            for i in range(100):
+                yield f'{{"row": {i}}}\n'.encode()
+        return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+    app.add_middleware(
+        CompressionMiddleware, cache=cache,
+        cache_key=(lambda scope: scope["path"]) if cache is not None else None, **kwargs,
+    )
+    return app
+
+
+def _client(app: FastAPI) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def test_negotiate():
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("deflate") is None
+    assert negotiate("gzip;q=0") is None
+    assert negotiate("*") == http_compression.PREFERENCE[0]
+    assert negotiate("") is None
+
+
+async def test_large_json_is_gzipped():
+    async with _client(_app()) as c:
+        resp = await c.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["vary"]
+    assert int(resp.headers["content-length"]) < len(resp.content)
+    assert resp.json() == BIG
+
+
+async def test_small_and_ineligible_responses_untouched():
+    async with _client(_app()) as c:
+        small = await c.get("/small", headers={"Accept-Encoding": "gzip"})
+        events = await c.get("/events", headers={"Accept-Encoding": "gzip"})
+        deflated = await c.get("/deflated", headers={"Accept-Encoding": "gzip, deflate"})
+        plain = await c.get("/big", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in small.headers
+    assert "content-encoding" not in events.headers
+    assert deflated.headers["content-encoding"] == "deflate"
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == BIG
+
+
+async def test_stream_is_encoded_incrementally():
+    async with _client(_app()) as c:
+        resp = await c.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["content-encoding"] == "gzip"
+    assert "content-length" not in resp.headers
+    assert resp.text.splitlines()[99] == '{"row": 99}'
+
+
+async def test_cache_serves_encoded_body_without_route():
+    cache = ResponseCache()
+    app = _app(cache)
+    async with _client(app) as c:
+        first = await c.get("/big", headers={"Accept-Encoding": "gzip"})
+        second = await c.get("/big", headers={"Accept-Encoding": "gzip"})
+        plain = await c.get("/big", headers={"Accept-Encoding": "identity"})
+    assert app.state.calls == 2  # gzip once, identity once
+    assert second.headers["content-encoding"] == "gzip"
+    assert second.json() == first.json() == plain.json()
+    assert (cache.hits, cache.misses, len(cache)) == (1, 2, 2)
+
+
+async def test_cache_keeps_streamed_body():
+    cache = ResponseCache()
+    async with _client(_app(cache)) as c:
+        first = await c.get("/stream", headers={"Accept-Encoding": "gzip"})
+        second = await c.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert (cache.hits, len(cache)) == (1, 1)
+    assert second.headers["content-encoding"] == "gzip"
+    assert second.text == first.text
+    assert second.text.splitlines()[99] == '{"row": 99}'
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ResponseCache(max_bytes=100)
+    cache.put(("a", "gzip"), 200, [], b"x" * 20)
+    cache.put(("b", "gzip"), 200, [], b"x" * 20)
+    assert cache.get(("a", "gzip")) is not None
+    cache.put(("c", "gzip"), 200, [], b"x" * 20)
+    cache.put(("d", "gzip"), 200, [], b"x" * 20)
+    cache.put(("e", "gzip"), 200, [], b"x" * 20)
+    cache.put(("g", "gzip"), 200, [], b"x" * 20)
+    assert cache.get(("b", "gzip")) is None
+    assert cache.get(("a", "gzip")) is not None
+    assert cache.size <= 100
+    # Bodies over a quarter of the budget are never kept
+    cache.put(("f", "gzip"), 200, [], b"x" * 26)
+    assert cache.get(("f", "gzip")) is None
+
+
+def test_budget_drops_to_fast_level():
+    mw = CompressionMiddleware(None, budget=0.01)
+    assert mw.level("gzip", 10_000_000) == 6  # unmeasured: try the better level
+    mw._rates[("gzip", 6)] = 100_000_000.0
+    assert mw.level("gzip", 500_000) == 6
+    assert mw.level("gzip", 5_000_000) == 1
+    data = b'{"k": 1}' * 1000
+    assert gzip.decompress(mw.compress(data, "gzip")) == data
@@ -0,0 +1,53 @@
+"""Tests for the in-process metrics registry."""
+from __future__ import annotations
+
+import metrics
+
+
+def test_counter_and_gauge_render():
+    c = metrics.Counter("t_counter_total", "A counter", ("kind",))
+    c.inc(labels=("a",))
+    c.inc(2, ("a",))
+    c.inc(0.5, ("b\"q",))
+    g = metrics.Gauge("t_gauge", "A gauge")
+    g.set(7)
+    out = metrics.render()
+    assert "# TYPE t_counter_total counter" in out
+    assert 't_counter_total{kind="a"} 3' in out
+    assert 't_counter_total{kind="b\\"q"} 0.5' in out
+    assert "t_gauge 7" in out
+
+
+def test_histogram_buckets_are_cumulative():
+    h = metrics.Histogram("t_seconds", "A histogram", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        h.observe(value, ("/x",))
+    lines = h.render()
+    assert 't_seconds_bucket{route="/x",le="0.1"} 2' in lines
+    assert 't_seconds_bucket{route="/x",le="1"} 3' in lines
+    assert 't_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 't_seconds_count{route="/x"} 4' in lines
+    assert 't_seconds_sum{route="/x"} 3.65' in lines
+    assert h.count(("/x",)) == 4
+
+
+def test_register_replaces_callback():
+    metrics.register("t_cb", "Callback", "gauge", lambda: [((), 1)])
+    metrics.register("t_cb", "Callback", "gauge", lambda: [((), 2)])
+    out = metrics.render()
+    assert out.count("# TYPE t_cb gauge") == 1
+    assert "t_cb 2" in out
+
+
+async def test_timed_observes_failures_too():
+    h = metrics.Histogram("t_timed_seconds", "Timed")
+
+    @metrics.timed(h, ("call",))
+    async def boom():
+        raise ValueError
+
+    try:
+        await boom()
+    except ValueError:
+        pass
+    assert h.count(("call",)) == 1
@@ -0,0 +1,52 @@
+"""Tests for request profiling helpers."""
+from __future__ import annotations
+
+import time
+
+import profiling
+
+
+def test_span_counts_nested_once_and_excludes_decode():
+    profile = profiling.Profile("GET", "/x")
+    token = profiling._current.set(profile)
+    try:
+        with profiling.span("db_fetch"):
+            with profiling.span("db_fetch"):
+                time.sleep(0.01)
+                profiling.record("json_decode", 0.004)
+        profiling.record("json_decode", 0.002)
+    finally:
+        profiling._current.reset(token)
+    phases = profile.phases()
+    assert phases["json_decode"] == 0.006
+    # Only the decode done inside the db span is subtracted
+    assert 0.005 <= phases["db_fetch"] < profile.exact["db_fetch"]
+
+
+def test_record_without_profile_is_noop():
+    profiling.record("db_fetch", 1.0)
+    with profiling.span("db_fetch"):
+        pass
+    assert profiling.current() is None
+
+
+def test_sampled_phases_and_folded_output():
+    def route():
+        pass
+
+    code = route.__code__
+    here = (code.co_filename, code.co_name, code.co_firstlineno)
+    profile = profiling.Profile("GET", "/x")
+    profile.endpoint = route
+    profile.total = 0.010
+    profile.stacks[(("loop.py", "run", 1), here)] = 6
+    profile.stacks[(here, ("server.py", "_find_my_team", 10))] = 2
+    profile.stacks[(("routing.py", "serialize_response", 5),)] = 1
+    profile.stacks[(("loop.py", "select", 2),)] = 1
+
+    phases = profile.phases()
+    assert round(phases["aggregation"], 4) == 0.006
+    assert round(phases["role_resolution"], 4) == 0.002
+    assert round(phases["serialization"], 4) == 0.001
+    assert profile.folded().splitlines()[0].endswith(" 6")
+    assert "server.py:_find_my_team:10 2" in profile.folded()
@@ -0,0 +1,44 @@
+"""Tests for the on-disk response snapshot."""
+from __future__ import annotations
+
+import snapshot
+from snapshot import Entry
+
+TAG = {"replay_generation": 3, "config": "abc", "code": "def"}
+
+
+def _entries() -> list[Entry]:
+    return [
+        Entry("/api/stats/me", [], "*/*", "gzip", 200,
+              [(b"content-type", b"application/json"), (b"content-encoding", b"gzip")],
+              b"\x1f\x8b" * 50),
+        Entry("/api/stats/games", [("team-size", "2")], "application/x-ndjson", "identity", 200,
+              [(b"content-type", b"application/x-ndjson")], b'{"id": "r1"}\n'),
+    ]
+
+
+def test_roundtrip(tmp_path):
+    path = str(tmp_path / "x.db.snapshot")
+    written = snapshot.save(path, TAG, _entries())
+    assert written == (tmp_path / "x.db.snapshot").stat().st_size
+    assert snapshot.load(path, TAG) == _entries()
+    assert list(tmp_path.iterdir()) == [tmp_path / "x.db.snapshot"]
+
+
+def test_stale_missing_or_damaged_snapshot_is_ignored(tmp_path):
+    path = str(tmp_path / "x.db.snapshot")
+    assert snapshot.load(path, TAG) is None
+    snapshot.save(path, TAG, _entries())
+    assert snapshot.load(path, {**TAG, "replay_generation": 4}) is None
+
+    data = (tmp_path / "x.db.snapshot").read_bytes()
+    (tmp_path / "x.db.snapshot").write_bytes(data[:-5])
+    assert snapshot.load(path, TAG) is None
+    (tmp_path / "x.db.snapshot").write_bytes(b"not json\n")
+    assert snapshot.load(path, TAG) is None
+
+
+def test_empty_snapshot(tmp_path):
+    path = str(tmp_path / "x.db.snapshot")
+    snapshot.save(path, TAG, [])
+    assert snapshot.load(path, TAG) == []
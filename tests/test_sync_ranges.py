@@ -0,0 +1,73 @@
+"""Tests for sync_ranges.py — sync range interval arithmetic."""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from sync_ranges import MAX, MIN, count_in, merge, parse_bound, to_interval, uncovered
+
+
+def _dt(day: int, hour: int = 0) -> datetime:
+    return datetime(2025, 1, day, hour, tzinfo=timezone.utc)
+
+
+# --- parse_bound ---
+
+
+def test_parse_bound_unbounded():
+    assert parse_bound(None) == MIN
+    assert parse_bound(None, end=True) == MAX
+
+
+def test_parse_bound_date_only_end_covers_day():
+    assert parse_bound("2025-01-15", end=True) == datetime(
+        2025, 1, 15, 23, 59, 59, tzinfo=timezone.utc
+    )
+
+
+# --- merge ---
+
+
+def test_merge_overlapping_and_adjacent():
+    a = to_interval("2025-01-01", "2025-01-10")
+    b = to_interval("2025-01-11", "2025-01-15")
+    c = to_interval("2025-01-14", "2025-01-20")
+    assert merge([c, a, b]) == [to_interval("2025-01-01", "2025-01-20")]
+
+
+def test_merge_keeps_disjoint():
+    a = to_interval("2025-01-01", "2025-01-05")
+    b = to_interval("2025-01-10", "2025-01-15")
+    assert merge([b, a]) == [a, b]
+
+
+# --- uncovered ---
+
+
+def test_uncovered_fully_covered():
+    assert uncovered((_dt(5), _dt(10)), [(MIN, MAX)]) == []
+
+
+def test_uncovered_nothing_covered():
+    assert uncovered((_dt(5), _dt(10)), []) == [(_dt(5), _dt(10))]
+
+
+def test_uncovered_middle_gap():
+    covered = [(_dt(1), _dt(4)), (_dt(8), _dt(20))]
+    gaps = uncovered((_dt(2), _dt(10)), covered)
+    assert len(gaps) == 1
+    assert gaps[0][0] > _dt(4) and gaps[0][1] < _dt(8)
+
+
+def test_uncovered_unbounded_request():
+    gaps = uncovered((MIN, MAX), [(_dt(5), _dt(10))])
+    assert gaps[0][0] == MIN
+    assert gaps[-1][1] == MAX
+
+
+# --- count_in ---
+
+
+def test_count_in_days():
+    counts = {"2025-01-01": 2, "2025-01-05": 3, "2025-01-10": 4}
+    assert count_in((_dt(2), _dt(10, 12)), counts) == 7
+    assert count_in((MIN, MAX), counts) == 9